@@ -1,10 +1,28 @@
+import os
+import sys
+
+embeddings_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'embeddings'))
+
+# Adiciona o caminho ao sys.path se ainda não estiver lá
+if embeddings_path not in sys.path:
+    sys.path.insert(0, embeddings_path) # Usar insert(0, ...) para dar prioridade
+
 import streamlit as st
 import json
-import os
 from datetime import datetime
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+from backend_inferencia import carregar_modelo, backend_do_modelo
+from instrumentacao import medir, cronometrar
+from recarga_indices import solicitar_recarga
+from registro_indices import APELIDO_LEGADO, caminhos_indice
+from armazem_vetores import acompanhar_indice
+from build_incremental import codificar_textos_unicos, hash_texto
+from versoes_dados import versao_indice
+from tabela_topk import inserir_candidato as inserir_candidato_topk
+from agrupamento import atribuir_novo
+from deduplicacao import procurar_duplicados, mesclar_registros, vizinhos_no_raio
+from repositorio_registros import sincronizar_base, reservar_ids, inserir_registros, obter_registro, atualizar_registro, chaves_registro
 import pandas as pd
 
 # --- CONFIGURAÇÕES E CAMINHOS ---
@@ -12,13 +30,15 @@ import pandas as pd
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Pastas de dados e modelos (um nível acima de app_pages/)
-DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(BASE_DIR, '..', 'data'))
 # ATENÇÃO: Verifique se sua pasta no repositório é 'models' ou 'models1'
 # Mantenha a consistência com servicos.py. Vou usar 'models1' como exemplo.
-MODELS_DIR = os.path.join(BASE_DIR, '..', 'models1') # AJUSTADO: Consistência
+MODELS_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1')) # AJUSTADO: Consistência
 
 # Caminhos dos arquivos
 ARQUIVO_CANDIDATOS = os.path.join(DATA_DIR, "applicants.json")
+# Base SQLite onde os cadastros são gravados (applicants.json é regravado por exportar_pendentes)
+CAMINHO_REGISTROS = os.path.join(DATA_DIR, "registros.sqlite")
 INDEX_CANDIDATOS_PATH = os.path.join(MODELS_DIR, 'index_candidatos.faiss')
 METADADOS_CANDIDATOS_PATH = os.path.join(MODELS_DIR, 'candidatos_metadados.pkl')
 
@@ -30,13 +50,20 @@ CAMPOS_OBRIGATORIOS = [
     "nome", "email", "cv_pt" # Campos do formulário
 ]
 
+# O que fazer quando o cadastro parece ser de alguém já cadastrado (mesmo email/CPF ou currículo quase idêntico)
+ACOES_DUPLICADO = {
+    "avisar": "Avisar e não salvar",
+    "mesclar": "Mesclar com o cadastro existente",
+    "cadastrar": "Cadastrar mesmo assim",
+}
+
 # --- CARREGAMENTO DE RECURSOS (MODELO DE EMBEDDING) ---
 # O @st.cache_resource garante que o modelo seja carregado APENAS UMA VEZ.
 @st.cache_resource
 def carregar_modelo_embedding():
     """Carrega o modelo de embedding uma única vez."""
     try:
-        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        model = carregar_modelo(EMBEDDING_MODEL_NAME)
         st.success(f"Modelo de embedding '{EMBEDDING_MODEL_NAME}' carregado com sucesso.")
         return model
     except Exception as e:
@@ -48,62 +75,140 @@ MODELO_EMBEDDING_GLOBAL = carregar_modelo_embedding()
 
 # --- FUNÇÕES AUXILIARES ---
 
-# Use @st.cache_data para carregar dados JSON para a sessão
-@st.cache_data
-def carregar_dados_candidatos():
+def preparar_base_candidatos():
     """
-    Carrega os dados dos candidatos do arquivo JSON como uma lista de dicionários.
+    Importa o applicants.json para a base na primeira execução (ou se ele for alterado externamente).
+    Nas demais execuções custa apenas um stat no arquivo.
     """
-    if os.path.exists(ARQUIVO_CANDIDATOS):
-        with open(ARQUIVO_CANDIDATOS, "r", encoding="utf-8") as arquivo:
-            try:
-                data = json.load(arquivo)
-                if isinstance(data, list):
-                    return data
-                else:
-                    st.warning("O arquivo JSON de candidatos não está no formato de lista. Iniciando lista vazia.")
-                    return []
-            except json.JSONDecodeError:
-                st.warning("Arquivo JSON de candidatos vazio ou inválido. Iniciando lista vazia.")
-                return []
-    return []
-
-def salvar_dados_candidatos(dados):
+    situacao = sincronizar_base(DATA_DIR, CAMINHO_REGISTROS)
+    if situacao.get("candidatos") == "erro":
+        st.warning("Arquivo JSON de candidatos inválido. Os novos cadastros serão gravados apenas na base.")
+
+def salvar_candidatos(candidatos):
     """
-    Salva a lista de candidatos no arquivo JSON.
+    Grava novos candidatos na base em uma única transação, sem regravar o applicants.json.
     """
-    os.makedirs(os.path.dirname(ARQUIVO_CANDIDATOS) or ".", exist_ok=True)
-    with open(ARQUIVO_CANDIDATOS, "w", encoding="utf-8") as arquivo:
-        json.dump(dados, arquivo, indent=4, ensure_ascii=False)
+    inserir_registros("candidatos", candidatos, CAMINHO_REGISTROS)
 
-def gerar_proximo_id(dados):
+def gerar_proximos_ids(quantidade=1):
     """
-    Retorna o próximo id sequencial baseado no maior infos_basicas_codigo_profissional na lista.
+    Reserva os próximos códigos sequenciais de candidato (sequência persistida na base, sem varrer os registros).
     """
-    codigos = [
-        int(item.get("infos_basicas_codigo_profissional", 0))
-        for item in dados if str(item.get("infos_basicas_codigo_profissional", "")).isdigit()
-    ]
-    if not codigos:
-        return "10000" # Primeiro ID se a lista estiver vazia ou sem IDs válidos
-    return str(max(codigos) + 1)
-
-def adicionar_candidato_ao_indice(texto_candidato, candidato_id):
+    return [str(codigo) for codigo in reservar_ids("candidatos", quantidade, CAMINHO_REGISTROS)]
+
+def gerar_proximo_id():
+    """
+    Retorna o próximo infos_basicas_codigo_profissional sequencial.
+    """
+    return gerar_proximos_ids(1)[0]
+
+def gerar_embeddings(textos):
     """
-    Gera o embedding do texto do candidato e o adiciona ao índice FAISS.
+    Embeddings (float32) dos textos de candidatos, ou None se o modelo não foi carregado.
+    Textos idênticos (ex.: o mesmo currículo repetido no JSON importado) são codificados uma única vez.
     """
     if MODELO_EMBEDDING_GLOBAL is None:
+        return None
+    with medir("indexacao.encode"):
+        return codificar_textos_unicos(MODELO_EMBEDDING_GLOBAL, textos)[0]
+
+def carregar_indice_candidatos():
+    """Índice de candidatos atualizado pelo cadastro e seus metadados (ou (None, None) se ainda não existir)."""
+    if not (os.path.exists(INDEX_CANDIDATOS_PATH) and os.path.exists(METADADOS_CANDIDATOS_PATH)):
+        return None, None
+    with medir("indexacao.carregar_indice"):
+        return faiss.read_index(INDEX_CANDIDATOS_PATH), pd.read_pickle(METADADOS_CANDIDATOS_PATH)
+
+def descrever_duplicados(duplicados):
+    """Tabela dos cadastros semelhantes encontrados, para exibição."""
+    linhas = []
+    for item in duplicados:
+        registro = obter_registro("candidatos", item["id"], CAMINHO_REGISTROS) or {}
+        linhas.append({
+            "Código": item["id"],
+            "Nome": registro.get("infos_basicas_nome", ""),
+            "Email": registro.get("infos_basicas_email", ""),
+            "Motivo": ", ".join(item["motivos"]),
+            "Distância relativa": round(item["distancia"], 4) if item["distancia"] is not None else None,
+        })
+    return pd.DataFrame(linhas)
+
+def mesclar_candidato(id_existente, novo_candidato):
+    """
+    Mescla um cadastro novo no cadastro existente (mesmo código). O vetor do índice do cadastro não é
+    trocado aqui: o texto atualizado entra nos índices por modelo no próximo build incremental (gerar_tudo).
+    """
+    existente = obter_registro("candidatos", id_existente, CAMINHO_REGISTROS)
+    if existente is None:
+        raise KeyError(f"Candidato {id_existente} não encontrado na base.")
+    mesclado = mesclar_registros(existente, novo_candidato)
+    mesclado["infos_basicas_data_atualizacao"] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    atualizar_registro("candidatos", id_existente, mesclado, CAMINHO_REGISTROS)
+    return mesclado
+
+def triar_importacao(candidatos, embeddings, acao):
+    """
+    Separa os candidatos de um arquivo importado em novos e duplicados (de um cadastro existente ou de um
+    item anterior do próprio arquivo) e aplica a ação escolhida aos duplicados.
+
+    Returns:
+        tuple: (posições dos candidatos a gravar como novos, linhas do relatório de duplicados)
+    """
+    index, metadados = carregar_indice_candidatos()
+    aceitos = []            # posições no arquivo dos candidatos gravados como novos
+    chaves_aceitas = {}     # chave exata -> posição no arquivo
+    index_arquivo = None    # vetores dos candidatos aceitos, na ordem de 'aceitos'
+    relatorio = []
+    for i, candidato in enumerate(candidatos):
+        vetor = embeddings[i] if embeddings is not None else None
+        duplicados = procurar_duplicados(candidato, vetor, index, metadados, caminho_base=CAMINHO_REGISTROS)
+        no_arquivo = {chaves_aceitas[chave] for chave in chaves_registro("candidatos", candidato) if chave in chaves_aceitas}
+        if vetor is not None and index_arquivo is not None:
+            no_arquivo.update(aceitos[posicao] for posicao, _ in vizinhos_no_raio(index_arquivo, vetor))
+
+        if duplicados or no_arquivo:
+            semelhante = duplicados[0]["id"] if duplicados else f"item {min(no_arquivo) + 1} do arquivo"
+            relatorio.append({"Item": i + 1, "Nome": candidato.get("infos_basicas_nome", ""), "Semelhante a": semelhante,
+                              "Motivo": ", ".join(duplicados[0]["motivos"]) if duplicados else "repetido no arquivo",
+                              "Ação": ACOES_DUPLICADO[acao]})
+            if acao == "mesclar":
+                if duplicados:
+                    mesclar_candidato(duplicados[0]["id"], candidato)
+                else:
+                    candidatos[min(no_arquivo)] = mesclar_registros(candidatos[min(no_arquivo)], candidato)
+            if acao != "cadastrar":
+                continue
+
+        aceitos.append(i)
+        for chave in chaves_registro("candidatos", candidato):
+            chaves_aceitas.setdefault(chave, i)
+        if vetor is not None:
+            if index_arquivo is None:
+                index_arquivo = faiss.IndexFlatL2(vetor.shape[0])
+            index_arquivo.add(vetor.reshape(1, -1))
+    return aceitos, relatorio
+
+@cronometrar("indexacao_candidato")
+def adicionar_candidato_ao_indice(texto_candidato, candidato_id, embedding=None):
+    """
+    Gera o embedding do texto do candidato (se não foi informado) e o adiciona ao índice FAISS.
+    """
+    if not texto_candidato and embedding is None:
+        return "⚠️ Candidato sem texto útil para o índice vetorial: gravado na base, mas não indexado."
+    if MODELO_EMBEDDING_GLOBAL is None and embedding is None:
         return "❌ Erro: Modelo de embedding não carregado. Não foi possível adicionar o candidato ao índice."
 
     try:
-        embedding = MODELO_EMBEDDING_GLOBAL.encode([texto_candidato])[0].astype(np.float32)
+        if embedding is None:
+            embedding = gerar_embeddings([texto_candidato])[0]
 
         # Cria o diretório 'models1' (ou 'models') se não existir
         os.makedirs(os.path.dirname(INDEX_CANDIDATOS_PATH) or ".", exist_ok=True)
 
         if os.path.exists(INDEX_CANDIDATOS_PATH) and os.path.exists(METADADOS_CANDIDATOS_PATH):
-            index = faiss.read_index(INDEX_CANDIDATOS_PATH)
-            metadados = pd.read_pickle(METADADOS_CANDIDATOS_PATH)
+            with medir("indexacao.carregar_indice"):
+                index = faiss.read_index(INDEX_CANDIDATOS_PATH)
+                metadados = pd.read_pickle(METADADOS_CANDIDATOS_PATH)
             # Para evitar duplicatas no metadado, se o candidato_id já existe,
             # você pode remover a entrada antiga e adicionar a nova, ou apenas sobrescrever.
             # No contexto de cadastro, um novo ID significa uma nova entrada, então apenas adicionamos.
@@ -118,8 +223,22 @@ def adicionar_candidato_ao_indice(texto_candidato, candidato_id):
         novo_metadado = pd.DataFrame([{"id_original": candidato_id, "faiss_id": faiss_internal_id}])
         metadados = pd.concat([metadados, novo_metadado], ignore_index=True)
 
-        faiss.write_index(index, INDEX_CANDIDATOS_PATH)
-        metadados.to_pickle(METADADOS_CANDIDATOS_PATH)
+        versao_anterior = versao_indice(caminhos_indice(APELIDO_LEGADO, "candidatos", MODELS_DIR))
+        # Grava em arquivos temporários e troca com os.replace: o thread de recarga da busca nunca lê um índice pela metade
+        with medir("indexacao.salvar_indice"):
+            faiss.write_index(index, INDEX_CANDIDATOS_PATH + ".tmp")
+            metadados.to_pickle(METADADOS_CANDIDATOS_PATH + ".tmp")
+            os.replace(INDEX_CANDIDATOS_PATH + ".tmp", INDEX_CANDIDATOS_PATH)
+            os.replace(METADADOS_CANDIDATOS_PATH + ".tmp", METADADOS_CANDIDATOS_PATH)
+        # Cópia crua do vetor no armazém, para reconstruir qualquer tipo de índice sem recodificar
+        acompanhar_indice(APELIDO_LEGADO, "candidatos", EMBEDDING_MODEL_NAME, index, metadados["id_original"], embedding, [candidato_id], MODELS_DIR,
+                          backend=backend_do_modelo(MODELO_EMBEDDING_GLOBAL), hashes_novos=[hash_texto(texto_candidato)])
+        # Novo vetor entra no pool de talentos mais próximo (se o agrupamento já foi gerado)
+        atribuir_novo(APELIDO_LEGADO, "candidatos", candidato_id, embedding, MODELS_DIR)
+        # Entra nas listas top-K materializadas das vagas em que supera o pior candidato guardado
+        inserir_candidato_topk(APELIDO_LEGADO, candidato_id, embedding, versao_anterior,
+                               versao_indice(caminhos_indice(APELIDO_LEGADO, "candidatos", MODELS_DIR)), MODELS_DIR)
+        solicitar_recarga()
         return "✅ Candidato adicionado ao índice vetorial com sucesso!"
     except Exception as e:
         st.error(f"❌ Erro ao adicionar ao índice vetorial: {e}")
@@ -129,7 +248,7 @@ def adicionar_candidato_ao_indice(texto_candidato, candidato_id):
 def cadastro_candidatos():
     st.title("📋 Cadastro de Candidatos")
 
-    dados_candidatos = carregar_dados_candidatos()
+    preparar_base_candidatos()
 
     with st.form("formulario_cadastro"):
         st.subheader("Informações Básicas")
@@ -151,6 +270,9 @@ def cadastro_candidatos():
 
         cv_pt = st.text_area("Resumo/CV em Português *")
 
+        acao_duplicado = st.radio("Se já houver cadastro semelhante", list(ACOES_DUPLICADO),
+                                  format_func=ACOES_DUPLICADO.get, horizontal=True)
+
         submitted = st.form_submit_button("Salvar Candidato")
 
         if submitted:
@@ -159,7 +281,6 @@ def cadastro_candidatos():
                 st.error("⚠️ Preencha todos os campos obrigatórios (*)")
                 return
 
-            codigo_candidato = gerar_proximo_id(dados_candidatos)
             agora = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
 
             novo_candidato = {
@@ -172,7 +293,7 @@ def cadastro_candidatos():
                 "infos_basicas_local": local,
                 "infos_basicas_sabendo_de_nos_por": "",
                 "infos_basicas_data_atualizacao": agora,
-                "infos_basicas_codigo_profissional": codigo_candidato,
+                "infos_basicas_codigo_profissional": None, # Reservado só se o cadastro for gravado como novo
                 "infos_basicas_nome": nome,
 
                 "informacoes_pessoais_data_aceite": "Cadastro via Streamlit",
@@ -227,21 +348,36 @@ def cadastro_candidatos():
                 "cv_en": "" # Assumindo que CV em inglês não é cadastrado aqui
             }
 
-            dados_candidatos.append(novo_candidato)
-            salvar_dados_candidatos(dados_candidatos)
-
             # Preparar texto para embedding
             from gerar_tudo import extrair_texto_candidato # Importa aqui para ter certeza que está disponível
             texto_para_embedding = extrair_texto_candidato(novo_candidato)
-
-            resultado_faiss = adicionar_candidato_ao_indice(texto_para_embedding, codigo_candidato)
+            embeddings = gerar_embeddings([texto_para_embedding])
+            embedding = embeddings[0] if embeddings is not None else None
+
+            # Mesmo email/CPF ou currículo quase idêntico a um cadastro existente
+            index, metadados = carregar_indice_candidatos()
+            duplicados = procurar_duplicados(novo_candidato, embedding, index, metadados, caminho_base=CAMINHO_REGISTROS)
+            if duplicados:
+                st.warning(f"⚠️ {len(duplicados)} cadastro(s) semelhante(s) encontrado(s):")
+                st.dataframe(descrever_duplicados(duplicados), hide_index=True)
+                if acao_duplicado == "avisar":
+                    st.info("Cadastro não salvo. Escolha 'Mesclar' ou 'Cadastrar mesmo assim' e envie novamente.")
+                    return
+                if acao_duplicado == "mesclar":
+                    id_existente = duplicados[0]["id"]
+                    mesclar_candidato(id_existente, novo_candidato)
+                    st.success(f"✅ Cadastro mesclado ao candidato existente. Código: {id_existente}")
+                    return
+
+            codigo_candidato = gerar_proximo_id()
+            novo_candidato["infos_basicas_codigo_profissional"] = codigo_candidato
+            salvar_candidatos([novo_candidato])
+
+            resultado_faiss = adicionar_candidato_ao_indice(texto_para_embedding, codigo_candidato, embedding)
 
             st.success(f"✅ Candidato cadastrado com sucesso! Código: {codigo_candidato}")
             st.info(resultado_faiss)
 
-            # Limpa o cache para que a lista de candidatos seja recarregada na próxima execução da página
-            carregar_dados_candidatos.clear()
-
     # --- Seção de importação via JSON ---
     st.divider()
     st.markdown("### 📁 Cadastro via arquivo JSON")
@@ -275,6 +411,9 @@ def cadastro_candidatos():
             file_name="modelo_candidato.json",
             mime="application/json"
         )
+    acao_importacao = st.radio("Candidatos já cadastrados ou repetidos no arquivo", list(ACOES_DUPLICADO),
+                               format_func=lambda acao: "Ignorar (não importar)" if acao == "avisar" else ACOES_DUPLICADO[acao],
+                               horizontal=True, key="acao_duplicado_importacao")
 
     if uploaded_file:
         try:
@@ -282,14 +421,11 @@ def cadastro_candidatos():
             if not isinstance(arquivo_json, list):
                 st.error("O arquivo deve conter uma lista de candidatos.")
                 return
-            
-            dados_candidatos_atuais = carregar_dados_candidatos() # Pega a lista mais atualizada
-            max_id_atual = gerar_proximo_id(dados_candidatos_atuais) # Pega o próximo ID para começar
 
             novos_candidatos_importados = []
             for cand_dict in arquivo_json:
-                # Gera um novo ID e atribui
-                cand_dict["infos_basicas_codigo_profissional"] = max_id_atual
+                # O novo ID é atribuído depois da triagem de duplicados
+                cand_dict["infos_basicas_codigo_profissional"] = None
                 # Define datas de criação/atualização
                 agora = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
                 cand_dict["infos_basicas_data_criacao"] = agora
@@ -336,21 +472,37 @@ def cadastro_candidatos():
                         cand_dict["informacoes_pessoais_data_nascimento"] = "" # Ou o que for mais apropriado
                 
                 novos_candidatos_importados.append(cand_dict)
-                max_id_atual = str(int(max_id_atual) + 1) # Incrementa o ID para o próximo candidato
-            
-            # Adiciona os novos candidatos à lista existente e salva
-            dados_candidatos_atuais.extend(novos_candidatos_importados)
-            salvar_dados_candidatos(dados_candidatos_atuais)
-
-            # Processa cada novo candidato para adicionar ao índice FAISS
-            for candidato in novos_candidatos_importados:
-                from gerar_tudo import extrair_texto_candidato # Importa aqui para ter certeza que está disponível
-                texto_para_embedding = extrair_texto_candidato(candidato)
-                adicionar_candidato_ao_indice(texto_para_embedding, candidato["infos_basicas_codigo_profissional"])
-
-            st.success(f"✅ {len(novos_candidatos_importados)} candidato(s) importado(s) e adicionado(s) com sucesso!")
-            # Limpa o cache para que a lista de candidatos seja recarregada
-            carregar_dados_candidatos.clear()
+
+            from gerar_tudo import extrair_texto_candidato # Importa aqui para ter certeza que está disponível
+            textos = [extrair_texto_candidato(candidato) for candidato in novos_candidatos_importados]
+            embeddings = gerar_embeddings(textos) if textos else None
+
+            # Duplicados (da base ou do próprio arquivo) são ignorados, mesclados ou importados conforme a escolha
+            aceitos, relatorio_duplicados = triar_importacao(novos_candidatos_importados, embeddings, acao_importacao)
+            if relatorio_duplicados:
+                st.warning(f"⚠️ {len(relatorio_duplicados)} candidato(s) do arquivo semelhante(s) a cadastros existentes:")
+                st.dataframe(pd.DataFrame(relatorio_duplicados), hide_index=True)
+
+            # Um código novo para cada candidato aceito
+            for posicao, codigo in zip(aceitos, gerar_proximos_ids(len(aceitos)) if aceitos else []):
+                novos_candidatos_importados[posicao]["infos_basicas_codigo_profissional"] = codigo
+
+            # Grava os novos candidatos na base
+            if aceitos:
+                salvar_candidatos([novos_candidatos_importados[posicao] for posicao in aceitos])
+
+            # Processa cada novo candidato para adicionar ao índice FAISS (registros sem texto útil ficam só na base)
+            sem_texto = sum(not textos[posicao] for posicao in aceitos)
+            if sem_texto:
+                st.warning(f"⚠️ {sem_texto} candidato(s) sem texto útil para o índice vetorial: gravado(s) na base, mas não indexado(s).")
+            for posicao in aceitos:
+                if not textos[posicao]:
+                    continue
+                candidato = novos_candidatos_importados[posicao]
+                adicionar_candidato_ao_indice(textos[posicao], candidato["infos_basicas_codigo_profissional"],
+                                              embeddings[posicao] if embeddings is not None else None)
+
+            st.success(f"✅ {len(aceitos)} candidato(s) importado(s) e adicionado(s) com sucesso!")
             
         except json.JSONDecodeError:
             st.error("Erro ao decodificar o arquivo JSON. Certifique-se de que é um JSON válido.")
@@ -1,9 +1,26 @@
+import os
+import sys
+
+embeddings_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'embeddings'))
+
+# Adiciona o caminho ao sys.path se ainda não estiver lá
+if embeddings_path not in sys.path:
+    sys.path.insert(0, embeddings_path) # Usar insert(0, ...) para dar prioridade
+
 import streamlit as st
 import json
-import os
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+from backend_inferencia import carregar_modelo, backend_do_modelo
+from instrumentacao import medir, cronometrar
+from recarga_indices import solicitar_recarga, obter_snapshot
+from registro_indices import APELIDO_LEGADO
+from armazem_vetores import acompanhar_indice
+from build_incremental import codificar_textos_unicos, hash_texto
+from busca_vagas import CHAVE_RECURSO as CHAVE_BUSCA_VAGAS, adicionar_vaga
+from agrupamento import atribuir_novo
+from tabela_topk import inserir_vaga as inserir_vaga_topk
+from repositorio_registros import sincronizar_base, reservar_ids, inserir_registros
 import pandas as pd
 
 # --- CONFIGURAÇÕES E CAMINHOS ---
@@ -11,13 +28,15 @@ import pandas as pd
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Pastas de dados e modelos (um nível acima de app_pages/)
-DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(BASE_DIR, '..', 'data'))
 # ATENÇÃO: Verifique se sua pasta no repositório é 'models' ou 'models1'
 # Mantenha a consistência com 'servicos.py'. Vou usar 'models1' como exemplo, ajuste se for diferente.
-MODELS_DIR = os.path.join(BASE_DIR, '..', 'models1') # AJUSTADO: CONSISTÊNCIA COM servicos.py
+MODELS_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1')) # AJUSTADO: CONSISTÊNCIA COM servicos.py
 
 # Caminhos dos arquivos
 ARQUIVO_VAGAS = os.path.join(DATA_DIR, 'vagas.json')
+# Base SQLite onde os cadastros são gravados (vagas.json é regravado por exportar_pendentes)
+CAMINHO_REGISTROS = os.path.join(DATA_DIR, 'registros.sqlite')
 # AJUSTADO: Caminhos dos índices e metadados para corresponder aos modelos de vagas
 INDEX_VAGAS_PATH = os.path.join(MODELS_DIR, 'index_vagas.faiss')
 METADADOS_VAGAS_PATH = os.path.join(MODELS_DIR, 'vagas_metadados.pkl')
@@ -38,7 +57,7 @@ CAMPOS_OBRIGATORIOS = [
 def carregar_modelo_embedding():
     """Carrega o modelo de embedding uma única vez."""
     try:
-        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        model = carregar_modelo(EMBEDDING_MODEL_NAME)
         st.success(f"Modelo de embedding '{EMBEDDING_MODEL_NAME}' carregado com sucesso.")
         return model
     except Exception as e:
@@ -50,68 +69,59 @@ MODELO_EMBEDDING_GLOBAL = carregar_modelo_embedding()
 
 # --- FUNÇÕES AUXILIARES ---
 
-@st.cache_data # Use st.cache_data para carregar dados JSON para a sessão
-def carregar_vagas():
+def preparar_base_vagas():
     """
-    Carrega as vagas do arquivo JSON como uma lista de dicionários.
+    Importa o vagas.json para a base na primeira execução (ou se ele for alterado externamente).
+    Nas demais execuções custa apenas um stat no arquivo.
     """
-    if os.path.exists(ARQUIVO_VAGAS):
-        with open(ARQUIVO_VAGAS, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
-                else:
-                    st.warning("O arquivo JSON de vagas não está no formato de lista. Iniciando lista vazia.")
-                    return []
-            except json.JSONDecodeError:
-                st.warning("Arquivo JSON de vagas vazio ou inválido. Iniciando lista vazia.")
-                return []
-    return []
+    situacao = sincronizar_base(DATA_DIR, CAMINHO_REGISTROS)
+    if situacao.get("vagas") == "erro":
+        st.warning("Arquivo JSON de vagas inválido. As novas vagas serão gravadas apenas na base.")
 
 def salvar_vagas(vagas):
     """
-    Salva a lista de vagas no arquivo JSON mantendo o formato lista.
+    Grava novas vagas na base em uma única transação, sem regravar o vagas.json.
+    """
+    inserir_registros("vagas", vagas, CAMINHO_REGISTROS)
+    # A busca rápida da página de serviços passa a encontrar as vagas sem esperar a próxima geração do índice
+    snapshot = obter_snapshot(CHAVE_BUSCA_VAGAS)
+    if snapshot is not None and snapshot["dados"] is not None:
+        for vaga in vagas:
+            adicionar_vaga(snapshot["dados"], vaga["id_vaga"], vaga)
+
+def proximos_ids(quantidade=1):
     """
-    # Cria o diretório 'data' se não existir
-    os.makedirs(os.path.dirname(ARQUIVO_VAGAS) or ".", exist_ok=True)
-    with open(ARQUIVO_VAGAS, "w", encoding="utf-8") as f:
-        json.dump(vagas, f, indent=4, ensure_ascii=False)
+    Reserva os próximos id_vaga sequenciais (sequência persistida na base, sem varrer as vagas).
+    """
+    return reservar_ids("vagas", quantidade, CAMINHO_REGISTROS)
 
-def proximo_id(vagas):
+def proximo_id():
     """
-    Retorna o próximo id sequencial baseado no maior id_vaga na lista.
+    Retorna o próximo id_vaga sequencial.
     """
-    if not vagas:
-        return 5000
-    ids = [vaga.get("id_vaga", 0) for vaga in vagas if isinstance(vaga.get("id_vaga"), (int, str))] # Permite int ou str para ids
-    # Tenta converter IDs para int para encontrar o máximo
-    numeric_ids = []
-    for id_val in ids:
-        try:
-            numeric_ids.append(int(id_val))
-        except (ValueError, TypeError):
-            continue # Ignora IDs não numéricos ou nulos
-    
-    if not numeric_ids:
-        return 5000 # Se não encontrar IDs numéricos, começa do 5000
-    return max(numeric_ids) + 1
+    return proximos_ids(1)[0]
 
 
-def adicionar_vaga_ao_indice(texto, vaga_id):
-    if MODELO_EMBEDDING_GLOBAL is None:
+@cronometrar("indexacao_vaga")
+def adicionar_vaga_ao_indice(texto, vaga_id, embedding=None):
+    if not texto and embedding is None:
+        return "⚠️ Vaga sem texto útil para o índice vetorial: gravada na base, mas não indexada."
+    if MODELO_EMBEDDING_GLOBAL is None and embedding is None:
         return "❌ Erro: Modelo de embedding não carregado. Não foi possível adicionar a vaga ao índice."
 
     try:
-        embedding = MODELO_EMBEDDING_GLOBAL.encode([texto])[0].astype(np.float32)
+        if embedding is None:
+            with medir("indexacao.encode"):
+                embedding = MODELO_EMBEDDING_GLOBAL.encode([texto])[0].astype(np.float32)
 
         # Cria o diretório 'models1' (ou 'models') se não existir
         os.makedirs(os.path.dirname(INDEX_VAGAS_PATH) or ".", exist_ok=True)
 
         # Carrega o índice e metadados existentes ou cria novos
         if os.path.exists(INDEX_VAGAS_PATH) and os.path.exists(METADADOS_VAGAS_PATH):
-            index = faiss.read_index(INDEX_VAGAS_PATH)
-            metadados = pd.read_pickle(METADADOS_VAGAS_PATH)
+            with medir("indexacao.carregar_indice"):
+                index = faiss.read_index(INDEX_VAGAS_PATH)
+                metadados = pd.read_pickle(METADADOS_VAGAS_PATH)
             # Verifica se o ID original já existe no DataFrame de metadados
             if vaga_id in metadados['id_original'].values:
                 st.warning(f"Vaga com ID {vaga_id} já existe no índice. Sobrescrevendo o embedding existente (se houver).")
@@ -139,8 +149,20 @@ def adicionar_vaga_ao_indice(texto, vaga_id):
         metadados = pd.concat([metadados, novo_metadado], ignore_index=True)
 
         # Salva o índice e os metadados
-        faiss.write_index(index, INDEX_VAGAS_PATH)
-        metadados.to_pickle(METADADOS_VAGAS_PATH)
+        # Grava em arquivos temporários e troca com os.replace: o thread de recarga da busca nunca lê um índice pela metade
+        with medir("indexacao.salvar_indice"):
+            faiss.write_index(index, INDEX_VAGAS_PATH + ".tmp")
+            metadados.to_pickle(METADADOS_VAGAS_PATH + ".tmp")
+            os.replace(INDEX_VAGAS_PATH + ".tmp", INDEX_VAGAS_PATH)
+            os.replace(METADADOS_VAGAS_PATH + ".tmp", METADADOS_VAGAS_PATH)
+        # Cópia crua do vetor no armazém, para reconstruir qualquer tipo de índice sem recodificar
+        acompanhar_indice(APELIDO_LEGADO, "vagas", EMBEDDING_MODEL_NAME, index, metadados["id_original"], embedding, [vaga_id], MODELS_DIR,
+                          backend=backend_do_modelo(MODELO_EMBEDDING_GLOBAL), hashes_novos=[hash_texto(texto)])
+        # Novo vetor entra no pool de talentos mais próximo (se o agrupamento já foi gerado)
+        atribuir_novo(APELIDO_LEGADO, "vagas", vaga_id, embedding, MODELS_DIR)
+        # Lista top-K da nova vaga já materializada (se a tabela existir)
+        inserir_vaga_topk(APELIDO_LEGADO, vaga_id, embedding, MODELS_DIR)
+        solicitar_recarga()
         return "✅ Vaga adicionada ao índice vetorial com sucesso!"
     except Exception as e:
         st.error(f"❌ Erro ao adicionar ao índice vetorial: {e}")
@@ -151,8 +173,8 @@ def adicionar_vaga_ao_indice(texto, vaga_id):
 def cadastro_vagas():
     st.title("📝 Cadastro de Vagas")
 
-    # Carrega as vagas. Como é uma função com st.cache_data, só carrega uma vez.
-    vagas = carregar_vagas()
+    # Garante que a base de vagas está importada (só relê o vagas.json se ele mudou)
+    preparar_base_vagas()
 
     with st.form("form_vaga"):
         with st.container():
@@ -195,7 +217,7 @@ def cadastro_vagas():
                 st.error(f"❌ Preencha os campos obrigatórios: {', '.join(faltando)}")
                 return
 
-            vaga_id = proximo_id(vagas)
+            vaga_id = proximo_id()
 
             nova_vaga = {
                 "id_vaga": vaga_id,
@@ -246,8 +268,7 @@ def cadastro_vagas():
                 "benef_valor_compra_2": ""
             }
 
-            vagas.append(nova_vaga)     # adiciona na lista
-            salvar_vagas(vagas)         # salva no arquivo
+            salvar_vagas([nova_vaga])   # grava na base
 
             # Preparar texto para embedding (todos os valores concatenados)
             # Use extrair_texto_vaga do seu módulo gerar_tudo para consistência
@@ -298,36 +319,31 @@ def cadastro_vagas():
                 st.error("O arquivo deve conter uma lista de vagas.")
                 return
             
-            # Recarrega as vagas para ter a lista mais atualizada antes de adicionar
-            # Não é necessário carregar novamente se 'vagas' já está no escopo do cadastro_vagas()
-            # e foi carregado por carregar_vagas() no início da função.
-            # O problema é se o Streamlit roda a página e a função carregar_vagas() com cache_data
-            # não reflete imediatamente o arquivo salvo.
-            # Para uploads, geralmente a página é re-executada, então o cache pode precisar ser limpo.
-            # No entanto, salvar_vagas() já atualiza o arquivo.
-            # Para garantir, vou manter o cache_data na função carregar_vagas.
-
-            max_id_atual = proximo_id(vagas) - 1 # Pega o último ID antes de adicionar os novos
-
             novas_vagas = []
-            for vaga in arquivo_json:
+            for vaga, vaga_id in zip(arquivo_json, proximos_ids(len(arquivo_json))):
                 # Ajusta id_vaga para evitar duplicidade e garantir sequência única
-                max_id_atual += 1
-                vaga["id_vaga"] = max_id_atual
+                vaga["id_vaga"] = vaga_id
                 novas_vagas.append(vaga)
 
-            vagas.extend(novas_vagas)
-            salvar_vagas(vagas) # Salva todas as vagas, incluindo as novas
+            salvar_vagas(novas_vagas) # Grava apenas as novas vagas na base
 
             # Processa cada nova vaga para adicionar ao índice FAISS
-            for vaga in novas_vagas:
-                # Use extrair_texto_vaga do seu módulo gerar_tudo para consistência
-                texto_para_embedding = extrair_texto_vaga(vaga)
-                adicionar_vaga_ao_indice(texto_para_embedding, vaga["id_vaga"])
+            # Use extrair_texto_vaga do seu módulo gerar_tudo para consistência
+            textos = [extrair_texto_vaga(vaga) for vaga in novas_vagas]
+            embeddings = None
+            if MODELO_EMBEDDING_GLOBAL is not None and textos:
+                # Vagas reimportadas costumam repetir o texto: cada texto distinto é codificado uma única vez
+                with medir("indexacao.encode"):
+                    embeddings, _ = codificar_textos_unicos(MODELO_EMBEDDING_GLOBAL, textos)
+            sem_texto = sum(not texto for texto in textos)
+            if sem_texto:
+                st.warning(f"⚠️ {sem_texto} vaga(s) sem texto útil para o índice vetorial: gravada(s) na base, mas não indexada(s).")
+            for i, (vaga, texto_para_embedding) in enumerate(zip(novas_vagas, textos)):
+                if not texto_para_embedding:
+                    continue
+                adicionar_vaga_ao_indice(texto_para_embedding, vaga["id_vaga"], embeddings[i] if embeddings is not None else None)
 
             st.success(f"✅ {len(novas_vagas)} vagas importadas e adicionadas com sucesso!")
-            # Limpa o cache para que a lista de vagas seja recarregada na próxima execução da página
-            carregar_vagas.clear() # Limpa o cache da função carregar_vagas()
             
         except Exception as e:
             st.error(f"Erro ao importar arquivo JSON: {e}")
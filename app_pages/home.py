@@ -1,52 +1,73 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import numpy as np
 import os
+import sys
+
+embeddings_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'embeddings'))
+
+# Adiciona o caminho ao sys.path se ainda não estiver lá
+if embeddings_path not in sys.path:
+    sys.path.insert(0, embeddings_path) # Usar insert(0, ...) para dar prioridade
+
+from repositorio_registros import sincronizar_base, iniciar_exportacao, versao_base, iterar_registros, listar_prospects, contar_registros
+from versoes_dados import registrar_versao
+from registro_indices import APELIDO_LEGADO
+from agrupamento import ler_manifesto_pools
+
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(os.path.dirname(__file__), '..', 'data'))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(os.path.dirname(__file__), '..', 'models1'))
+# Base SQLite com os cadastros (fonte de verdade); os JSON de data/ são exportados dela em segundo plano
+CAMINHO_REGISTROS = os.path.join(DATA_DIR, "registros.sqlite")
+# Pools exibidos no dashboard: os do modelo usado nas buscas
+APELIDO_POOLS = os.environ.get("DECISION_MODELO_BUSCA", APELIDO_LEGADO)
+
+def versao_dashboard():
+    """
+    Identifica a versão atual dos dados do dashboard (contador de alterações de cada entidade na base SQLite).
+    JSON alterados fora da aplicação são importados antes (um stat por arquivo quando nada mudou); a
+    exportação dos cadastros para os JSON roda em segundo plano, fora da renderização da página.
+    """
+    sincronizar_base(DATA_DIR, CAMINHO_REGISTROS)
+    iniciar_exportacao(DATA_DIR, CAMINHO_REGISTROS)
+    versao = versao_base(["vagas", "prospects", "candidatos"], CAMINHO_REGISTROS)
+    registrar_versao("dashboard", versao)
+    return versao
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
-
-@st.cache_data
 def load_data():
     try:
-        # Certifique-se de que 'applicants.json' também está na pasta 'data/'
-        vagas_path = os.path.join(DATA_DIR, "vagas.json")
-        prospects_path = os.path.join(DATA_DIR, "prospects.json")
-        applicants_path = os.path.join(DATA_DIR, "applicants.json") # Novo path para applicants.json
-
-        # Verificação adicional para garantir que os arquivos existem antes de tentar ler
-        if not os.path.exists(vagas_path):
-            st.error(f"❌ Erro: Arquivo 'vagas.json' não encontrado em {vagas_path}")
-            st.stop()
-        if not os.path.exists(prospects_path):
-            st.error(f"❌ Erro: Arquivo 'prospects.json' não encontrado em {prospects_path}")
-            st.stop()
-        if not os.path.exists(applicants_path):
-            st.error(f"❌ Erro: Arquivo 'applicants.json' não encontrado em {applicants_path}")
-            st.stop()
-
-        # Carrega os DataFrames
-        df_vagas = pd.read_json(vagas_path, orient='records')
-        df_prospects = pd.read_json(prospects_path, orient='records')
-        df_applicants = pd.read_json(applicants_path, orient='records') # Carrega applicants.json
+        # Verificação adicional para garantir que a base tem dados antes de montar os DataFrames
+        for entidade, arquivo in (("vagas", "vagas.json"), ("prospects", "prospects.json"), ("candidatos", "applicants.json")):
+            if contar_registros(entidade, CAMINHO_REGISTROS) == 0:
+                st.error(f"❌ Erro: Nenhum registro de {entidade} na base. Verifique o arquivo '{arquivo}' em {DATA_DIR}")
+                st.stop()
+
+        # Carrega os DataFrames a partir da base (inclui cadastros ainda não exportados para os JSON)
+        df_vagas = pd.DataFrame([vaga for _, vaga in iterar_registros("vagas", CAMINHO_REGISTROS)])
+        df_prospects = pd.DataFrame(listar_prospects(caminho=CAMINHO_REGISTROS))
+        df_applicants = pd.DataFrame([candidato for _, candidato in iterar_registros("candidatos", CAMINHO_REGISTROS)])
 
         return df_vagas, df_prospects, df_applicants
-    except FileNotFoundError as e:
-        st.error(f"❌ Erro ao carregar arquivos JSON: {e}")
-        st.stop()
     except Exception as e:
         st.error(f"❌ Ocorreu um erro inesperado ao carregar os dados: {e}")
         st.stop()
 
-# Chama a função para carregar os dados
-vagas, prospects, applicants = load_data()
-
-
-# --- DASHBOARD ---
-def home():
-    st.title("💼 Dashboard de Vagas e Candidatos")
-
-    # Mantenha o restante do seu código de dashboard inalterado aqui
-    # ... todo o código de transformação e visualização do dashboard ...
+def _coluna_texto(df, coluna):
+    """Coluna como texto sem espaços nas pontas ('' para ausentes), mesmo que não exista no arquivo."""
+    if coluna not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[coluna].fillna('').astype(str).str.strip()
+
+# A base só é relida e os agregados só são recalculados quando alguma entidade muda (versao_dashboard);
+# nos reruns do Streamlit a página apenas desenha as tabelas já prontas.
+@st.cache_data(max_entries=1)
+def calcular_agregados(versao):
+    """
+    Calcula, com operações vetorizadas, todas as métricas e tabelas exibidas no dashboard.
+    'versao' (de versao_dashboard) é a chave do cache.
+    """
+    vagas, prospects, applicants = load_data()
 
     df_vagas = vagas.rename(columns={
         "id_vaga": "vaga_id",
@@ -59,25 +80,46 @@ def home():
     df_vagas['cliente'] = df_vagas['cliente'].fillna('Não Informado')
     df_vagas['recrutador'] = df_vagas['recrutador'].fillna('Não Informado')
 
-    def construir_idioma(row):
-        idiomas = []
-        if pd.notna(row.get('nivel_ingles')) and row['nivel_ingles'].strip() != '':
-            idiomas.append('Inglês')
-        if pd.notna(row.get('nivel_espanhol')) and row['nivel_espanhol'].strip() != '':
-            idiomas.append('Espanhol')
-        return ', '.join(idiomas) if idiomas else ''
+    exige_ingles = (_coluna_texto(df_vagas, 'nivel_ingles') != '').to_numpy()
+    exige_espanhol = (_coluna_texto(df_vagas, 'nivel_espanhol') != '').to_numpy()
+    df_vagas['idioma'] = np.select(
+        [exige_ingles & exige_espanhol, exige_ingles, exige_espanhol],
+        ['Inglês, Espanhol', 'Inglês', 'Espanhol'],
+        default=''
+    )
 
-    df_vagas['idioma'] = df_vagas.apply(construir_idioma, axis=1)
+    candidatos_por_vaga = prospects['id_vaga'].value_counts()
+    df_vagas['candidatos'] = df_vagas['vaga_id'].map(candidatos_por_vaga).fillna(0).astype(int)
 
-    candidatos_por_vaga = prospects.groupby('id_vaga').size().reset_index(name='candidatos')
-    df_vagas = df_vagas.merge(candidatos_por_vaga, how='left', left_on='vaga_id', right_on='id_vaga')
-    df_vagas['candidatos'] = df_vagas['candidatos'].fillna(0).astype(int)
+    vagas_por_recrutador = df_vagas['recrutador'].value_counts().reset_index()
+    vagas_por_recrutador.columns = ['Recrutador', 'Quantidade']
+    vagas_por_cliente = df_vagas['cliente'].value_counts().reset_index()
+    vagas_por_cliente.columns = ['Cliente', 'Quantidade']
 
-    total_vagas = df_vagas['vaga_id'].nunique()
-    # Lembre-se que 'applicants' (candidatos_originais) agora está disponível
-    # se você quiser usar os dados de 'applicants' para o total de candidatos,
-    # em vez de somar os prospects por vaga.
-    total_candidatos_reais = applicants['infos_basicas_codigo_profissional'].nunique() # Se cada linha é um candidato único
+    # Vagas que pedem os dois idiomas contam para ambos
+    idiomas_df = pd.DataFrame({
+        'Idioma': ['Inglês', 'Espanhol', 'Nenhum'],
+        'Quantidade': [int(exige_ingles.sum()), int(exige_espanhol.sum()), int((~exige_ingles & ~exige_espanhol).sum())]
+    })
+
+    return {
+        "total_vagas": int(df_vagas['vaga_id'].nunique()),
+        # Se cada linha é um candidato único
+        "total_candidatos": int(applicants['infos_basicas_codigo_profissional'].nunique()),
+        "vagas_por_recrutador": vagas_por_recrutador,
+        "vagas_por_cliente": vagas_por_cliente,
+        "idiomas": idiomas_df,
+        "tabela_vagas": df_vagas[['vaga_id', 'cliente', 'recrutador', 'idioma', 'candidatos']],
+    }
+
+
+# --- DASHBOARD ---
+def home():
+    st.title("💼 Dashboard de Vagas e Candidatos")
+
+    agregados = calcular_agregados(versao_dashboard())
+    total_vagas = agregados["total_vagas"]
+    total_candidatos_reais = agregados["total_candidatos"]
 
     col1, col2 = st.columns(2)
     col1.metric("Total de Vagas", total_vagas)
@@ -86,8 +128,7 @@ def home():
     st.markdown("---")
 
     st.subheader("👩‍💼 Vagas por Recrutador")
-    vagas_por_recrutador = df_vagas['recrutador'].value_counts().reset_index()
-    vagas_por_recrutador.columns = ['Recrutador', 'Quantidade']
+    vagas_por_recrutador = agregados["vagas_por_recrutador"]
 
     fig1 = px.bar(
         vagas_por_recrutador,
@@ -101,8 +142,7 @@ def home():
     st.plotly_chart(fig1, use_container_width=True)
 
     st.subheader("🏢 Vagas por Cliente")
-    vagas_por_cliente = df_vagas['cliente'].value_counts().reset_index()
-    vagas_por_cliente.columns = ['Cliente', 'Quantidade']
+    vagas_por_cliente = agregados["vagas_por_cliente"]
 
     fig2 = px.bar(
         vagas_por_cliente,
@@ -117,26 +157,7 @@ def home():
 
     st.subheader("🌍 Vagas que Exigem Idioma")
 
-    def contar_idiomas(col):
-        idiomas_contagem = {'Inglês': 0, 'Espanhol': 0, 'Nenhum': 0}
-        for item in col:
-            item_lower = str(item).lower()
-            if 'inglês' in item_lower and 'espanhol' in item_lower:
-                idiomas_contagem['Inglês'] += 1
-                idiomas_contagem['Espanhol'] += 1
-            elif 'inglês' in item_lower:
-                idiomas_contagem['Inglês'] += 1
-            elif 'espanhol' in item_lower:
-                idiomas_contagem['Espanhol'] += 1
-            else:
-                idiomas_contagem['Nenhum'] += 1
-        return idiomas_contagem
-
-    contagem_idiomas = contar_idiomas(df_vagas['idioma'])
-    idiomas_df = pd.DataFrame({
-        'Idioma': list(contagem_idiomas.keys()),
-        'Quantidade': list(contagem_idiomas.values())
-    })
+    idiomas_df = agregados["idiomas"]
 
     fig3 = px.pie(
         idiomas_df,
@@ -149,6 +170,27 @@ def home():
     fig3.update_layout(template='plotly_dark', height=350)
     st.plotly_chart(fig3, use_container_width=True)
 
+    st.markdown("---")
+    st.subheader("🧩 Pools de Talentos")
+    col_pools1, col_pools2 = st.columns(2)
+    for coluna, entidade, rotulo in ((col_pools1, "candidatos", "Candidatos"), (col_pools2, "vagas", "Vagas")):
+        manifesto = ler_manifesto_pools(APELIDO_POOLS, entidade, MODEL_DIR)
+        with coluna:
+            if not manifesto:
+                st.info(f"Agrupamento de {rotulo.lower()} ainda não gerado (python embeddings/agrupamento.py).")
+                continue
+            tamanhos_df = pd.DataFrame({'Pool': [f"Pool {pool}" for pool in manifesto["tamanhos"]],
+                                        'Quantidade': list(manifesto["tamanhos"].values())})
+            fig_pools = px.bar(
+                tamanhos_df,
+                x='Pool',
+                y='Quantidade',
+                color_discrete_sequence=['#1f77b4'],
+                title=f'{rotulo} por Pool ({manifesto["num_pools"]} pools, gerado em {manifesto["gerado_em"][:10]})'
+            )
+            fig_pools.update_layout(template='plotly_dark', height=300, showlegend=False)
+            st.plotly_chart(fig_pools, use_container_width=True)
+
     st.markdown("---")
     st.subheader("📄 Dados das Vagas")
-    st.dataframe(df_vagas[['vaga_id', 'cliente', 'recrutador', 'idioma', 'candidatos']], use_container_width=True)
+    st.dataframe(agregados["tabela_vagas"], use_container_width=True)
@@ -16,157 +16,278 @@ import pandas as pd
 import json
 import logging
 import streamlit as st
-from sentence_transformers import SentenceTransformer
 
 # A importação do 'gerar_tudo' agora deve funcionar
-from gerar_tudo import extrair_texto_vaga, extrair_texto_candidato, extrair_texto_prospect
+from gerar_tudo import extrair_texto_vaga, extrair_texto_candidato, extrair_texto_prospect, separar_chave_interacao, EMBEDDING_MODELS
+from backend_inferencia import carregar_modelo
+from registro_indices import APELIDO_LEGADO, MODELO_LEGADO, descobrir_indices, carregar_indice, carregar_particao
+from indice_particionado import buscar_particionado, buscar_raio
+from repositorio_registros import sincronizar_base, obter_registro, obter_registros, existentes, contar_registros, listar_ids, listar_prospects, iterar_registros
+from versoes_dados import versao_arquivos, versao_dados, versao_indice, versao_modelos, registrar_versao
+from recarga_indices import registrar_recurso, remover_recurso, iniciar_recarga
+from agrupamento import caminhos_pools, carregar_pools, pools_mais_proximos
+from tabela_topk import consultar as consultar_topk
+from pontuacao import montar_atributos, historico_por_candidato, requisitos_vaga, selecionar_atributos, pontuar
+from busca_vagas import CHAVE_RECURSO as CHAVE_BUSCA_VAGAS, montar_indice as montar_indice_busca, buscar_vagas
+from campos_semanticos import CAMPOS_SEMANTICOS, ROTULOS_CAMPOS, PESOS_CAMPOS, versao_campos, carregar_campos, codificar_campos, campos_armazenados, buscar_por_campos
+from instrumentacao import medir, cronometrar, incrementar, ultimo_detalhamento, detalhamento_como_linhas, iniciar_servidor_metricas
 
 # Caminho base do projeto (onde está rodando este script)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Diretórios de modelos e dados (um nível acima da pasta onde está este script)
-MODEL_DIR = os.path.join(BASE_DIR, '..', 'models1')
-DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
-
-# Nome do modelo de embeddings
-EMBEDDING_MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+# (DECISION_MODEL_DIR / DECISION_DATA_DIR permitem apontar para outra base, ex.: benchmarks)
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(BASE_DIR, '..', 'data'))
+# Base SQLite de vagas e candidatos (importada dos JSON de DATA_DIR), consultada por ID sob demanda
+CAMINHO_REGISTROS = os.path.join(DATA_DIR, "registros.sqlite")
+
+# Modelo usado por padrão nas buscas. Pode ser qualquer apelido de EMBEDDING_MODELS com índices gerados
+# pelo gerar_tudo, ou 'legado' para os arquivos index_{nome}.faiss atualizados pelas páginas de cadastro.
+APELIDO_MODELO_PADRAO = os.environ.get("DECISION_MODELO_BUSCA", APELIDO_LEGADO)
+
+# Roteamento por pools de talentos (embeddings/agrupamento.py): a busca de candidatos de uma vaga fica restrita
+# aos N pools cujos centróides estão mais próximos da vaga. 0 (padrão) busca em todo o índice.
+POOLS_ROTEAMENTO = int(os.environ.get("DECISION_POOLS_ROTEAMENTO", "0"))
+
+# Busca por similaridade mínima (abrir_cursor_candidatos): similaridade padrão do corte, teto de candidatos
+# retornados (os mais próximos) e candidatos por página
+SIMILARIDADE_MINIMA_PADRAO = 0.8
+LIMITE_RESULTADOS_RAIO = int(os.environ.get("DECISION_LIMITE_RAIO", "1000"))
+TAMANHO_PAGINA_RAIO = 20
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- CARREGAMENTO DE RECURSOS GLOBAIS (CACHEADOS PELO STREAMLIT) ---
-# O @st.cache_resource garante que estas funções sejam executadas APENAS UMA VEZ
+# O @st.cache_resource garante que estas funções sejam executadas APENAS UMA VEZ por argumento
 # mesmo que o Streamlit re-execute o script (o que acontece frequentemente).
+# Modelos e índices são carregados sob demanda: apenas o modelo escolhido na busca ocupa memória.
+# O registro de índices é chaveado pela versão (mtime/tamanho) dos arquivos (versoes_dados). Índices e prospects
+# são snapshots trocados por um thread em segundo plano (recarga_indices): um cadastro ou um novo build
+# recarrega apenas o recurso alterado, sem reiniciar o app e sem bloquear as buscas em andamento.
+
+@st.cache_resource
+def iniciar_metricas():
+    """Sobe o endpoint local de métricas (contadores e histogramas por etapa) uma única vez."""
+    return iniciar_servidor_metricas()
+
+@st.cache_resource(max_entries=1)
+def _descobrir_indices_versao(versao):
+    return descobrir_indices(MODEL_DIR, EMBEDDING_MODELS)
+
+def descobrir_indices_disponiveis():
+    """Lista os conjuntos (modelo, entidade) de índices existentes em models1/."""
+    versao = versao_modelos(MODEL_DIR)
+    registrar_versao("registro_indices", versao)
+    return _descobrir_indices_versao(versao)
+
+def nome_modelo_por_apelido(apelido):
+    """Resolve o nome do modelo de embedding a partir do apelido do registro."""
+    if apelido == APELIDO_LEGADO:
+        return MODELO_LEGADO
+    return EMBEDDING_MODELS[apelido]
 
 @st.cache_resource
-def carregar_modelo_embedding():
-    """Carrega o modelo de embedding uma única vez."""
+def carregar_modelo_embedding(apelido=APELIDO_MODELO_PADRAO):
+    """Carrega o modelo de embedding de um apelido uma única vez."""
+    nome_modelo = nome_modelo_por_apelido(apelido)
     try:
-        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-        logging.info(f"Modelo de embedding '{EMBEDDING_MODEL_NAME}' carregado com sucesso.")
+        with medir("carga.modelo"):
+            model = carregar_modelo(nome_modelo)
+        logging.info(f"Modelo de embedding '{nome_modelo}' carregado com sucesso.")
         return model
     except Exception as e:
         logging.error(f"Erro ao carregar o modelo de embedding: {e}. As buscas não funcionarão.")
         st.warning(f"**Aviso:** O modelo de embedding não pôde ser carregado. As funcionalidades de busca de similaridade estarão limitadas. Erro: {e}")
         return None
 
-@st.cache_resource
-def carregar_todos_dados_e_indices():
-    """
-    Carrega todos os dados originais, índices FAISS e metadados.
-    Retorna um dicionário com todos os recursos.
-    """
-    recursos = {
-        "vagas_originais": {},
-        "candidatos_originais": {},
-        "prospects_data_list": [], # Carrega prospects como uma lista para facilitar a busca
-        "index_vagas": None,
-        "metadados_vagas": pd.DataFrame(),
-        "index_candidatos": None,
-        "metadados_candidatos": pd.DataFrame(),
-        "index_prospects": None,
-        "metadados_prospects": pd.DataFrame(),
-    }
-
-    # Funções auxiliares para carregar dados JSON e converter para dicionário com ID
-    def _carregar_json_para_dict(caminho_arquivo, id_key, default_prefix):
-        try:
-            with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-                data_raw = json.load(f)
-                if isinstance(data_raw, list):
-                    return {str(item.get(id_key, f"{default_prefix}_{i}")): item for i, item in enumerate(data_raw)}
-                elif isinstance(data_raw, dict):
-                    # Se for um único dicionário no nível raiz, tentar usar o id_key
-                    if id_key in data_raw:
-                        return {str(data_raw[id_key]): data_raw}
-                    else: # Caso não tenha id_key, usar um ID anônimo
-                        return {f"{default_prefix}_0": data_raw}
-                else:
-                    logging.warning(f"Formato inesperado para {caminho_arquivo}. Esperado lista ou dicionário.")
-                    return {}
-        except FileNotFoundError:
-            logging.warning(f"Arquivo não encontrado: {caminho_arquivo}")
-            st.warning(f"**Aviso:** Arquivo de dados '{os.path.basename(caminho_arquivo)}' não encontrado em '{DATA_DIR}'.")
-            return {}
-        except json.JSONDecodeError:
-            logging.warning(f"Erro ao decodificar JSON: {caminho_arquivo}")
-            st.error(f"**Erro:** Problema ao ler o arquivo JSON '{os.path.basename(caminho_arquivo)}'. Verifique o formato.")
-            return {}
-        except Exception as e:
-            logging.warning(f"Erro inesperado ao carregar {caminho_arquivo}: {e}")
-            st.error(f"**Erro inesperado** ao carregar '{os.path.basename(caminho_arquivo)}': {e}")
-            return {}
+def _ler_indice(info):
+    with medir("carga.indice"):
+        index, metadados = carregar_indice(info)
+    if index is None:
+        raise RuntimeError(f"não foi possível ler '{info['index']}'")
+    return index, metadados
 
-    # Funções auxiliares para carregar FAISS e metadados
-    def _carregar_faiss_index(nome_index):
-        caminho_index = os.path.join(MODEL_DIR, f"index_{nome_index}.faiss")
-        try:
-            index = faiss.read_index(caminho_index)
-            logging.info(f"Índice '{nome_index}' carregado com sucesso.")
-            return index
-        except Exception as e:
-            logging.error(f"Erro ao carregar o índice {caminho_index}: {e}")
-            st.warning(f"**Aviso:** Índice FAISS '{f'index_{nome_index}.faiss'}' não encontrado ou corrompido em '{MODEL_DIR}'. As buscas de similaridade para {nome_index} podem não funcionar.")
-            return None
+def carregar_indice_modelo(apelido, entidade):
+    """
+    Retorna o índice FAISS e os metadados de uma entidade para o modelo escolhido.
+    Retorna (None, DataFrame vazio) se o conjunto não tiver sido gerado.
+    Só a primeira consulta carrega o índice; novas gerações dos arquivos (candidato cadastrado ou novo build)
+    são montadas pelo thread de recarga e trocadas sem bloquear as buscas (ver recarga_indices).
+    """
+    info = descobrir_indices_disponiveis().get(apelido, {}).get(entidade)
+    if info is None:
+        logging.warning(f"Índice '{entidade}' não encontrado para o modelo '{apelido}'.")
+        st.warning(f"**Aviso:** Índice FAISS de '{entidade}' não encontrado para o modelo '{apelido}' em '{MODEL_DIR}'. As buscas de similaridade para {entidade} podem não funcionar.")
+        return None, pd.DataFrame()
+
+    snapshot = registrar_recurso(("indice", apelido, entidade), lambda: versao_indice(info), lambda: _ler_indice(info))
+    if snapshot["dados"] is None:
+        return None, pd.DataFrame()
+    return snapshot["dados"]
+
+def _ler_particao(info, nome):
+    with medir("carga.particao"):
+        index, metadados = carregar_particao(info, nome)
+    if index is None:
+        raise RuntimeError(f"não foi possível ler '{info['particoes'][nome]['index']}'")
+    return index, metadados
+
+def _ler_pools(apelido, entidade):
+    pools = carregar_pools(apelido, entidade, MODEL_DIR)
+    if pools is None:
+        raise RuntimeError(f"agrupamento de {entidade}/{apelido} incompleto")
+    atribuicoes = pools["atribuicoes"]
+    return pools["centroides"], atribuicoes["pool"].to_numpy(), atribuicoes["id_original"].astype(str).to_numpy()
+
+_alinhamento_pools = {}  # (apelido, entidade) -> (ids dos pools, metadados do índice, alinhados?)
+
+def _pools_alinhados(chave, ids_pools, metadados):
+    """
+    Compara posição a posição os IDs do agrupamento com os do índice (mesma contagem não basta: um build
+    incremental que remove um registro e inclui outro desloca as posições). O resultado fica guardado
+    enquanto os dois snapshots forem os mesmos, então a comparação só é refeita após uma recarga.
+    """
+    anterior = _alinhamento_pools.get(chave)
+    if anterior is not None and anterior[0] is ids_pools and anterior[1] is metadados:
+        return anterior[2]
+    ids_indice = metadados["id_original"].astype(str).to_numpy()
+    alinhados = len(ids_pools) == len(ids_indice) and bool(np.array_equal(ids_pools, ids_indice))
+    _alinhamento_pools[chave] = (ids_pools, metadados, alinhados)
+    return alinhados
+
+def posicoes_pools_proximos(apelido, entidade, query_embedding, num_pools, metadados):
+    """
+    Posições do índice (único) que pertencem aos num_pools pools mais próximos da query.
+    Retorna None quando não há agrupamento para o par ou quando ele não está alinhado ao índice
+    (IDs diferentes na mesma posição, ex.: índice regerado depois do agrupamento); nesses casos a busca
+    percorre o índice inteiro.
+    """
+    caminhos = caminhos_pools(apelido, entidade, MODEL_DIR)
+    if not os.path.exists(caminhos["manifesto"]):
+        return None
+    snapshot = registrar_recurso(("pools", apelido, entidade), lambda: versao_arquivos(caminhos.values()),
+                                 lambda: _ler_pools(apelido, entidade))
+    if snapshot["dados"] is None:
+        return None
+    centroides, pool_por_posicao, ids_pools = snapshot["dados"]
+    if not _pools_alinhados((apelido, entidade), ids_pools, metadados):
+        logging.warning(f"Agrupamento de {entidade}/{apelido} desalinhado do índice ({len(ids_pools)} vs {len(metadados)} IDs). Busca sem roteamento.")
+        return None
+    with medir("busca.roteamento_pools"):
+        proximos = pools_mais_proximos(query_embedding, centroides, num_pools)
+        return np.flatnonzero(np.isin(pool_por_posicao, proximos))
 
-    def _carregar_metadados(nome_metadados):
-        caminho_metadados = os.path.join(MODEL_DIR, f"{nome_metadados}_metadados.pkl")
-        try:
-            df = pd.read_pickle(caminho_metadados)
-            logging.info(f"Metadados '{nome_metadados}' carregados com sucesso.")
-            return df
-        except Exception as e:
-            logging.error(f"Erro ao carregar metadados {caminho_metadados}: {e}")
-            st.warning(f"**Aviso:** Arquivo de metadados '{f'{nome_metadados}_metadados.pkl'}' não encontrado ou corrompido em '{MODEL_DIR}'. As buscas de similaridade para {nome_metadados} podem não funcionar corretamente.")
-            return pd.DataFrame()
+_particoes_acompanhadas = {}  # (apelido, entidade) -> partições registradas no thread de recarga
 
-    # Carregamento dos dados originais
-    recursos["vagas_originais"] = _carregar_json_para_dict(os.path.join(DATA_DIR, "vagas.json"), "id_vaga", "vaga_anon")
-    recursos["candidatos_originais"] = _carregar_json_para_dict(os.path.join(DATA_DIR, "applicants.json"), "infos_basicas_codigo_profissional", "anon_cand")
-    
+def carregar_partes_indice(apelido, entidade):
+    """
+    Lista [(índice, metadados)] de uma entidade: um item para índices únicos e um por partição para
+    pares gravados com gerar_tudo --particionar-candidatos. Cada partição é um recurso próprio do
+    thread de recarga, então reconstruir uma partição recarrega apenas ela.
+    """
+    info = descobrir_indices_disponiveis().get(apelido, {}).get(entidade)
+    if info is None or "particoes" not in info:
+        index, metadados = carregar_indice_modelo(apelido, entidade)
+        return [(index, metadados)] if index is not None and not metadados.empty else []
+
+    partes = []
+    for nome, caminhos in info["particoes"].items():
+        snapshot = registrar_recurso(("particao", apelido, entidade, nome), lambda caminhos=caminhos: versao_indice(caminhos),
+                                     lambda nome=nome: _ler_particao(info, nome))
+        if snapshot["dados"] is not None:
+            partes.append(snapshot["dados"])
+    # Partições removidas em um novo build deixam de ser acompanhadas
+    for nome in set(_particoes_acompanhadas.get((apelido, entidade), ())) - set(info["particoes"]):
+        remover_recurso(("particao", apelido, entidade, nome))
+    _particoes_acompanhadas[(apelido, entidade)] = tuple(info["particoes"])
+    return partes
+
+def sincronizar_registros():
+    """
+    Garante que a base de registros reflete os JSON de vagas e candidatos.
+    Só reimporta arquivos alterados (ex.: por um cadastro); caso contrário custa um stat por arquivo.
+    """
+    with medir("carga.sincronizar_registros"):
+        situacao = sincronizar_base(DATA_DIR, CAMINHO_REGISTROS)
+    for entidade, estado in situacao.items():
+        if estado == "ausente" and contar_registros(entidade, CAMINHO_REGISTROS) == 0:
+            st.warning(f"**Aviso:** Arquivo de dados de {entidade} não encontrado em '{DATA_DIR}'.")
+        elif estado == "erro":
+            st.error(f"**Erro:** Problema ao ler o arquivo JSON de {entidade}. Verifique o formato.")
+    return situacao
+
+def _ler_prospects():
     # Carrega prospects como uma lista para facilitar a busca por candidato/vaga
-    try:
-        with open(os.path.join(DATA_DIR, "prospects.json"), 'r', encoding='utf-8') as f:
-            recursos["prospects_data_list"] = json.load(f) # Carrega como lista
-        logging.info("Dados de prospects carregados como lista.")
-    except FileNotFoundError:
-        logging.warning(f"Arquivo não encontrado: {os.path.join(DATA_DIR, 'prospects.json')}")
-        st.warning(f"**Aviso:** Arquivo de prospects 'prospects.json' não encontrado em '{DATA_DIR}'. A pontuação de histórico estará indisponível.")
-        recursos["prospects_data_list"] = []
-    except json.JSONDecodeError:
-        logging.warning(f"Erro ao decodificar JSON: {os.path.join(DATA_DIR, 'prospects.json')}")
-        st.error(f"**Erro:** Problema ao ler o arquivo JSON 'prospects.json'. Verifique o formato.")
-        recursos["prospects_data_list"] = []
-    except Exception as e:
-        logging.error(f"Erro ao carregar prospects.json como lista: {e}")
-        st.error(f"**Erro inesperado** ao carregar 'prospects.json': {e}")
-        recursos["prospects_data_list"] = []
+    with open(os.path.join(DATA_DIR, "prospects.json"), 'r', encoding='utf-8') as f, medir("carga.prospects.json"):
+        prospects = json.load(f) # Carrega como lista
+    logging.info("Dados de prospects carregados como lista.")
+    # A média de histórico de cada candidato é calculada uma vez por geração do prospects.json
+    with medir("carga.historico_candidatos"):
+        historico = historico_por_candidato(prospects)
+    return {"lista": prospects, "historico": historico}
+
+def _versao_atributos():
+    # Só o arquivo principal da base: muda nos checkpoints do WAL. Candidatos cadastrados depois da
+    # última montagem são complementados na própria busca (selecionar_atributos)
+    return versao_arquivos([CAMINHO_REGISTROS])
+
+def _ler_atributos():
+    with medir("carga.atributos_candidatos"):
+        atributos = montar_atributos(iterar_registros("candidatos", CAMINHO_REGISTROS))
+    logging.info(f"Atributos estruturados de {len(atributos['ids'])} candidatos pré-calculados.")
+    return atributos
+
+def _ler_busca_vagas():
+    with medir("carga.busca_vagas"):
+        return montar_indice_busca(iterar_registros("vagas", CAMINHO_REGISTROS))
+
+def carregar_todos_dados_e_indices():
+    """
+    Prepara a base de vagas e candidatos e registra os prospects no thread de recarga.
+    Vagas e candidatos não ficam em memória: são lidos da base SQLite por ID (com LRU) quando necessários.
+    Os índices FAISS e metadados são carregados sob demanda por carregar_indice_modelo.
+    """
+    sincronizar_registros()
+    registrar_recurso(("prospects",), lambda: versao_dados(["prospects"], DATA_DIR), _ler_prospects)
+    registrar_recurso(("atributos", "candidatos"), _versao_atributos, _ler_atributos)
+    # Mesma versão dos atributos; vagas cadastradas entre duas gerações entram pelo cadastro (adicionar_vaga)
+    registrar_recurso(CHAVE_BUSCA_VAGAS, _versao_atributos, _ler_busca_vagas)
+    iniciar_recarga()
+
+def obter_prospects():
+    """
+    Lista de prospects do snapshot atual. O prospects.json é relido em segundo plano quando muda;
+    se a leitura falhar, a geração anterior continua em uso.
+    """
+    snapshot = registrar_recurso(("prospects",), lambda: versao_dados(["prospects"], DATA_DIR), _ler_prospects)
+    if snapshot["erro"] and snapshot["dados"] is None:
+        st.warning(f"**Aviso:** Não foi possível ler 'prospects.json' em '{DATA_DIR}' ({snapshot['erro']}). A pontuação de histórico estará indisponível.")
+    return (snapshot["dados"] or {}).get("lista", [])
 
-    # Carregamento dos índices e metadados
-    # Estes serão None ou DataFrame vazios se os arquivos não existirem/estiverem corrompidos
-    recursos["index_vagas"] = _carregar_faiss_index("vagas")
-    recursos["metadados_vagas"] = _carregar_metadados("vagas")
+def obter_historico():
+    """Média de pontos de histórico por candidato (pd.Series indexada pelo ID), do snapshot atual dos prospects."""
+    snapshot = registrar_recurso(("prospects",), lambda: versao_dados(["prospects"], DATA_DIR), _ler_prospects)
+    return (snapshot["dados"] or {}).get("historico", pd.Series(dtype=np.float64))
 
-    recursos["index_candidatos"] = _carregar_faiss_index("candidatos")
-    recursos["metadados_candidatos"] = _carregar_metadados("candidatos")
+def obter_atributos_candidatos():
+    """Atributos estruturados pré-calculados (idiomas, formação, local) de todos os candidatos da base."""
+    return registrar_recurso(("atributos", "candidatos"), _versao_atributos, _ler_atributos)["dados"] or montar_atributos([])
 
-    return recursos
+def sugerir_vagas(consulta, limite=10):
+    """Vagas cujo título, cliente ou ID casam com o texto digitado (prefixo ou aproximado), para a busca rápida."""
+    indice = registrar_recurso(CHAVE_BUSCA_VAGAS, _versao_atributos, _ler_busca_vagas)["dados"]
+    with medir("busca.sugerir_vagas"):
+        return buscar_vagas(indice, consulta, limite)
 
-# Carrega os recursos (modelo, dados, índices) uma única vez ao iniciar a aplicação
-embedding_model = carregar_modelo_embedding()
-recursos_carregados = carregar_todos_dados_e_indices()
+iniciar_metricas()
 
-# Atribui os recursos para uso fácil
-vagas_originais = recursos_carregados["vagas_originais"]
-candidatos_originais = recursos_carregados["candidatos_originais"]
-prospects_data_list = recursos_carregados["prospects_data_list"] # Agora é uma lista
-index_vagas = recursos_carregados["index_vagas"]
-metadados_vagas = recursos_carregados["metadados_vagas"]
-index_candidatos = recursos_carregados["index_candidatos"]
-metadados_candidatos = recursos_carregados["metadados_candidatos"] 
+# Carrega os dados ao iniciar a aplicação (modelo e índices são carregados na primeira busca)
+carregar_todos_dados_e_indices()
 
 # --- FUNÇÕES DE BUSCA DE SIMILARIDADE ---
 
-def buscar_similares(query_embedding, faiss_index, metadados_df, k=10):
+def buscar_similares(query_embedding, faiss_index, metadados_df, k=10, posicoes_permitidas=None):
     """
     Realiza a busca de similaridade no índice FAISS.
     Args:
@@ -174,6 +295,7 @@ def buscar_similares(query_embedding, faiss_index, metadados_df, k=10):
         faiss_index (faiss.Index): O índice FAISS onde a busca será feita.
         metadados_df (pd.DataFrame): DataFrame com os metadados correspondentes ao índice.
         k (int): Número de resultados a retornar.
+        posicoes_permitidas (np.array, optional): Restringe a busca a estas posições do índice (roteamento por pools).
     Returns:
         list: Uma lista de dicionários contendo os resultados da busca (id_original, distância).
     """
@@ -186,162 +308,440 @@ def buscar_similares(query_embedding, faiss_index, metadados_df, k=10):
     query_embedding = np.array([query_embedding]).astype(np.float32)
 
     try:
-        distances, indices = faiss_index.search(query_embedding, k)
+        with medir("busca.faiss_search"):
+            if posicoes_permitidas is not None:
+                seletor = faiss.IDSelectorBatch(np.asarray(posicoes_permitidas, dtype=np.int64))
+                distances, indices = faiss_index.search(query_embedding, k, params=faiss.SearchParameters(sel=seletor))
+            else:
+                distances, indices = faiss_index.search(query_embedding, k)
         resultados = []
-        for dist, idx_faiss in zip(distances[0], indices[0]):
-            if idx_faiss != -1 and idx_faiss < len(metadados_df): # Valida se o índice retornado é válido e dentro dos limites do DataFrame
-                original_id = metadados_df.iloc[idx_faiss]['id_original']
-                resultados.append({"id_original": original_id, "distancia": float(dist)})
+        with medir("busca.resolucao_metadados"):
+            for dist, idx_faiss in zip(distances[0], indices[0]):
+                if idx_faiss != -1 and idx_faiss < len(metadados_df): # Valida se o índice retornado é válido e dentro dos limites do DataFrame
+                    original_id = metadados_df.iloc[idx_faiss]['id_original']
+                    resultados.append({"id_original": original_id, "distancia": float(dist)})
         return resultados
     except Exception as e:
+        incrementar("erros_busca")
         logging.error(f"Erro durante a busca FAISS: {e}")
         st.error(f"**Erro:** Não foi possível realizar a busca de similaridade. Detalhes: {e}")
         return []
 
-def calcular_pontuacao_historico(candidato_id, prospects_data):
-    """
-    Calcula uma pontuação de histórico para um candidato com base nas suas situações em vagas.
-    Maior pontuação para situações mais positivas.
-    """
-    if not prospects_data: # Verifica se a lista de prospects está vazia
-        return 0 # Nenhuma entrada de histórico para este candidato
-
-    pontuacoes = {
-        "Contratado": 10,
-        "Encaminhado ao Requisitante": 8,
-        "Entrevista com Cliente": 7,
-        "Em Negociação": 6,
-        "Em Andamento": 3,
-        "Aguardando Contato": 2,
-        "Em avaliação pelo RH": -1, # Ligeiramente negativo para indicar que está em outro processo
-        "Desistiu": -5,
-        "Rejeitado": -8,
-        "Não Atende aos Requisitos": -10,
-        "Outros": 0 # Situações não mapeadas
-    }
-    
-    historico_pontos = []
-    
-    # Filtrar os prospects relevantes para o candidato
-    prospects_do_candidato = [p for p in prospects_data if str(p.get("prospect_codigo")) == str(candidato_id)]
-    
-    if not prospects_do_candidato:
-        return 0 # Nenhuma entrada de histórico para este candidato
+def buscar_em_partes(query_embedding, partes, k=10, posicoes_permitidas=None):
+    """
+    Busca de similaridade sobre as partes de um índice (ver carregar_partes_indice).
+    Com várias partições, a busca roda em paralelo em todas e os top-k são unidos por um heap.
+    posicoes_permitidas (roteamento por pools) só se aplica a índices únicos.
+    Retorna a mesma lista de dicionários (id_original, distância) de buscar_similares.
+    """
+    if len(partes) == 1:
+        return buscar_similares(query_embedding, partes[0][0], partes[0][1], k=k, posicoes_permitidas=posicoes_permitidas)
+    if not partes or query_embedding is None:
+        logging.warning("Índice particionado ou embedding da query inválido para busca. Retornando lista vazia.")
+        return []
+    try:
+        with medir("busca.faiss_search"):
+            resultados = buscar_particionado(np.array([query_embedding]).astype(np.float32), partes, k)
+        return [{"id_original": id_original, "distancia": distancia} for distancia, id_original in resultados]
+    except Exception as e:
+        incrementar("erros_busca")
+        logging.error(f"Erro durante a busca FAISS particionada: {e}")
+        st.error(f"**Erro:** Não foi possível realizar a busca de similaridade. Detalhes: {e}")
+        return []
 
-    for prospect in prospects_do_candidato:
-        situacao = prospect.get("prospect_situacao_candidado", "Outros")
-        historico_pontos.append(pontuacoes.get(situacao, pontuacoes["Outros"]))
-    
-    # Retorna a média das pontuações do histórico do candidato
-    return np.mean(historico_pontos) if historico_pontos else 0
+def consultar_tabela_topk(apelido, id_vaga, quantidade):
+    """
+    Vizinhos de uma vaga na tabela top-K materializada, no mesmo formato de buscar_similares.
+    Retorna None (busca ao vivo) se a tabela não existir, não tiver a vaga ou não corresponder ao índice atual.
+    """
+    info = descobrir_indices_disponiveis().get(apelido, {}).get("candidatos")
+    if info is None:
+        return None
+    with medir("busca.tabela_topk"):
+        vizinhos = consultar_topk(apelido, id_vaga, quantidade, versao_indice(info), MODEL_DIR)
+    if vizinhos is None:
+        return None
+    incrementar("busca_tabela_topk_total")
+    return [{"id_original": id_original, "distancia": distancia} for id_original, distancia in vizinhos]
 
-def encontrar_candidatos_para_vaga(id_vaga, num_candidatos=5, peso_historico=0.3): # Valor padrão de 0.3 (30%)
+def obter_campos(apelido, entidade):
+    """Vetores por campo do snapshot atual (None se o modelo não foi gerado com gerar_tudo.py --campos)."""
+    return registrar_recurso(("campos", apelido, entidade), lambda: versao_campos(apelido, entidade, MODEL_DIR),
+                             lambda: carregar_campos(apelido, entidade, MODEL_DIR))["dados"]
+
+def _preparar_busca_vaga(id_vaga, apelido_modelo):
     """
-    Busca candidatos aderentes a uma vaga específica, calculando a pontuação de aderência
-    e ponderando pelo histórico do candidato.
+    Modelo, partes do índice de candidatos e registro/texto da vaga usados nas buscas de candidatos.
+    Retorna (embedding_model, partes_candidatos, vaga_data, texto_vaga) ou {"erro": ...}.
     """
+    embedding_model = carregar_modelo_embedding(apelido_modelo)
     if embedding_model is None:
         return {"erro": "Modelo de embedding não carregado. Não é possível realizar a busca de similaridade."}
     
-    if index_candidatos is None or metadados_candidatos.empty:
+    partes_candidatos = carregar_partes_indice(apelido_modelo, "candidatos")
+    if not partes_candidatos:
         return {"erro": "Índice de candidatos ou metadados não carregados. Não é possível realizar a busca de similaridade."}
 
-    vaga_data = vagas_originais.get(str(id_vaga))
+    vaga_data = obter_registro("vagas", id_vaga, CAMINHO_REGISTROS)
     if not vaga_data:
         logging.warning(f"Vaga com ID '{id_vaga}' não encontrada nos dados originais.")
         return {"erro": f"Vaga com ID '{id_vaga}' não encontrada."}
 
-    texto_vaga = extrair_texto_vaga(vaga_data)
+    with medir("busca.extrair_texto_vaga"):
+        texto_vaga = extrair_texto_vaga(vaga_data)
     if not texto_vaga:
         logging.warning(f"Vaga ID '{id_vaga}' não possui texto útil para gerar query embedding.")
         return {"erro": "Informações insuficientes na vaga para realizar a busca."}
+    return embedding_model, partes_candidatos, vaga_data, texto_vaga
 
+def _codificar_vaga(embedding_model, texto_vaga):
+    """Embedding da vaga, ou {"erro": ...} se o modelo falhar."""
     try:
-        query_embedding = embedding_model.encode([texto_vaga])[0].astype(np.float32)
+        with medir("busca.encode"):
+            return embedding_model.encode([texto_vaga])[0].astype(np.float32)
     except Exception as e:
+        incrementar("erros_busca")
         logging.error(f"Erro ao gerar embedding para a vaga: {e}")
         return {"erro": f"Erro ao gerar embedding para a vaga. Detalhes: {e}"}
 
+def ranquear_candidatos(resultados_similares, vaga_data, peso_historico):
+    """
+    Pontua e ordena (pela Pontuação Final de Aderência, decrescente) os candidatos recuperados.
+    O ranqueamento trabalha só com arrays compactos (id, distância, pontuações); os campos de perfil
+    são buscados depois, apenas para os candidatos exibidos (ver materializar_candidatos).
 
-    # Buscar mais candidatos do que o necessário inicialmente para filtrar e ordenar
-    resultados_similares = buscar_similares(query_embedding, index_candidatos, metadados_candidatos, k=num_candidatos * 5) # Buscamos mais para ter histórico
-
-    if not resultados_similares:
-        return [] # Retorna lista vazia se nenhuma similaridade for encontrada
-
-    candidatos_encontrados = []
-    
+    Returns:
+        tuple: (ids, pontuações finais, pontuações de similaridade, pontuações de histórico, distâncias),
+        já na ordem do ranking; ids vazio se nenhum candidato recuperado estiver cadastrado.
+    """
     # Encontrar a distância máxima para normalização (se houver resultados)
     # Consideramos apenas distâncias positivas para evitar problemas em caso de 0
     distancias_validas = [res['distancia'] for res in resultados_similares if res['distancia'] >= 0] # Distancia pode ser 0 em match perfeito
     max_distancia = max(distancias_validas) if distancias_validas else 1.0 # Garante que não é zero
 
-    for res in resultados_similares:
-        candidato_id = str(res['id_original'])
-        candidato_detalhes = candidatos_originais.get(candidato_id)
-        if candidato_detalhes:
-            # Calcular Pontuação de Aderência (baseada em similaridade textual)
-            if max_distancia > 0:
-                # Quanto menor a distância, maior a similaridade. Invertemos para pontuação: (1 - dist/max_dist)
-                pontuacao_aderencia_similaridade = (1 - (res['distancia'] / max_distancia)) * 100
-            else: # Se todas as distâncias forem zero (match perfeito ou apenas um resultado com dist=0)
-                pontuacao_aderencia_similaridade = 100 if res['distancia'] == 0 else 0 
-
-            # Calcular Pontuação de Histórico
-            pontuacao_historico = calcular_pontuacao_historico(candidato_id, prospects_data_list)
-            
-            # Normalizar pontuação de histórico para uma escala de 0-100
-            # Nossas pontuações vão de -10 a 10. Reescalamos para (x - min) / (max - min) * 100
-            min_hist_score = -10 
-            max_hist_score = 10  
-            
-            if (max_hist_score - min_hist_score) > 0:
-                pontuacao_historico_normalizada = ((pontuacao_historico - min_hist_score) / (max_hist_score - min_hist_score)) * 100
-            else:
-                pontuacao_historico_normalizada = 50 # Neutro se não houver variação na pontuação
+    with medir("busca.consulta_registros"):
+        cadastrados = existentes("candidatos", [res['id_original'] for res in resultados_similares], CAMINHO_REGISTROS)
+    ids_candidatos = [str(res['id_original']) for res in resultados_similares if str(res['id_original']) in cadastrados]
+    distancias = np.array([res['distancia'] for res in resultados_similares if str(res['id_original']) in cadastrados], dtype=np.float64)
+    if not ids_candidatos:
+        vazio = np.array([], dtype=np.float64)
+        return [], vazio, vazio, vazio, vazio
+
+    # Calcular Pontuação de Aderência (baseada em similaridade textual)
+    if max_distancia > 0:
+        # Quanto menor a distância, maior a similaridade. Invertemos para pontuação: (1 - dist/max_dist)
+        pontuacoes_similaridade = (1 - (distancias / max_distancia)) * 100
+    else: # Se todas as distâncias forem zero (match perfeito ou apenas um resultado com dist=0)
+        pontuacoes_similaridade = np.where(distancias == 0, 100.0, 0.0)
+
+    # Pontuação de Histórico (média pré-calculada por candidato; 0 para quem não tem histórico)
+    with medir("busca.pontuacao_historico"):
+        pontuacoes_historico = obter_historico().reindex(ids_candidatos).fillna(0).to_numpy(dtype=np.float64)
+
+    # Pontuação Final Ponderada (aderência + histórico), limitada entre 0 e 100
+    with medir("busca.pontuacao_atributos"):
+        atributos = selecionar_atributos(obter_atributos_candidatos(), ids_candidatos,
+                                         lambda ausentes: obter_registros("candidatos", ausentes, CAMINHO_REGISTROS).items())
+        pontuacoes_finais = pontuar(pontuacoes_similaridade, atributos, pontuacoes_historico,
+                                    requisitos_vaga(vaga_data), peso_historico)["final"]
+
+    # Ordenar pela Pontuação Final de Aderência (decrescente = mais aderente)
+    with medir("busca.ordenacao"):
+        ordem = np.argsort(-pontuacoes_finais, kind="stable")
+    return ([ids_candidatos[i] for i in ordem], pontuacoes_finais[ordem], pontuacoes_similaridade[ordem],
+            pontuacoes_historico[ordem], distancias[ordem])
+
+@cronometrar("busca_candidatos")
+def encontrar_candidatos_para_vaga(id_vaga, num_candidatos=5, peso_historico=0.3, apelido_modelo=APELIDO_MODELO_PADRAO, num_pools=POOLS_ROTEAMENTO): # Valor padrão de 0.3 (30%)
+    """
+    Busca candidatos aderentes a uma vaga específica, calculando a pontuação de aderência
+    e ponderando pelo histórico do candidato.
+    A aderência combina a similaridade textual com os sinais estruturados (idiomas, formação, local) conforme
+    os pesos configurados em pontuacao.PESOS_ADERENCIA, calculados para todos os candidatos de uma vez.
+    A busca usa o modelo de embedding e o índice de candidatos do apelido informado.
+    Com num_pools > 0 e o agrupamento gerado, só os candidatos dos num_pools pools mais próximos da vaga são considerados.
+    O tempo de cada etapa fica disponível em ultimo_detalhamento() ao final da chamada.
+    """
+    preparo = _preparar_busca_vaga(id_vaga, apelido_modelo)
+    if isinstance(preparo, dict):
+        return preparo
+    embedding_model, partes_candidatos, vaga_data, texto_vaga = preparo
+
+    # Vagas já materializadas (tabela_topk) dispensam embedding e busca FAISS: a lista de vizinhos vem pronta
+    resultados_similares = None if num_pools else consultar_tabela_topk(apelido_modelo, id_vaga, num_candidatos * 5)
+    if resultados_similares is None:
+        query_embedding = _codificar_vaga(embedding_model, texto_vaga)
+        if isinstance(query_embedding, dict):
+            return query_embedding
+
+        posicoes_permitidas = None
+        if num_pools and len(partes_candidatos) == 1:
+            posicoes_permitidas = posicoes_pools_proximos(apelido_modelo, "candidatos", query_embedding, num_pools, partes_candidatos[0][1])
+
+        # Buscar mais candidatos do que o necessário inicialmente para filtrar e ordenar
+        resultados_similares = buscar_em_partes(query_embedding, partes_candidatos, k=num_candidatos * 5, # Buscamos mais para ter histórico
+                                                posicoes_permitidas=posicoes_permitidas)
+
+    if not resultados_similares:
+        return [] # Retorna lista vazia se nenhuma similaridade for encontrada
 
-            # Pontuação Final Ponderada
-            pontuacao_final = (pontuacao_aderencia_similaridade * (1 - peso_historico)) + \
-                               (pontuacao_historico_normalizada * peso_historico)
-            
-            # Garante que a pontuação final esteja entre 0 e 100
-            pontuacao_final = max(0, min(100, pontuacao_final))
+    ids_candidatos, pontuacoes_finais, pontuacoes_similaridade, pontuacoes_historico, distancias = \
+        ranquear_candidatos(resultados_similares, vaga_data, peso_historico)
+    return materializar_candidatos(
+        ids_candidatos[:num_candidatos], pontuacoes_finais[:num_candidatos], pontuacoes_similaridade[:num_candidatos],
+        pontuacoes_historico[:num_candidatos], distancias[:num_candidatos]
+    )
+
+# --- BUSCA POR SIMILARIDADE MÍNIMA (RANGE SEARCH) ---
+# Em vez de um k fixo, retorna todos os candidatos acima de uma similaridade mínima (até LIMITE_RESULTADOS_RAIO).
+# A similaridade de um candidato x com a vaga q é 1 - ||q - x||² / (2·||q||²): 1 para o mesmo vetor e 0 para um
+# vetor ortogonal de mesma norma. O resultado ranqueado fica num cursor (dicionário guardado em st.session_state),
+# e cada página é apenas um recorte dele: trocar de página não repete embedding, busca nem pontuação.
+
+def abrir_cursor_candidatos(id_vaga, similaridade_minima=SIMILARIDADE_MINIMA_PADRAO, peso_historico=0.3,
+                            apelido_modelo=APELIDO_MODELO_PADRAO, num_pools=POOLS_ROTEAMENTO, limite=LIMITE_RESULTADOS_RAIO):
+    """
+    Busca (range_search do FAISS) todos os candidatos com similaridade >= similaridade_minima, pontua e
+    ordena todos de uma vez e devolve o cursor para paginação (ver pagina_cursor).
+
+    Returns:
+        dict: Cursor {"id_vaga", "ids", "finais", ..., "total_no_raio", "truncado"} ou {"erro": ...}.
+    """
+    preparo = _preparar_busca_vaga(id_vaga, apelido_modelo)
+    if isinstance(preparo, dict):
+        return preparo
+    embedding_model, partes_candidatos, vaga_data, texto_vaga = preparo
+    query_embedding = _codificar_vaga(embedding_model, texto_vaga)
+    if isinstance(query_embedding, dict):
+        return query_embedding
+
+    norma = float(np.dot(query_embedding, query_embedding))
+    raio = 2 * norma * (1 - similaridade_minima)
+    params = None
+    if num_pools and len(partes_candidatos) == 1:
+        posicoes_permitidas = posicoes_pools_proximos(apelido_modelo, "candidatos", query_embedding, num_pools, partes_candidatos[0][1])
+        if posicoes_permitidas is not None:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.asarray(posicoes_permitidas, dtype=np.int64)))
+    try:
+        with medir("busca.faiss_range_search"):
+            total_no_raio, vizinhos = buscar_raio(np.array([query_embedding]), partes_candidatos, raio, limite, params)
+    except Exception as e:
+        incrementar("erros_busca")
+        logging.error(f"Erro durante a busca FAISS por raio: {e}")
+        return {"erro": f"Não foi possível realizar a busca por similaridade mínima. Detalhes: {e}"}
+
+    ids_candidatos, pontuacoes_finais, pontuacoes_similaridade, pontuacoes_historico, distancias = \
+        ranquear_candidatos([{"id_original": id_original, "distancia": distancia} for distancia, id_original in vizinhos],
+                            vaga_data, peso_historico)
+    return {
+        "id_vaga": str(id_vaga),
+        "apelido": apelido_modelo,
+        "similaridade_minima": similaridade_minima,
+        "ids": ids_candidatos,
+        "finais": pontuacoes_finais,
+        "similaridades": pontuacoes_similaridade,
+        "historicos": pontuacoes_historico,
+        "distancias": distancias,
+        "similaridades_vaga": (1 - distancias / (2 * norma)) * 100 if norma > 0 else np.zeros(len(distancias)),
+        "total_no_raio": total_no_raio,
+        "truncado": total_no_raio > limite,
+    }
 
+def pagina_cursor(cursor, pagina, tamanho_pagina=TAMANHO_PAGINA_RAIO):
+    """
+    Linhas de resultado de uma página (0 = primeira) do cursor, materializando só os candidatos da página.
+    Cada linha traz também a "Similaridade com a Vaga (%)" usada no corte da busca.
+    """
+    inicio = pagina * tamanho_pagina
+    fatia = slice(inicio, inicio + tamanho_pagina)
+    linhas = materializar_candidatos(cursor["ids"][fatia], cursor["finais"][fatia], cursor["similaridades"][fatia],
+                                     cursor["historicos"][fatia], cursor["distancias"][fatia])
+    for linha, similaridade in zip(linhas, cursor["similaridades_vaga"][fatia]):
+        linha["Similaridade com a Vaga (%)"] = round(float(similaridade), 2)
+    return linhas
+
+def total_paginas(cursor, tamanho_pagina=TAMANHO_PAGINA_RAIO):
+    return max(1, -(-len(cursor["ids"]) // tamanho_pagina))
+
+def materializar_candidatos(ids_candidatos, pontuacoes_finais, pontuacoes_similaridade, pontuacoes_historico, distancias):
+    """
+    Monta as linhas de resultado (campos de perfil exibidos na tela) apenas para os candidatos finais.
+    O registro completo não é serializado aqui: o JSON para download é gerado sob demanda por dados_completos_candidato.
+    """
+    candidatos_encontrados = []
+    with medir("busca.materializacao"):
+        detalhes = obter_registros("candidatos", ids_candidatos, CAMINHO_REGISTROS)
+        for candidato_id, final, similaridade, historico, distancia in zip(ids_candidatos, pontuacoes_finais, pontuacoes_similaridade, pontuacoes_historico, distancias):
+            candidato_detalhes = detalhes.get(candidato_id, {})
             candidatos_encontrados.append({
                 "id_candidato": candidato_id,
-                "Pontuação Final de Aderência (0-100)": round(pontuacao_final, 2), 
+                "Pontuação Final de Aderência (0-100)": float(final),
                 # As pontuações abaixo serão usadas apenas internamente para depuração ou análises futuras,
                 # não serão exibidas na interface para simplificar.
-                "Pontuação de Similaridade (0-100)_debug": round(pontuacao_aderencia_similaridade, 2),
-                "Pontuação de Histórico (Média)_debug": round(pontuacao_historico, 2), 
+                "Pontuação de Similaridade (0-100)_debug": round(float(similaridade), 2),
+                "Pontuação de Histórico (Média)_debug": round(float(historico), 2),
                 "Nome do Profissional": candidato_detalhes.get("infos_basicas_nome", "Nome não disponível"),
                 "Email": candidato_detalhes.get("infos_basicas_email", "Não informado"),
                 "Telefone": candidato_detalhes.get("infos_basicas_telefone", "Não informado"),
                 "Título Profissional": candidato_detalhes.get("informacoes_profissionais_titulo_profissional", "Não informado"),
-                "Distância Euclidiana (Referência)": res['distancia'], 
-                "Dados Completos": json.dumps(candidato_detalhes, ensure_ascii=False, indent=2) 
+                "Distância Euclidiana (Referência)": float(distancia),
             })
-    
-    # Ordenar pela Pontuação Final de Aderência (decrescente = mais aderente) e pegar os top N
-    candidatos_encontrados_df = pd.DataFrame(candidatos_encontrados)
-    if not candidatos_encontrados_df.empty:
-        candidatos_encontrados_df = candidatos_encontrados_df.sort_values(by="Pontuação Final de Aderência (0-100)", ascending=False).head(num_candidatos)
-    
-    return candidatos_encontrados_df.to_dict(orient='records')
+    return candidatos_encontrados
+
+def dados_completos_candidato(candidato_id):
+    """Serializa o registro completo de um candidato (usado apenas quando o download é solicitado)."""
+    with medir("busca.serializacao_json"):
+        return json.dumps(obter_registro("candidatos", candidato_id, CAMINHO_REGISTROS) or {}, ensure_ascii=False, indent=2)
+
+
+# --- BUSCA POR CAMPOS ---
+# A vaga e os candidatos são comparados campo a campo (campos_semanticos.py); os pesos entram só na combinação.
+
+@cronometrar("busca_candidatos_campos")
+def encontrar_candidatos_por_campos(id_vaga, num_candidatos=5, peso_historico=0.3, apelido_modelo=APELIDO_MODELO_PADRAO,
+                                    pesos_campos=None):
+    """
+    Busca candidatos comparando a vaga campo a campo (título, atividades, competências, formação) e combinando
+    as similaridades com os pesos informados (padrão: campos_semanticos.PESOS_CAMPOS). Os pesos são aplicados
+    sobre vetores já gerados: mudá-los não recodifica nada. Cada resultado informa o campo determinante.
+    """
+    campos_candidatos = obter_campos(apelido_modelo, "candidatos")
+    if campos_candidatos is None:
+        return {"erro": f"Vetores por campo não gerados para o modelo '{apelido_modelo}'. Execute gerar_tudo.py --campos."}
+    vaga_data = obter_registro("vagas", id_vaga, CAMINHO_REGISTROS)
+    if not vaga_data:
+        logging.warning(f"Vaga com ID '{id_vaga}' não encontrada nos dados originais.")
+        return {"erro": f"Vaga com ID '{id_vaga}' não encontrada."}
+
+    # Vagas presentes no último build já têm os vetores por campo; só as demais passam pelo modelo
+    consulta = campos_armazenados(obter_campos(apelido_modelo, "vagas"), id_vaga)
+    if not consulta:
+        embedding_model = carregar_modelo_embedding(apelido_modelo)
+        if embedding_model is None:
+            return {"erro": "Modelo de embedding não carregado. Não é possível realizar a busca de similaridade."}
+        try:
+            with medir("busca.encode"):
+                consulta = codificar_campos(embedding_model, vaga_data, "vagas")
+        except Exception as e:
+            incrementar("erros_busca")
+            logging.error(f"Erro ao gerar os embeddings por campo da vaga: {e}")
+            return {"erro": f"Erro ao gerar embedding para a vaga. Detalhes: {e}"}
+    if not consulta:
+        logging.warning(f"Vaga ID '{id_vaga}' não possui campos preenchidos para a busca por campos.")
+        return {"erro": "Informações insuficientes na vaga para realizar a busca."}
+
+    with medir("busca.similaridade_campos"):
+        resultados_campos = buscar_por_campos(campos_candidatos, consulta, num_candidatos * 5, pesos_campos)
+    if not resultados_campos:
+        return []
+    por_id = {res["id_original"]: res for res in resultados_campos}
+    # Distância 1 - cosseno: ranquear_candidatos normaliza pela maior distância, como na busca por vetor único
+    ids_candidatos, pontuacoes_finais, pontuacoes_similaridade, pontuacoes_historico, distancias = ranquear_candidatos(
+        [{"id_original": res["id_original"], "distancia": 1.0 - res["similaridade"]} for res in resultados_campos],
+        vaga_data, peso_historico)
+    linhas = materializar_candidatos(
+        ids_candidatos[:num_candidatos], pontuacoes_finais[:num_candidatos], pontuacoes_similaridade[:num_candidatos],
+        pontuacoes_historico[:num_candidatos], distancias[:num_candidatos]
+    )
+    for linha in linhas:
+        res = por_id[linha["id_candidato"]]
+        linha.pop("Distância Euclidiana (Referência)", None)
+        linha["Campo Determinante"] = ROTULOS_CAMPOS[res["campo_determinante"]]
+        linha["Similaridade Combinada (%)"] = round(res["similaridade"] * 100, 1)
+        for campo, similaridade in res["similaridades_campos"].items():
+            linha[f"Similaridade {ROTULOS_CAMPOS[campo]} (%)"] = round(similaridade * 100, 1) if similaridade is not None else None
+    return linhas
+
+
+# --- BUSCA SEMÂNTICA NO HISTÓRICO DE PROSPECTS ---
+
+@cronometrar("busca_prospects")
+def buscar_prospects(texto_busca, num_resultados=20, apelido_modelo=APELIDO_MODELO_PADRAO):
+    """
+    Busca interações passadas (candidato x vaga) cujo título, situação e comentário do recrutador
+    se parecem com um texto livre, usando o índice de prospects gerado pelo gerar_tudo.
+    O índice só é carregado na primeira busca deste tipo.
+    Retorna uma lista de dicionários (um por interação), ou {"erro": ...}.
+    """
+    texto_busca = (texto_busca or "").strip()
+    if not texto_busca:
+        return {"erro": "Informe um texto para buscar no histórico."}
+
+    embedding_model = carregar_modelo_embedding(apelido_modelo)
+    if embedding_model is None:
+        return {"erro": "Modelo de embedding não carregado. Não é possível realizar a busca de similaridade."}
 
+    partes_prospects = carregar_partes_indice(apelido_modelo, "prospects")
+    if not partes_prospects:
+        return {"erro": f"Índice de prospects não disponível para o modelo '{apelido_modelo}'. Gere-o com o gerar_tudo."}
+
+    try:
+        with medir("busca.encode"):
+            query_embedding = embedding_model.encode([texto_busca])[0].astype(np.float32)
+    except Exception as e:
+        incrementar("erros_busca")
+        logging.error(f"Erro ao gerar embedding para a busca no histórico: {e}")
+        return {"erro": f"Erro ao gerar embedding para a busca. Detalhes: {e}"}
+
+    resultados_similares = buscar_em_partes(query_embedding, partes_prospects, k=num_resultados)
+    if not resultados_similares:
+        return []
+
+    distancias = np.array([res["distancia"] for res in resultados_similares], dtype=np.float64)
+    max_distancia = distancias.max()
+    pontuacoes = (1 - distancias / max_distancia) * 100 if max_distancia > 0 else np.where(distancias == 0, 100.0, 0.0)
+
+    interacoes = []
+    with medir("busca.materializacao"):
+        for res, pontuacao in zip(resultados_similares, pontuacoes):
+            prospect_codigo, id_vaga = separar_chave_interacao(res["id_original"])
+            registros = listar_prospects(prospect_codigo, id_vaga, CAMINHO_REGISTROS)
+            prospect = registros[0] if registros else {}
+            interacoes.append({
+                "id_candidato": str(prospect.get("prospect_codigo", prospect_codigo)),
+                "Nome do Profissional": prospect.get("prospect_nome", "Nome não disponível"),
+                "id_vaga": str(prospect.get("id_vaga", id_vaga or "")),
+                "Título da Vaga": prospect.get("titulo", "Não informado"),
+                "Situação": prospect.get("prospect_situacao_candidado", "Não informado"),
+                "Comentário do Recrutador": prospect.get("prospect_comentario", ""),
+                "Similaridade (0-100)": round(float(pontuacao), 2),
+                "Distância Euclidiana (Referência)": float(res["distancia"]),
+            })
+    return interacoes
+
+def agrupar_interacoes(interacoes, por="id_candidato"):
+    """
+    Agrupa as interações encontradas por candidato ('id_candidato') ou por vaga ('id_vaga'):
+    quantidade de interações, melhor similaridade e situações registradas, da mais para a menos similar.
+    """
+    df = pd.DataFrame(interacoes)
+    rotulo = "Nome do Profissional" if por == "id_candidato" else "Título da Vaga"
+    return (df.groupby(por, sort=False)
+              .agg(**{rotulo: (rotulo, "first"),
+                      "Interações": ("Situação", "size"),
+                      "Melhor Similaridade (0-100)": ("Similaridade (0-100)", "max"),
+                      "Situações": ("Situação", lambda s: ", ".join(dict.fromkeys(s)))})
+              .sort_values("Melhor Similaridade (0-100)", ascending=False))
 
 # --- INTERFACE STREAMLIT ---
 
+def gerar_json_candidato(candidato_id):
+    """Callback do botão "Gerar JSON": serializa o candidato uma vez e guarda o conteúdo na sessão para o download."""
+    st.session_state.setdefault("json_candidatos", {})[candidato_id] = dados_completos_candidato(candidato_id).encode('utf-8')
+
 def pagina_servicos():
     st.title("Sistema de Recomendação de Talentos")
     st.markdown("Bem-vindo(a)! Utilize o sistema para encontrar os **candidatos mais aderentes a uma vaga**, considerando sua similaridade com a descrição da vaga e seu histórico de engajamento em processos seletivos anteriores.")
 
+    sincronizar_registros()
+    prospects_data_list = obter_prospects()
+
     # Exibe métricas de quantos itens foram carregados
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric(label="Total de Vagas", value=len(vagas_originais))
+        st.metric(label="Total de Vagas", value=contar_registros("vagas", CAMINHO_REGISTROS))
     with col2:
-        st.metric(label="Total de Candidatos", value=len(candidatos_originais))
+        st.metric(label="Total de Candidatos", value=contar_registros("candidatos", CAMINHO_REGISTROS))
     with col3:
         # Contamos os prospects únicos por prospect_codigo para exibir um número mais realista de "candidatos prospectados"
         unique_prospects = len(set([p.get("prospect_codigo") for p in prospects_data_list if p.get("prospect_codigo")]))
@@ -354,104 +754,254 @@ def pagina_servicos():
     st.header("🎯 Encontrar Candidatos para uma Vaga")
     st.markdown("Para encontrar os candidatos ideais, insira o **ID da vaga** e o **número de candidatos** que deseja exibir.")
 
+    # Busca rápida: localiza o ID pelo título, cliente ou início do ID, sem consultar a tabela da Home
+    consulta_vaga_input = st.text_input("Localizar vaga por título, cliente ou ID", placeholder="Ex: analista sap, Morris, 105",
+                                        help="Aceita palavras incompletas e pequenos erros de digitação.")
+    vaga_sugerida = ""
+    if consulta_vaga_input.strip():
+        sugestoes = sugerir_vagas(consulta_vaga_input)
+        if sugestoes:
+            opcoes = {f"{s['id_vaga']} — {s['titulo'] or 'Sem título'} ({s['cliente'] or 'cliente não informado'})": s["id_vaga"] for s in sugestoes}
+            vaga_sugerida = opcoes[st.selectbox("Vagas encontradas", list(opcoes))]
+        else:
+            st.caption("Nenhuma vaga encontrada para o texto informado.")
+
     with st.form("form_vaga_candidato"):
         col_vaga1, col_vaga2 = st.columns([0.7, 0.3]) # Colunas ajustadas
         with col_vaga1:
-            vaga_id_input = st.text_input("ID da Vaga", help="Ex: 1055, 11589").strip()
+            vaga_id_input = st.text_input("ID da Vaga", value=vaga_sugerida, help="Ex: 1055, 11589").strip()
         with col_vaga2:
             num_candidatos_input = st.slider("Número de Candidatos a exibir", min_value=1, max_value=20, value=5)
         
+        # Apenas modelos com índice de candidatos gerado podem ser escolhidos
+        modelos_disponiveis = [apelido for apelido, entidades in descobrir_indices_disponiveis().items() if "candidatos" in entidades]
+        if modelos_disponiveis:
+            indice_padrao = modelos_disponiveis.index(APELIDO_MODELO_PADRAO) if APELIDO_MODELO_PADRAO in modelos_disponiveis else 0
+            apelido_modelo_input = st.selectbox("Modelo de embedding", modelos_disponiveis, index=indice_padrao,
+                                                help="Modelo usado para gerar o embedding da vaga e o índice de candidatos consultado.")
+        else:
+            apelido_modelo_input = APELIDO_MODELO_PADRAO
+
+        # Top N: os N mais aderentes; similaridade mínima: todos acima do corte, paginados
+        modo_busca_input = st.radio("Modo de busca", ["Top N", "Similaridade mínima", "Por campos"], horizontal=True,
+                                    help="'Similaridade mínima' retorna todos os candidatos acima do corte (até "
+                                         f"{LIMITE_RESULTADOS_RAIO}), em páginas de {TAMANHO_PAGINA_RAIO}. 'Por campos' "
+                                         "compara título, atividades, competências e formação separadamente (requer gerar_tudo.py --campos).")
+        similaridade_minima_input = st.slider("Similaridade mínima com a vaga (%)", min_value=50, max_value=99,
+                                              value=int(SIMILARIDADE_MINIMA_PADRAO * 100),
+                                              help="Usado apenas no modo 'Similaridade mínima'.")
+
+        with st.expander("Pesos por campo (modo 'Por campos')"):
+            colunas_pesos = st.columns(len(CAMPOS_SEMANTICOS))
+            pesos_campos_input = {}
+            for coluna, campo in zip(colunas_pesos, CAMPOS_SEMANTICOS):
+                with coluna:
+                    pesos_campos_input[campo] = st.slider(ROTULOS_CAMPOS[campo], min_value=0.0, max_value=2.0,
+                                                          value=float(PESOS_CAMPOS[campo]), step=0.1)
+
         # O peso do histórico é fixado no backend, não mais na interface
         peso_historico_normalized = 0.3 # <--- PESO DO HISTÓRICO PADRÃO DEFINIDO AQUI (30%)
 
+        mostrar_tempos = st.checkbox("Mostrar tempos por etapa", value=False,
+                                     help="Exibe quanto cada etapa da busca (extração, embedding, FAISS, histórico, serialização) levou nesta requisição.")
+
         submit_vaga_candidato = st.form_submit_button("Buscar Candidatos")
 
     if submit_vaga_candidato:
-        if vaga_id_input:
+        # Uma nova busca descarta o cursor da busca por similaridade mínima e o resultado da busca anterior
+        st.session_state.pop("cursor_vaga", None)
+        st.session_state.pop("resultado_vaga", None)
+        st.session_state.pop("json_candidatos", None)
+        if vaga_id_input and modo_busca_input == "Similaridade mínima":
+            with st.spinner("Buscando todos os candidatos acima da similaridade mínima..."):
+                cursor = abrir_cursor_candidatos(vaga_id_input, similaridade_minima_input / 100, peso_historico_normalized, apelido_modelo_input)
+            if mostrar_tempos:
+                with st.expander("⏱️ Tempos por etapa desta busca", expanded=True):
+                    st.dataframe(pd.DataFrame(detalhamento_como_linhas(ultimo_detalhamento())).set_index("etapa"), use_container_width=True)
+            if "erro" in cursor:
+                st.error(cursor["erro"])
+            else:
+                st.session_state["cursor_vaga"] = cursor
+                st.session_state["pagina_cursor_vaga"] = 1
+        elif vaga_id_input:
             with st.spinner("Buscando candidatos e analisando aderência..."):
-                vaga_info = vagas_originais.get(vaga_id_input)
+                vaga_info = obter_registro("vagas", vaga_id_input, CAMINHO_REGISTROS)
                 if not vaga_info:
                     st.error(f"Vaga com ID '{vaga_id_input}' não encontrada. Por favor, verifique o ID.")
                 else:
-                    st.subheader(f"Resultados encontrados para a Vaga ID: {vaga_id_input}")
-                    st.markdown(f"**Vaga:** {vaga_info.get('info_titulo_vaga', 'Não disponível')}")
-                    st.markdown(f"**Cliente:** {vaga_info.get('info_cliente', 'Não informado')}")
-                    
-                    # --- TRECHO ATUALIZADO: Extração e exibição da descrição COMPLETA da vaga ---
-                    vaga_description_parts = []
-                    # Priorizamos 'perfil_principais_atividades' por ser o mais comum para descrição
-                    if vaga_info.get('perfil_principais_atividades'):
-                        vaga_description_parts.append(vaga_info['perfil_principais_atividades'])
-                    
-                    # Adicionamos outras partes relevantes se existirem, para garantir a descrição completa
-                    if vaga_info.get('perfil_competencia_tecnicas_e_comportamentais'):
-                        vaga_description_parts.append("\n\n**Competências Técnicas e Comportamentais:**\n" + vaga_info['perfil_competencia_tecnicas_e_comportamentais'])
-                    if vaga_info.get('perfil_demais_observacoes'):
-                        vaga_description_parts.append("\n\n**Outras Observações:**\n" + vaga_info['perfil_demais_observacoes'])
-                    
-                    full_description = "\n".join(filter(None, (p.strip() for p in vaga_description_parts))).strip()
-
-                    if full_description:
-                        st.markdown(f"**Descrição:**\n{full_description}") # Exibe a descrição completa
-                    else:
-                        st.markdown("**Descrição:** Não disponível.")
-                    # --- FIM TRECHO ATUALIZADO ---
-
-                    resultados_df_raw = encontrar_candidatos_para_vaga(vaga_id_input, num_candidatos_input, peso_historico_normalized)
-                    
-                    if isinstance(resultados_df_raw, dict) and "erro" in resultados_df_raw:
-                        st.error(resultados_df_raw["erro"])
-                    elif not resultados_df_raw:
-                        st.info("Nenhum candidato similar encontrado para esta vaga com os critérios atuais ou funcionalidades de busca não disponíveis.")
+                    if modo_busca_input == "Por campos":
+                        resultados_df_raw = encontrar_candidatos_por_campos(vaga_id_input, num_candidatos_input, peso_historico_normalized,
+                                                                            apelido_modelo_input, pesos_campos_input)
                     else:
-                        # Converter para DataFrame para melhor visualização e manipulação
-                        resultados_df = pd.DataFrame(resultados_df_raw)
-                        
-                        # Reordenar colunas para a visualização, exibindo apenas a pontuação final
-                        cols_display = [
-                            "Nome do Profissional", 
-                            "Email", 
-                            "Telefone", 
-                            "Pontuação Final de Aderência (0-100)", 
-                            "id_candidato"
-                        ]
-                        resultados_df_display = resultados_df[cols_display].copy()
-                        
-                        # Formatar coluna de pontuação para 2 casas decimais
-                        resultados_df_display["Pontuação Final de Aderência (0-100)"] = resultados_df_display["Pontuação Final de Aderência (0-100)"].apply(lambda x: f"{x:.2f}")
-
-                        st.markdown("---")
-                        st.write("Abaixo estão os candidatos mais aderentes à vaga, ordenados pela **maior Pontuação Final de Aderência**:")
-                        st.dataframe(resultados_df_display.set_index('id_candidato'), use_container_width=True)
-
-                        # Botão de download para todos os resultados
-                        # NOTA: O CSV de download ainda terá as colunas de debug para análise se necessário,
-                        # mas não serão visíveis na tela.
-                        csv_data = resultados_df.drop(columns=["Dados Completos", "Pontuação de Similaridade (0-100)_debug", "Pontuação de Histórico (Média)_debug"]).to_csv(index=False).encode('utf-8') 
+                        resultados_df_raw = encontrar_candidatos_para_vaga(vaga_id_input, num_candidatos_input, peso_historico_normalized, apelido_modelo_input)
+
+                    if mostrar_tempos:
+                        with st.expander("⏱️ Tempos por etapa desta busca", expanded=True):
+                            st.dataframe(pd.DataFrame(detalhamento_como_linhas(ultimo_detalhamento())).set_index("etapa"), use_container_width=True)
+                    # Guardado na sessão, como o cursor: os botões "Gerar JSON" reexecutam a página sem refazer a busca
+                    st.session_state["resultado_vaga"] = {"id_vaga": vaga_id_input, "vaga_info": vaga_info, "resultados": resultados_df_raw}
+        else:
+            st.warning("Por favor, insira um ID de vaga para buscar.")
+
+    resultado_vaga = st.session_state.get("resultado_vaga")
+    if resultado_vaga is not None:
+        vaga_id_resultado = resultado_vaga["id_vaga"]
+        vaga_info = resultado_vaga["vaga_info"]
+        resultados_df_raw = resultado_vaga["resultados"]
+        st.subheader(f"Resultados encontrados para a Vaga ID: {vaga_id_resultado}")
+        st.markdown(f"**Vaga:** {vaga_info.get('info_titulo_vaga', 'Não disponível')}")
+        st.markdown(f"**Cliente:** {vaga_info.get('info_cliente', 'Não informado')}")
+
+        # --- TRECHO ATUALIZADO: Extração e exibição da descrição COMPLETA da vaga ---
+        vaga_description_parts = []
+        # Priorizamos 'perfil_principais_atividades' por ser o mais comum para descrição
+        if vaga_info.get('perfil_principais_atividades'):
+            vaga_description_parts.append(vaga_info['perfil_principais_atividades'])
+
+        # Adicionamos outras partes relevantes se existirem, para garantir a descrição completa
+        if vaga_info.get('perfil_competencia_tecnicas_e_comportamentais'):
+            vaga_description_parts.append("\n\n**Competências Técnicas e Comportamentais:**\n" + vaga_info['perfil_competencia_tecnicas_e_comportamentais'])
+        if vaga_info.get('perfil_demais_observacoes'):
+            vaga_description_parts.append("\n\n**Outras Observações:**\n" + vaga_info['perfil_demais_observacoes'])
+
+        full_description = "\n".join(filter(None, (p.strip() for p in vaga_description_parts))).strip()
+
+        if full_description:
+            st.markdown(f"**Descrição:**\n{full_description}") # Exibe a descrição completa
+        else:
+            st.markdown("**Descrição:** Não disponível.")
+        # --- FIM TRECHO ATUALIZADO ---
+
+        if isinstance(resultados_df_raw, dict) and "erro" in resultados_df_raw:
+            st.error(resultados_df_raw["erro"])
+        elif not resultados_df_raw:
+            st.info("Nenhum candidato similar encontrado para esta vaga com os critérios atuais ou funcionalidades de busca não disponíveis.")
+        else:
+            # Converter para DataFrame para melhor visualização e manipulação
+            resultados_df = pd.DataFrame(resultados_df_raw)
+
+            # Reordenar colunas para a visualização, exibindo apenas a pontuação final
+            cols_display = [
+                "Nome do Profissional",
+                "Email",
+                "Telefone",
+                "Pontuação Final de Aderência (0-100)",
+                "id_candidato"
+            ]
+            # Busca por campos: mostra qual campo determinou cada resultado e a similaridade de cada um
+            cols_display += [col for col in resultados_df.columns if col == "Campo Determinante" or col.startswith("Similaridade ")]
+            resultados_df_display = resultados_df[cols_display].copy()
+
+            # Formatar coluna de pontuação para 2 casas decimais
+            resultados_df_display["Pontuação Final de Aderência (0-100)"] = resultados_df_display["Pontuação Final de Aderência (0-100)"].apply(lambda x: f"{x:.2f}")
+
+            st.markdown("---")
+            st.write("Abaixo estão os candidatos mais aderentes à vaga, ordenados pela **maior Pontuação Final de Aderência**:")
+            st.dataframe(resultados_df_display.set_index('id_candidato'), use_container_width=True)
+
+            # Botão de download para todos os resultados
+            # NOTA: O CSV de download ainda terá as colunas de debug para análise se necessário,
+            # mas não serão visíveis na tela.
+            csv_data = resultados_df.drop(columns=["Pontuação de Similaridade (0-100)_debug", "Pontuação de Histórico (Média)_debug"]).to_csv(index=False).encode('utf-8')
+            st.download_button(
+                label="Download de Todos os Dados dos Candidatos (CSV)",
+                data=csv_data,
+                file_name=f"candidatos_vaga_{vaga_id_resultado}.csv",
+                mime="text/csv",
+                key=f"download_csv_vaga_{vaga_id_resultado}"
+            )
+
+            # Adicionar opção de download individual (JSON) para cada candidato.
+            # O JSON só é montado quando o usuário pede ("Gerar JSON") e fica em st.session_state para o download.
+            st.markdown("---")
+            st.subheader("Download individual dos dados completos dos candidatos:")
+            json_candidatos = st.session_state.setdefault("json_candidatos", {})
+            for idx, row in resultados_df.iterrows():
+                col_name, col_download = st.columns([0.7, 0.3])
+                with col_name:
+                    st.write(f"**{row['Nome do Profissional']}** (ID: {row['id_candidato']})")
+                with col_download:
+                    if row['id_candidato'] in json_candidatos:
                         st.download_button(
-                            label="Download de Todos os Dados dos Candidatos (CSV)",
-                            data=csv_data,
-                            file_name=f"candidatos_vaga_{vaga_id_input}.csv",
-                            mime="text/csv",
-                            key=f"download_csv_vaga_{vaga_id_input}"
+                            label="Download JSON",
+                            data=json_candidatos[row['id_candidato']],
+                            file_name=f"candidato_{row['id_candidato']}.json",
+                            mime="application/json",
+                            key=f"download_json_cand_{row['id_candidato']}"
+                        )
+                    else:
+                        st.button(
+                            "Gerar JSON",
+                            key=f"gerar_json_cand_{row['id_candidato']}",
+                            on_click=gerar_json_candidato,
+                            args=(row['id_candidato'],)
                         )
 
-                        # Adicionar opção de download individual (JSON) para cada candidato
-                        st.markdown("---")
-                        st.subheader("Download individual dos dados completos dos candidatos:")
-                        for idx, row in resultados_df.iterrows():
-                            col_name, col_download = st.columns([0.7, 0.3])
-                            with col_name:
-                                st.write(f"**{row['Nome do Profissional']}** (ID: {row['id_candidato']})")
-                            with col_download:
-                                st.download_button(
-                                    label="Download JSON",
-                                    data=row['Dados Completos'].encode('utf-8'),
-                                    file_name=f"candidato_{row['id_candidato']}.json",
-                                    mime="application/json",
-                                    key=f"download_json_cand_{row['id_candidato']}"
-                                )
+    # Resultados paginados da busca por similaridade mínima: trocar de página só recorta o cursor
+    cursor = st.session_state.get("cursor_vaga")
+    if cursor is not None:
+        st.subheader(f"Candidatos com similaridade ≥ {cursor['similaridade_minima'] * 100:.0f}% para a Vaga ID: {cursor['id_vaga']}")
+        if not cursor["ids"]:
+            st.info("Nenhum candidato acima da similaridade mínima. Reduza o corte para ampliar a busca.")
         else:
-            st.warning("Por favor, insira um ID de vaga para buscar.")
+            if cursor["truncado"]:
+                st.warning(f"{cursor['total_no_raio']} candidatos atingem o corte; exibindo os {LIMITE_RESULTADOS_RAIO} mais próximos da vaga.")
+            else:
+                st.markdown(f"**{len(cursor['ids'])}** candidato(s) acima do corte, ordenados pela **maior Pontuação Final de Aderência**.")
+            paginas = total_paginas(cursor)
+            pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key="pagina_cursor_vaga")
+            resultados_pagina = pd.DataFrame(pagina_cursor(cursor, int(pagina) - 1))
+            cols_display = [
+                "Nome do Profissional",
+                "Email",
+                "Telefone",
+                "Pontuação Final de Aderência (0-100)",
+                "Similaridade com a Vaga (%)",
+                "id_candidato"
+            ]
+            st.dataframe(resultados_pagina[cols_display].set_index('id_candidato'), use_container_width=True)
+            st.download_button(
+                label="Download desta página (CSV)",
+                data=resultados_pagina.drop(columns=["Pontuação de Similaridade (0-100)_debug", "Pontuação de Histórico (Média)_debug"]).to_csv(index=False).encode('utf-8'),
+                file_name=f"candidatos_vaga_{cursor['id_vaga']}_pagina_{int(pagina)}.csv",
+                mime="text/csv",
+                key=f"download_csv_cursor_{cursor['id_vaga']}_{int(pagina)}"
+            )
+
+    st.markdown("---")
+
+    # --- Seção: Busca semântica no histórico de prospects ---
+    st.header("🗂️ Buscar no Histórico de Prospects")
+    st.markdown("Descreva em texto livre o que procura (ex.: *inglês fluente, desistiu por salário*) para encontrar **interações passadas** parecidas, com base no título da vaga, na situação e nos comentários dos recrutadores.")
+
+    with st.form("form_busca_prospects"):
+        texto_busca_input = st.text_area("O que você procura no histórico?", height=80)
+        col_prosp1, col_prosp2 = st.columns([0.5, 0.5])
+        with col_prosp1:
+            num_interacoes_input = st.slider("Número de interações", min_value=5, max_value=100, value=20, step=5)
+        with col_prosp2:
+            agrupar_por_input = st.radio("Agrupar por", ["Candidato", "Vaga"], horizontal=True)
+        modelos_prospects = [apelido for apelido, entidades in descobrir_indices_disponiveis().items() if "prospects" in entidades]
+        if modelos_prospects:
+            indice_padrao = modelos_prospects.index(APELIDO_MODELO_PADRAO) if APELIDO_MODELO_PADRAO in modelos_prospects else 0
+            apelido_prospects_input = st.selectbox("Modelo de embedding", modelos_prospects, index=indice_padrao, key="modelo_prospects",
+                                                   help="Modelo usado para o embedding do texto e o índice de prospects consultado.")
+        else:
+            apelido_prospects_input = APELIDO_MODELO_PADRAO
+        submit_busca_prospects = st.form_submit_button("Buscar no Histórico")
+
+    if submit_busca_prospects:
+        with st.spinner("Buscando interações semelhantes no histórico..."):
+            interacoes = buscar_prospects(texto_busca_input, num_interacoes_input, apelido_prospects_input)
+        if isinstance(interacoes, dict) and "erro" in interacoes:
+            st.error(interacoes["erro"])
+        elif not interacoes:
+            st.info("Nenhuma interação semelhante encontrada no histórico.")
+        else:
+            chave_grupo = "id_candidato" if agrupar_por_input == "Candidato" else "id_vaga"
+            st.write(f"**{len(interacoes)} interações** mais semelhantes, agrupadas por {agrupar_por_input.lower()}:")
+            st.dataframe(agrupar_interacoes(interacoes, chave_grupo), use_container_width=True)
+            with st.expander("Ver todas as interações encontradas"):
+                st.dataframe(pd.DataFrame(interacoes).drop(columns=["Distância Euclidiana (Referência)"]), use_container_width=True, hide_index=True)
 
     st.markdown("---")
@@ -0,0 +1,209 @@
+import os
+import csv
+import json
+import random
+import logging
+from datetime import datetime, timedelta
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DICIONARIOS_DIR = os.path.join(BASE_DIR, '..', 'arquivos auxiliares')
+
+DICIONARIO_APPS = os.path.join(DICIONARIOS_DIR, "Dicionário Apps finalizado.csv")
+DICIONARIO_VAGAS = os.path.join(DICIONARIOS_DIR, "Dicionário Vagas finalizado.csv")
+DICIONARIO_PROSPECTS = os.path.join(DICIONARIOS_DIR, "Dicionário Prospects finalizado.csv")
+
+# Seção (prefixo da chave no JSON) de cada campo dos dicionários, como em data/*.json
+SECOES_APPLICANTS = {
+    "infos_basicas_": ["telefone_recado", "telefone", "objetivo_profissional", "data_criacao", "inserido_por", "email",
+                       "local", "sabendo_de_nos_por", "data_atualizacao", "codigo_profissional", "nome"],
+    "informacoes_pessoais_": ["data_aceite", "nome", "cpf", "fonte_indicacao", "email", "email_secundario", "data_nascimento",
+                              "telefone_celular", "telefone_recado", "sexo", "estado_civil", "pcd", "endereco", "skype",
+                              "url_linkedin", "facebook", "download_cv"],
+    "informacoes_profissionais_": ["titulo_profissional", "area_atuacao", "conhecimentos_tecnicos", "certificacoes",
+                                   "outras_certificacoes", "remuneracao", "nivel_profissional", "qualificacoes", "experiencias"],
+    "formacao_e_idiomas_": ["nivel_academico", "nivel_ingles", "nivel_espanhol", "outro_idioma", "instituicao_ensino_superior",
+                            "cursos", "ano_conclusao", "outro_curso"],
+    "": ["cv_pt", "cv_en"],
+}
+SECOES_VAGAS = {
+    "info_": ["titulo_vaga", "vaga_sap", "data_requicisao", "limite_esperado_para_contratacao", "cliente", "solicitante_cliente",
+              "empresa_divisao", "requisitante", "analista_responsavel", "tipo_contratacao", "prazo_contratacao", "objetivo_vaga",
+              "prioridade_vaga", "origem_vaga", "superior_imediato", "nome", "telefone", "data_inicial", "data_final", "nome_substituto"],
+    "perfil_": ["pais", "estado", "cidade", "bairro", "regiao", "local_trabalho", "vaga_especifica_para_pcd", "faixa_etaria",
+                "horario_trabalho", "nivel profissional", "nivel_academico", "nivel_ingles", "nivel_espanhol", "outro_idioma",
+                "areas_atuacao", "principais_atividades", "competencia_tecnicas_e_comportamentais", "demais_observacoes",
+                "viagens_requeridas", "equipamentos_necessarios", "habilidades_comportamentais_necessarias"],
+    "benef_": ["valor_venda", "valor_compra_1", "valor_compra_2"],
+}
+CHAVES_PROSPECTS = {"vaga_id": "id_vaga", "titulo_vaga": "titulo", "modalidade_vaga": "modalidade"}
+
+# Vocabulário para textos plausíveis (o conteúdo afeta o tamanho dos textos e o custo do encode)
+TITULOS = ["Desenvolvedor Java", "Desenvolvedor Python", "Consultor SAP FI", "Consultor SAP MM", "Analista de Dados",
+           "Engenheiro de Dados", "Analista de Infraestrutura", "Gerente de Projetos", "Scrum Master", "Analista de Testes",
+           "Arquiteto de Soluções", "Analista de Suporte", "Product Owner", "DBA Oracle", "Desenvolvedor Front-end"]
+HABILIDADES = ["Java", "Spring Boot", "Python", "Django", "SQL", "Oracle", "SAP ABAP", "SAP FI", "Power BI", "AWS", "Azure",
+               "Docker", "Kubernetes", "React", "Angular", "Linux", "Scrum", "Kanban", "ITIL", "Excel avançado", "Kafka", "Spark"]
+NIVEIS_IDIOMA = ["Nenhum", "Básico", "Intermediário", "Avançado", "Fluente"]
+NIVEIS_ACADEMICOS = ["Ensino Médio Completo", "Ensino Superior Incompleto", "Ensino Superior Completo", "Pós Graduação Completo", "Mestrado Completo"]
+NIVEIS_PROFISSIONAIS = ["Júnior", "Pleno", "Sênior", "Especialista", "Analista"]
+CIDADES = [("São Paulo", "São Paulo"), ("Rio de Janeiro", "Rio de Janeiro"), ("Belo Horizonte", "Minas Gerais"),
+           ("Curitiba", "Paraná"), ("Porto Alegre", "Rio Grande do Sul"), ("Recife", "Pernambuco"), ("Barueri", "São Paulo")]
+CLIENTES = ["Morris, Moran and Dodson", "Gonzalez and Sons", "Nelson-Page", "Miller-Curry", "Jenkins-Walker", "Barnes-Woods"]
+RECRUTADORES = ["Ana Lívia Moreira", "Carolina Aparecida", "Juliana Cassiano", "Laura Pacheco", "Ingrid Sales"]
+SITUACOES = ["Contratado", "Encaminhado ao Requisitante", "Entrevista com Cliente", "Em Negociação", "Em Andamento",
+             "Aguardando Contato", "Em avaliação pelo RH", "Desistiu", "Rejeitado", "Não Atende aos Requisitos", "Prospect"]
+PALAVRAS = ("experiência projetos sistemas desenvolvimento implantação suporte clientes equipe análise requisitos "
+            "integração banco dados relatórios melhoria processos atendimento documentação testes entregas").split()
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- ESQUEMA (a partir dos dicionários de 'arquivos auxiliares') ---
+
+def ler_dicionario(caminho):
+    """
+    Lê um dicionário de dados (campo;tipo;...) e retorna a lista de (campo, tipo).
+    O dicionário de prospects tem cabeçalho e o tipo final na terceira coluna.
+    """
+    campos = []
+    with open(caminho, 'r', encoding='latin-1', newline='') as f:
+        for linha in csv.reader(f, delimiter=';'):
+            if len(linha) < 3 or linha[0] == "nome_coluna":
+                continue
+            tipo = linha[2] if linha[2] in ("string", "int", "float", "datetime", "object") else linha[1]
+            campos.append((linha[0].strip(), tipo.strip()))
+    return campos
+
+def _chaves_json(campo, secoes):
+    return [prefixo + campo for prefixo, nomes in secoes.items() if campo in nomes] or [campo]
+
+# --- GERADORES DE VALORES ---
+
+def _data(rng):
+    return (datetime(2018, 1, 1) + timedelta(days=rng.randrange(2500))).strftime("%d-%m-%Y")
+
+def _frase(rng, n_palavras):
+    return " ".join(rng.choice(PALAVRAS) for _ in range(n_palavras))
+
+def _valor_generico(rng, tipo):
+    if tipo == "datetime":
+        return _data(rng)
+    if tipo in ("int", "float"):
+        return rng.randrange(1000, 20000)
+    return _frase(rng, 3)
+
+def gerar_applicant(rng, codigo, campos):
+    titulo = rng.choice(TITULOS)
+    habilidades = ", ".join(rng.sample(HABILIDADES, 5))
+    cidade, estado = rng.choice(CIDADES)
+    nome = f"Candidato {codigo}"
+    especificos = {
+        "codigo_profissional": str(codigo), "nome": nome, "email": f"candidato{codigo}@exemplo.com",
+        "cpf": f"{rng.randrange(10**11):011d}", "local": f"{cidade}, {estado}", "endereco": f"{cidade}, {estado}",
+        "titulo_profissional": titulo, "conhecimentos_tecnicos": habilidades,
+        "nivel_academico": rng.choice(NIVEIS_ACADEMICOS), "nivel_ingles": rng.choice(NIVEIS_IDIOMA),
+        "nivel_espanhol": rng.choice(NIVEIS_IDIOMA), "nivel_profissional": rng.choice(NIVEIS_PROFISSIONAIS),
+        "objetivo_profissional": titulo, "sexo": rng.choice(["Masculino", "Feminino"]),
+        "cv_pt": f"{titulo}. Conhecimentos em {habilidades}. " + _frase(rng, rng.randrange(80, 200)),
+        "cv_en": "",
+    }
+    registro = {}
+    for campo, tipo in campos:
+        valor = especificos.get(campo, _valor_generico(rng, tipo))
+        for chave in _chaves_json(campo, SECOES_APPLICANTS):
+            registro[chave] = valor
+    return registro
+
+def gerar_vaga(rng, id_vaga, campos):
+    titulo = f"{rng.choice(TITULOS)} {rng.choice(NIVEIS_PROFISSIONAIS)}"
+    cidade, estado = rng.choice(CIDADES)
+    especificos = {
+        "vaga_id": id_vaga, "titulo_vaga": titulo, "cliente": rng.choice(CLIENTES), "analista_responsavel": rng.choice(RECRUTADORES),
+        "cidade": cidade, "estado": estado, "pais": "Brasil", "nivel profissional": rng.choice(NIVEIS_PROFISSIONAIS),
+        "nivel_academico": rng.choice(NIVEIS_ACADEMICOS), "nivel_ingles": rng.choice(NIVEIS_IDIOMA + [""]),
+        "nivel_espanhol": rng.choice(NIVEIS_IDIOMA + [""]), "areas_atuacao": "TI - Desenvolvimento/Programação",
+        "principais_atividades": _frase(rng, rng.randrange(30, 80)),
+        "competencia_tecnicas_e_comportamentais": ", ".join(rng.sample(HABILIDADES, 4)) + ". " + _frase(rng, 20),
+        "tipo_contratacao": rng.choice(["CLT Full", "PJ/Autônomo", "Hunting"]), "vaga_sap": rng.choice(["Sim", "Não"]),
+    }
+    registro = {}
+    for campo, tipo in campos:
+        valor = especificos.get(campo, _valor_generico(rng, tipo))
+        for chave in _chaves_json(campo, SECOES_VAGAS):
+            registro["id_vaga" if campo == "vaga_id" else chave] = valor
+    return registro
+
+def gerar_prospect(rng, campos, id_vaga, titulo_vaga, codigo):
+    especificos = {
+        "vaga_id": id_vaga, "titulo_vaga": titulo_vaga, "codigo": str(codigo), "nome": f"Candidato {codigo}",
+        "situacao_candidado": rng.choice(SITUACOES), "recrutador": rng.choice(RECRUTADORES),
+        "comentario": rng.choice(["", "", "Candidato com bom perfil técnico.", "Sem disponibilidade.", _frase(rng, 12)]),
+        "modalidade_vaga": "",
+    }
+    registro = {}
+    for campo, tipo in campos:
+        valor = especificos.get(campo, _valor_generico(rng, tipo))
+        registro[CHAVES_PROSPECTS.get(campo, f"prospect_{campo}")] = valor
+    return registro
+
+# --- ESCRITA ---
+
+def _escrever_lista_json(caminho, registros):
+    """Grava uma lista JSON registro a registro, sem montar a string inteira em memória."""
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for i, registro in enumerate(registros):
+            if i:
+                f.write(",")
+            json.dump(registro, f, ensure_ascii=False)
+        f.write("]")
+
+def gerar_base_sintetica(destino, num_candidatos, num_vagas=None, prospects_por_vaga=5, seed=42):
+    """
+    Gera applicants.json, vagas.json e prospects.json sintéticos em 'destino', seguindo os
+    esquemas dos dicionários em 'arquivos auxiliares' e o formato (lista de registros) de data/.
+
+    Returns:
+        dict: Quantidade de registros gerados por arquivo.
+    """
+    rng = random.Random(seed)
+    num_vagas = num_vagas or max(10, num_candidatos // 10)
+    os.makedirs(destino, exist_ok=True)
+
+    campos_apps = ler_dicionario(DICIONARIO_APPS)
+    campos_vagas = ler_dicionario(DICIONARIO_VAGAS)
+    campos_prospects = ler_dicionario(DICIONARIO_PROSPECTS)
+
+    primeiro_codigo = 31000
+    _escrever_lista_json(os.path.join(destino, "applicants.json"),
+                         (gerar_applicant(rng, primeiro_codigo + i, campos_apps) for i in range(num_candidatos)))
+
+    titulos = {}
+    def vagas():
+        for i in range(num_vagas):
+            vaga = gerar_vaga(rng, 5000 + i, campos_vagas)
+            titulos[vaga["id_vaga"]] = vaga["info_titulo_vaga"]
+            yield vaga
+    _escrever_lista_json(os.path.join(destino, "vagas.json"), vagas())
+
+    def prospects():
+        for id_vaga, titulo in titulos.items():
+            for _ in range(prospects_por_vaga):
+                yield gerar_prospect(rng, campos_prospects, id_vaga, titulo, primeiro_codigo + rng.randrange(num_candidatos))
+    _escrever_lista_json(os.path.join(destino, "prospects.json"), prospects())
+
+    contagem = {"applicants": num_candidatos, "vagas": num_vagas, "prospects": num_vagas * prospects_por_vaga}
+    logging.info(f"Base sintética gerada em {destino}: {contagem}")
+    return contagem
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera uma base sintética de vagas, candidatos e prospects.")
+    parser.add_argument("destino", help="Diretório onde os JSONs serão gravados.")
+    parser.add_argument("--candidatos", type=int, default=10000)
+    parser.add_argument("--vagas", type=int, default=None, help="Padrão: candidatos / 10.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    gerar_base_sintetica(args.destino, args.candidatos, args.vagas, seed=args.seed)
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import logging
+import subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import faiss
+
+from dados_sinteticos import gerar_base_sintetica
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.abspath(os.path.join(BASE_DIR, '..'))
+GERAR_TUDO = os.path.join(RAIZ, 'embeddings', 'gerar_tudo.py')
+SONDA = os.path.join(BASE_DIR, 'sonda.py')
+
+ESCALAS_PADRAO = (10_000, 100_000, 1_000_000)
+# Registros efetivamente codificados para medir o throughput do build (o transformer em CPU
+# tornaria inviável codificar 1M de currículos a cada execução do benchmark)
+AMOSTRA_BUILD = 2_000
+APELIDO_BENCHMARK = "original"
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- FUNÇÕES AUXILIARES ---
+
+def _executar(argumentos, dados_dir, model_dir):
+    """
+    Executa um subprocesso apontando a aplicação para a base sintética.
+
+    Returns:
+        tuple: (segundos, rss de pico deste subprocesso em MB, última linha da saída)
+    """
+    env = dict(os.environ, DECISION_DATA_DIR=dados_dir, DECISION_MODEL_DIR=model_dir)
+    # Saídas em arquivos temporários (e não pipes) para esperar o filho com os.wait4, que devolve o uso de
+    # recursos só deste processo; RUSAGE_CHILDREN acumularia o pico de todos os filhos já encerrados.
+    with tempfile.TemporaryFile(mode='w+') as saida, tempfile.TemporaryFile(mode='w+') as erros:
+        inicio = time.perf_counter()
+        processo = subprocess.Popen([sys.executable] + argumentos, env=env, cwd=RAIZ, stdout=saida, stderr=erros, text=True)
+        _, status, uso = os.wait4(processo.pid, 0)
+        duracao = time.perf_counter() - inicio
+        processo.returncode = os.waitstatus_to_exitcode(status)
+        saida.seek(0)
+        erros.seek(0)
+        stdout, stderr = saida.read(), erros.read()
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha em {' '.join(argumentos)}:\n{stderr[-2000:]}")
+    # ru_maxrss é reportado em KB no Linux. O Linux mantém o pico através do exec: o valor nunca fica abaixo
+    # do RSS deste processo no momento do fork (dezenas de MB, pequeno perto do build com o modelo carregado).
+    rss = uso.ru_maxrss / 1024
+    linhas = stdout.strip().splitlines()
+    return duracao, round(rss, 1), (linhas[-1] if linhas else "")
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def replicar_indice(origem, ids, destino_index, destino_metadados, seed=0, bloco=50_000):
+    """
+    Monta um índice flat com len(ids) vetores a partir dos vetores reais de uma amostra,
+    replicando-os com ruído gaussiano. Mantém o custo de busca/carga de um corpus do tamanho alvo
+    sem codificar todos os registros.
+    """
+    base = origem.reconstruct_n(0, origem.ntotal).astype(np.float32)
+    rng = np.random.default_rng(seed)
+    escala_ruido = float(base.std()) * 0.05
+    index = faiss.IndexFlatL2(base.shape[1])
+    for inicio in range(0, len(ids), bloco):
+        n = min(bloco, len(ids) - inicio)
+        vetores = base[rng.integers(0, len(base), n)] + rng.normal(0, escala_ruido, (n, base.shape[1])).astype(np.float32)
+        index.add(np.ascontiguousarray(vetores, dtype=np.float32))
+    faiss.write_index(index, destino_index)
+    pd.DataFrame({"id_original": ids, "embedding_id": [f"cand_{i + 1}" for i in range(len(ids))]}).to_pickle(destino_metadados)
+
+# --- BENCHMARK POR ESCALA ---
+
+def benchmark_escala(num_candidatos, diretorio, amostra_build=AMOSTRA_BUILD, consultas=100, lote_cadastro=50):
+    dados_dir = os.path.join(diretorio, "data")
+    model_dir = os.path.join(diretorio, "models1")
+    amostra_dados = os.path.join(diretorio, "amostra_data")
+    amostra_models = os.path.join(diretorio, "amostra_models1")
+    os.makedirs(model_dir, exist_ok=True)
+
+    resultado = {"candidatos": num_candidatos}
+    resultado["base"] = gerar_base_sintetica(dados_dir, num_candidatos)
+
+    # 1. Throughput do build (gerar_tudo em uma amostra da base, com o modelo real)
+    tamanho_amostra = min(num_candidatos, amostra_build)
+    contagem = gerar_base_sintetica(amostra_dados, tamanho_amostra)
+    duracao, rss, _ = _executar([GERAR_TUDO, "--modelos", APELIDO_BENCHMARK, "--completo"], amostra_dados, amostra_models)
+    registros = sum(contagem.values())
+    resultado["build"] = {"registros": registros, "segundos": round(duracao, 3),
+                          "registros_por_s": round(registros / duracao, 2), "rss_pico_mb": rss}
+
+    # 2. Índices legados do tamanho alvo, a partir dos vetores reais da amostra
+    for entidade, chave, total in (("candidatos", "infos_basicas_codigo_profissional", num_candidatos),
+                                   ("vagas", "id_vaga", resultado["base"]["vagas"])):
+        origem = faiss.read_index(os.path.join(amostra_models, f"faiss_index_{entidade}_{APELIDO_BENCHMARK}.index"))
+        with open(os.path.join(dados_dir, "applicants.json" if entidade == "candidatos" else "vagas.json"), 'r', encoding='utf-8') as f:
+            ids = [str(item[chave]) for item in json.load(f)]
+        replicar_indice(origem, ids[:total], os.path.join(model_dir, f"index_{entidade}.faiss"),
+                        os.path.join(model_dir, f"{entidade}_metadados.pkl"))
+
+    # 3. Inicialização, busca e cadastro, cada um em um processo limpo
+    _, _, saida = _executar([SONDA, "inicializacao"], dados_dir, model_dir)
+    resultado["inicializacao"] = json.loads(saida)
+    _, _, saida = _executar([SONDA, "busca", "--consultas", str(consultas)], dados_dir, model_dir)
+    resultado["busca"] = json.loads(saida)
+    _, _, saida = _executar([SONDA, "cadastro", "--lote", str(lote_cadastro)], dados_dir, model_dir)
+    resultado["cadastro"] = json.loads(saida)
+    return resultado
+
+def executar(escalas=ESCALAS_PADRAO, amostra_build=AMOSTRA_BUILD, consultas=100, lote_cadastro=50, manter_arquivos=False):
+    relatorio = {
+        "commit": _commit_atual(),
+        "executado_em": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(), "cpus": os.cpu_count()},
+        "escalas": {},
+    }
+    for escala in escalas:
+        diretorio = tempfile.mkdtemp(prefix=f"decision_bench_{escala}_")
+        logging.info(f"Benchmark com {escala} candidatos em {diretorio}...")
+        try:
+            relatorio["escalas"][str(escala)] = benchmark_escala(escala, diretorio, amostra_build, consultas, lote_cadastro)
+        finally:
+            if not manter_arquivos:
+                shutil.rmtree(diretorio, ignore_errors=True)
+        logging.info(f"Escala {escala}: {json.dumps(relatorio['escalas'][str(escala)], ensure_ascii=False)}")
+    return relatorio
+
+# --- COMPARAÇÃO ENTRE RELATÓRIOS ---
+
+def _folhas_numericas(dados, prefixo=""):
+    for chave, valor in dados.items():
+        caminho = f"{prefixo}.{chave}" if prefixo else chave
+        if isinstance(valor, dict):
+            yield from _folhas_numericas(valor, caminho)
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            yield caminho, valor
+
+def comparar_relatorios(anterior, atual):
+    """
+    Compara duas execuções (ex.: commit base vs. commit atual) métrica a métrica.
+
+    Returns:
+        list: Tuplas (métrica, valor anterior, valor atual, variação relativa).
+    """
+    antes = dict(_folhas_numericas(anterior.get("escalas", {})))
+    comparacao = []
+    for metrica, valor in _folhas_numericas(atual.get("escalas", {})):
+        if metrica in antes:
+            variacao = (valor - antes[metrica]) / antes[metrica] if antes[metrica] else None
+            comparacao.append((metrica, antes[metrica], valor, variacao))
+    return comparacao
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks de build, busca, cadastro, memória e inicialização.")
+    parser.add_argument("--escalas", nargs="*", type=int, default=list(ESCALAS_PADRAO))
+    parser.add_argument("--amostra-build", type=int, default=AMOSTRA_BUILD)
+    parser.add_argument("--consultas", type=int, default=100)
+    parser.add_argument("--lote-cadastro", type=int, default=50)
+    parser.add_argument("--saida", default="benchmark.json", help="Arquivo JSON do relatório.")
+    parser.add_argument("--comparar", help="Relatório JSON de uma execução anterior para comparação.")
+    parser.add_argument("--manter-arquivos", action="store_true", help="Não apaga as bases sintéticas geradas.")
+    args = parser.parse_args()
+
+    relatorio = executar(args.escalas, args.amostra_build, args.consultas, args.lote_cadastro, args.manter_arquivos)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=4, ensure_ascii=False)
+    logging.info(f"Relatório salvo em: {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+        for metrica, antes, depois, variacao in comparar_relatorios(anterior, relatorio):
+            texto_variacao = f"{variacao:+.1%}" if variacao is not None else "n/a"
+            logging.info(f"{metrica}: {antes} -> {depois} ({texto_variacao})")
@@ -0,0 +1,99 @@
+# Sonda executada em subprocesso pelo executar_benchmarks.py.
+# Cada modo importa as páginas da aplicação contra a base apontada por DECISION_DATA_DIR /
+# DECISION_MODEL_DIR, mede uma operação e imprime um JSON na última linha da saída padrão.
+# Rodar em processo separado isola o tempo de inicialização e o pico de memória (RSS) de cada medição.
+import os
+import sys
+import json
+import time
+import random
+import resource
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+def _rss_pico_mb():
+    # ru_maxrss é reportado em KB no Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def _percentis(amostras):
+    ordenadas = sorted(amostras)
+    def p(q):
+        return round(ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] * 1000, 3)
+    return {"p50_ms": p(0.50), "p99_ms": p(0.99), "media_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 3), "n": len(ordenadas)}
+
+def medir_inicializacao():
+    inicio = time.perf_counter()
+    from app_pages import servicos  # noqa: F401 (a importação carrega dados e recursos)
+    return {"inicializacao_s": round(time.perf_counter() - inicio, 3), "rss_pico_mb": _rss_pico_mb()}
+
+def medir_busca(num_consultas, k):
+    from app_pages import servicos
+
+    rng = random.Random(0)
+    ids_vagas = servicos.listar_ids("vagas", servicos.CAMINHO_REGISTROS)
+    consultas = [rng.choice(ids_vagas) for _ in range(num_consultas)]
+    modelo = servicos.carregar_modelo_embedding(servicos.APELIDO_MODELO_PADRAO)
+    partes = servicos.carregar_partes_indice(servicos.APELIDO_MODELO_PADRAO, "candidatos")
+
+    servicos.encontrar_candidatos_para_vaga(consultas[0], k)  # aquecimento
+    tempos_busca, tempos_completo = [], []
+    for id_vaga in consultas:
+        embedding = modelo.encode([servicos.extrair_texto_vaga(servicos.obter_registro("vagas", id_vaga, servicos.CAMINHO_REGISTROS))])[0]
+        inicio = time.perf_counter()
+        servicos.buscar_em_partes(embedding, partes, k=k * 5)
+        tempos_busca.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        servicos.encontrar_candidatos_para_vaga(id_vaga, k)
+        tempos_completo.append(time.perf_counter() - inicio)
+    return {"buscar_similares": _percentis(tempos_busca), "encontrar_candidatos_para_vaga": _percentis(tempos_completo),
+            "rss_pico_mb": _rss_pico_mb()}
+
+def medir_cadastro(tamanho_lote):
+    from app_pages import cadastro_candidatos as cadastro
+    from gerar_tudo import extrair_texto_candidato
+
+    def novo(codigo):
+        return {"infos_basicas_codigo_profissional": codigo, "infos_basicas_nome": f"Benchmark {codigo}",
+                "infos_basicas_email": f"bench{codigo}@exemplo.com",
+                "cv_pt": "Desenvolvedor Python com experiência em APIs REST, SQL e AWS."}
+
+    # Cadastro individual: o mesmo caminho do formulário (grava na base e indexa o candidato)
+    cadastro.preparar_base_candidatos()
+    inicio = time.perf_counter()
+    codigo = cadastro.gerar_proximo_id()
+    candidato = novo(codigo)
+    cadastro.salvar_candidatos([candidato])
+    cadastro.adicionar_candidato_ao_indice(extrair_texto_candidato(candidato), codigo)
+    individual = time.perf_counter() - inicio
+
+    # Cadastro em lote: o mesmo caminho da importação via JSON
+    inicio = time.perf_counter()
+    lote = [novo(codigo) for codigo in cadastro.gerar_proximos_ids(tamanho_lote)]
+    cadastro.salvar_candidatos(lote)
+    for candidato in lote:
+        cadastro.adicionar_candidato_ao_indice(extrair_texto_candidato(candidato), candidato["infos_basicas_codigo_profissional"])
+    total_lote = time.perf_counter() - inicio
+    return {"individual_ms": round(individual * 1000, 3), "lote_total_s": round(total_lote, 3),
+            "lote_ms_por_candidato": round(total_lote * 1000 / tamanho_lote, 3), "tamanho_lote": tamanho_lote,
+            "rss_pico_mb": _rss_pico_mb()}
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modo", choices=["inicializacao", "busca", "cadastro"])
+    parser.add_argument("--consultas", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lote", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.modo == "inicializacao":
+        resultado = medir_inicializacao()
+    elif args.modo == "busca":
+        resultado = medir_busca(args.consultas, args.k)
+    else:
+        resultado = medir_cadastro(args.lote)
+    print(json.dumps(resultado))
@@ -0,0 +1,191 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import faiss
+
+from registro_indices import APELIDO_LEGADO, descobrir_indices, carregar_vetores
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+
+# Número de pools (k do k-means) por entidade
+NUM_POOLS_PADRAO = int(os.environ.get("DECISION_NUM_POOLS", "16"))
+ITERACOES_KMEANS = 25
+
+# Serializa as atribuições feitas pelas páginas de cadastro (sessões do Streamlit no mesmo processo)
+_trava = threading.Lock()
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CAMINHOS ---
+
+def caminhos_pools(apelido, entidade, model_dir=None):
+    """
+    Arquivos do agrupamento de um par (modelo, entidade): centróides (n_pools, dim), atribuições
+    (id_original, pool e distância ao centróide, na mesma ordem dos vetores do índice), manifesto e
+    atribuições novas (registros cadastrados depois do agrupamento, uma linha "id<TAB>pool<TAB>distância"
+    acrescentada por cadastro; o manifesto guarda em 'bytes_novos' quantos bytes delas estão confirmados).
+    """
+    model_dir = model_dir or MODEL_DIR
+    return {
+        "centroides": os.path.join(model_dir, f"pools_{entidade}_{apelido}_centroides.npy"),
+        "atribuicoes": os.path.join(model_dir, f"pools_{entidade}_{apelido}_atribuicoes.pkl"),
+        "manifesto": os.path.join(model_dir, f"pools_{entidade}_{apelido}.json"),
+        "novos": os.path.join(model_dir, f"pools_{entidade}_{apelido}_novos.tsv"),
+    }
+
+def _salvar_manifesto(caminho, manifesto):
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def _salvar_atribuicoes(caminho, atribuicoes):
+    temporario = caminho + ".tmp"
+    atribuicoes.to_pickle(temporario)
+    os.replace(temporario, caminho)
+
+def _ler_novos(caminho, tamanho):
+    # Só os bytes confirmados no manifesto: sobras de um acréscimo interrompido são ignoradas
+    linhas = []
+    if tamanho:
+        with open(caminho, 'rb') as f:
+            linhas = [linha.split("\t") for linha in f.read(tamanho).decode('utf-8').splitlines()]
+    return pd.DataFrame({"id_original": [linha[0] for linha in linhas],
+                         "pool": np.array([int(linha[1]) for linha in linhas], dtype=np.int32),
+                         "distancia": np.array([float(linha[2]) for linha in linhas], dtype=np.float32)})
+
+def _tamanhos(atribuicoes, num_pools):
+    contagem = np.bincount(atribuicoes["pool"].to_numpy(dtype=np.int64), minlength=num_pools)
+    return {str(pool): int(total) for pool, total in enumerate(contagem)}
+
+# --- AGRUPAMENTO OFFLINE ---
+
+def agrupar(apelido, entidade, num_pools=NUM_POOLS_PADRAO, model_dir=None, modelos=None, seed=0):
+    """
+    Agrupa os vetores de um par (modelo, entidade) de models1/ em pools com k-means (faiss.Kmeans)
+    e grava centróides, atribuições e manifesto.
+
+    Returns:
+        dict: Manifesto gravado (ou None se o índice não existir ou estiver vazio).
+    """
+    model_dir = model_dir or MODEL_DIR
+    info = descobrir_indices(model_dir, modelos).get(apelido, {}).get(entidade)
+    if info is None:
+        logging.warning(f"Índice de {entidade} do modelo '{apelido}' não encontrado em {model_dir}. Agrupamento ignorado.")
+        return None
+    vetores, ids = carregar_vetores(info)
+    if len(ids) == 0:
+        logging.warning(f"Índice de {entidade}/{apelido} vazio. Agrupamento ignorado.")
+        return None
+
+    num_pools = max(1, min(num_pools, len(ids)))
+    kmeans = faiss.Kmeans(vetores.shape[1], num_pools, niter=ITERACOES_KMEANS, seed=seed, verbose=False)
+    kmeans.train(vetores)
+    distancias, pools = kmeans.index.search(vetores, 1)
+    atribuicoes = pd.DataFrame({"id_original": ids, "pool": pools[:, 0].astype(np.int32), "distancia": distancias[:, 0]})
+
+    caminhos = caminhos_pools(apelido, entidade, model_dir)
+    manifesto = {
+        "apelido": apelido,
+        "entidade": entidade,
+        "modelo": info.get("modelo"),
+        "num_pools": num_pools,
+        "vetores": len(ids),
+        "bytes_novos": 0,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "tamanhos": _tamanhos(atribuicoes, num_pools),
+    }
+    with _trava:
+        np.save(caminhos["centroides"] + ".tmp.npy", kmeans.centroids.astype(np.float32))
+        os.replace(caminhos["centroides"] + ".tmp.npy", caminhos["centroides"])
+        _salvar_atribuicoes(caminhos["atribuicoes"], atribuicoes)
+        # As atribuições novas já entraram no k-means
+        if os.path.exists(caminhos["novos"]):
+            os.remove(caminhos["novos"])
+        _salvar_manifesto(caminhos["manifesto"], manifesto)
+    logging.info(f"{entidade}/{apelido}: {len(ids)} vetores agrupados em {num_pools} pools.")
+    return manifesto
+
+# --- CONSULTA ---
+
+def carregar_pools(apelido, entidade, model_dir=None):
+    """
+    Carrega o agrupamento de um par, com as atribuições novas do cadastro no fim.
+
+    Returns:
+        dict: {"centroides": ndarray, "atribuicoes": DataFrame, "manifesto": dict}, ou None se não houver.
+    """
+    caminhos = caminhos_pools(apelido, entidade, model_dir)
+    if not all(os.path.exists(caminhos[chave]) for chave in ("centroides", "atribuicoes", "manifesto")):
+        return None
+    with open(caminhos["manifesto"], 'r', encoding='utf-8') as f:
+        manifesto = json.load(f)
+    atribuicoes = pd.read_pickle(caminhos["atribuicoes"])
+    if manifesto.get("bytes_novos"):
+        atribuicoes = pd.concat([atribuicoes, _ler_novos(caminhos["novos"], manifesto["bytes_novos"])], ignore_index=True)
+    return {"centroides": np.load(caminhos["centroides"]), "atribuicoes": atribuicoes, "manifesto": manifesto}
+
+def ler_manifesto_pools(apelido, entidade, model_dir=None):
+    """Manifesto do agrupamento (tamanho de cada pool etc.), sem carregar centróides nem atribuições."""
+    try:
+        with open(caminhos_pools(apelido, entidade, model_dir)["manifesto"], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def pools_mais_proximos(vetor, centroides, quantidade=1):
+    """Pools cujos centróides estão mais próximos do vetor (em ordem crescente de distância L2)."""
+    distancias = ((centroides - np.asarray(vetor, dtype=np.float32)) ** 2).sum(axis=1)
+    quantidade = min(quantidade, len(centroides))
+    return np.argsort(distancias, kind="stable")[:quantidade]
+
+def atribuir_novo(apelido, entidade, id_original, vetor, model_dir=None):
+    """
+    Atribui um registro recém-cadastrado (e já adicionado ao fim do índice) ao pool mais próximo,
+    sem recalcular o k-means: os centróides só mudam no próximo agrupamento offline.
+    A atribuição é acrescentada ao arquivo de novos (as atribuições do agrupamento não são relidas nem
+    regravadas) e o manifesto só é atualizado depois dela, como no armazém de vetores.
+    Retorna o pool atribuído, ou None se o par ainda não foi agrupado.
+    """
+    caminhos = caminhos_pools(apelido, entidade, model_dir)
+    with _trava:
+        manifesto = ler_manifesto_pools(apelido, entidade, model_dir)
+        if manifesto is None or not all(os.path.exists(caminhos[chave]) for chave in ("centroides", "atribuicoes")):
+            return None
+        centroides = np.load(caminhos["centroides"])
+        pool = int(pools_mais_proximos(vetor, centroides, 1)[0])
+        distancia = float(((centroides[pool] - np.asarray(vetor, dtype=np.float32)) ** 2).sum())
+        if not os.path.exists(caminhos["novos"]):
+            open(caminhos["novos"], 'wb').close()
+        with open(caminhos["novos"], 'r+b') as f:
+            # Descarta sobras de um acréscimo interrompido antes de gravar o manifesto
+            f.truncate(manifesto.get("bytes_novos", 0))
+            f.seek(0, os.SEEK_END)
+            f.write(f"{id_original}\t{pool}\t{distancia!r}\n".encode('utf-8'))
+            manifesto["bytes_novos"] = f.tell()
+        manifesto["vetores"] += 1
+        manifesto["tamanhos"][str(pool)] = manifesto["tamanhos"].get(str(pool), 0) + 1
+        _salvar_manifesto(caminhos["manifesto"], manifesto)
+    logging.info(f"{entidade} {id_original} atribuído ao pool {pool} do modelo '{apelido}'.")
+    return pool
+
+if __name__ == "__main__":
+    import argparse
+    from gerar_tudo import EMBEDDING_MODELS
+
+    parser = argparse.ArgumentParser(description="Agrupa os vetores de candidatos e vagas em pools de talentos (k-means).")
+    parser.add_argument("--modelos", nargs="*", default=[APELIDO_LEGADO],
+                        help="Apelidos dos modelos (padrão: legado, o índice atualizado pelo cadastro).")
+    parser.add_argument("--entidades", nargs="*", choices=["candidatos", "vagas"], default=["candidatos", "vagas"])
+    parser.add_argument("--num-pools", type=int, default=NUM_POOLS_PADRAO, help="Número de pools (k do k-means).")
+    args = parser.parse_args()
+    for apelido in args.modelos:
+        for entidade in args.entidades:
+            agrupar(apelido, entidade, args.num_pools, modelos=EMBEDDING_MODELS)
@@ -0,0 +1,229 @@
+import os
+import json
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+
+# Cópia crua (float32, sem perdas) dos embeddings de cada par (modelo, entidade), independente do tipo de
+# índice FAISS. Três arquivos em models1/vetores/:
+#   {entidade}_{apelido}.f32      -> matriz (linhas, dimensão) float32 contígua, lida com np.memmap
+#   {entidade}_{apelido}_ids.tsv  -> uma linha "id_original<TAB>hash_texto" por vetor, na mesma ordem
+#   {entidade}_{apelido}.json     -> cabeçalho: modelo, backend de inferência, dimensão, número de linhas e
+#                                    tamanho do .tsv confirmados
+# Acréscimos gravam primeiro vetores e IDs e só depois o cabeçalho: se o processo cair no meio, as linhas
+# além do total do cabeçalho são descartadas no próximo acréscimo.
+DIRETORIO_ARMAZEM = "vetores"
+DTYPE_ARMAZEM = np.float32
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CAMINHOS ---
+
+def caminhos_armazem(apelido, entidade, model_dir=None):
+    diretorio = os.path.join(model_dir or MODEL_DIR, DIRETORIO_ARMAZEM)
+    return {
+        "vetores": os.path.join(diretorio, f"{entidade}_{apelido}.f32"),
+        "ids": os.path.join(diretorio, f"{entidade}_{apelido}_ids.tsv"),
+        "cabecalho": os.path.join(diretorio, f"{entidade}_{apelido}.json"),
+    }
+
+def ler_cabecalho(apelido, entidade, model_dir=None):
+    """Cabeçalho do armazém de um par (ou None se ele não existir)."""
+    try:
+        with open(caminhos_armazem(apelido, entidade, model_dir)["cabecalho"], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _salvar_cabecalho(caminho, cabecalho):
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(cabecalho, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def _backend(cabecalho):
+    # Armazéns gravados antes do registro do backend foram gerados com o PyTorch (padrão)
+    return cabecalho.get("backend", "torch")
+
+def _linha_ids(item_id, impressao):
+    return f"{item_id}\t{impressao or ''}\n"
+
+# --- GRAVAÇÃO ---
+
+def gravar_armazem(apelido, entidade, nome_modelo, vetores, ids, hashes=None, model_dir=None, backend="torch"):
+    """
+    Regrava o armazém inteiro de um par (ex.: ao fim de um build do gerar_tudo), alinhado com os metadados
+    do índice: a linha i de 'vetores' pertence a ids[i].
+    """
+    vetores = np.ascontiguousarray(vetores, dtype=DTYPE_ARMAZEM)
+    caminhos = caminhos_armazem(apelido, entidade, model_dir)
+    os.makedirs(os.path.dirname(caminhos["vetores"]), exist_ok=True)
+    hashes = hashes if hashes is not None else [None] * len(ids)
+    with open(caminhos["vetores"] + ".tmp", 'wb') as f:
+        vetores.tofile(f)
+    with open(caminhos["ids"] + ".tmp", 'w', encoding='utf-8') as f:
+        f.writelines(_linha_ids(item_id, impressao) for item_id, impressao in zip(ids, hashes))
+    os.replace(caminhos["vetores"] + ".tmp", caminhos["vetores"])
+    os.replace(caminhos["ids"] + ".tmp", caminhos["ids"])
+    _salvar_cabecalho(caminhos["cabecalho"], {
+        "apelido": apelido,
+        "entidade": entidade,
+        "modelo": nome_modelo,
+        "backend": backend,
+        "dimensao": int(vetores.shape[1]) if vetores.ndim == 2 and len(vetores) else None,
+        "linhas": int(len(ids)),
+        "bytes_ids": os.path.getsize(caminhos["ids"]),
+        "atualizado_em": datetime.now().isoformat(timespec="seconds"),
+    })
+    logging.info(f"Armazém de vetores de {entidade}/{apelido} gravado ({len(ids)} vetores) em {caminhos['vetores']}")
+
+def anexar_armazem(apelido, entidade, nome_modelo, vetores, ids, hashes=None, model_dir=None, backend="torch"):
+    """
+    Acrescenta vetores ao fim do armazém (ex.: cadastro de um candidato), sem reescrever os existentes.
+    Cria o armazém se ele ainda não existir.
+    """
+    vetores = np.ascontiguousarray(np.atleast_2d(vetores), dtype=DTYPE_ARMAZEM)
+    cabecalho = ler_cabecalho(apelido, entidade, model_dir)
+    if cabecalho is None or not cabecalho.get("linhas"):
+        gravar_armazem(apelido, entidade, nome_modelo, vetores, ids, hashes, model_dir, backend)
+        return
+    if cabecalho["modelo"] != nome_modelo or cabecalho["dimensao"] != vetores.shape[1] or _backend(cabecalho) != backend:
+        raise ValueError(f"Armazém de {entidade}/{apelido} é do modelo {cabecalho['modelo']} ({_backend(cabecalho)}, "
+                         f"{cabecalho['dimensao']} dimensões); não aceita vetores de {nome_modelo} ({backend}, {vetores.shape[1]} dimensões).")
+
+    caminhos = caminhos_armazem(apelido, entidade, model_dir)
+    linhas = cabecalho["linhas"]
+    hashes = hashes if hashes is not None else [None] * len(ids)
+    # Descarta sobras de um acréscimo interrompido antes de gravar o cabeçalho
+    with open(caminhos["vetores"], 'r+b') as f:
+        f.truncate(linhas * cabecalho["dimensao"] * np.dtype(DTYPE_ARMAZEM).itemsize)
+        f.seek(0, os.SEEK_END)
+        vetores.tofile(f)
+    with open(caminhos["ids"], 'r+b') as f:
+        f.truncate(cabecalho["bytes_ids"])
+        f.seek(0, os.SEEK_END)
+        f.write("".join(_linha_ids(item_id, impressao) for item_id, impressao in zip(ids, hashes)).encode('utf-8'))
+        cabecalho["bytes_ids"] = f.tell()
+    cabecalho["linhas"] = linhas + len(ids)
+    cabecalho["atualizado_em"] = datetime.now().isoformat(timespec="seconds")
+    _salvar_cabecalho(caminhos["cabecalho"], cabecalho)
+
+def acompanhar_indice(apelido, entidade, nome_modelo, index, ids_indice, vetores_novos, ids_novos, model_dir=None, backend="torch",
+                      hashes_novos=None):
+    """
+    Mantém o armazém alinhado com um índice que acabou de receber 'vetores_novos' no fim (páginas de cadastro).
+    Se o armazém não existe ou não acompanha o índice, é semeado com os vetores já no índice (reconstruídos)
+    e os novos vetores exatos; senão, os novos vetores são só acrescentados.
+    'hashes_novos' (build_incremental.hash_texto de cada texto) mantém o armazém utilizável pelo build
+    incremental, que ignora armazéns com linhas sem hash.
+    Falhas são registradas e não interrompem o cadastro: o armazém é uma cópia auxiliar.
+    """
+    try:
+        vetores_novos = np.atleast_2d(np.asarray(vetores_novos, dtype=DTYPE_ARMAZEM))
+        anteriores = index.ntotal - len(vetores_novos)
+        cabecalho = ler_cabecalho(apelido, entidade, model_dir)
+        if (cabecalho is not None and cabecalho.get("linhas") == anteriores and cabecalho.get("modelo") == nome_modelo
+                and _backend(cabecalho) == backend):
+            anexar_armazem(apelido, entidade, nome_modelo, vetores_novos, ids_novos, hashes_novos, model_dir, backend)
+            return
+        logging.info(f"Armazém de {entidade}/{apelido} ausente ou desalinhado do índice. Semeando a partir do índice.")
+        vetores = vetores_novos
+        if anteriores > 0:
+            vetores = np.vstack([index.reconstruct_n(0, anteriores).astype(DTYPE_ARMAZEM), vetores_novos])
+        # Os vetores reconstruídos do índice não têm hash de texto: o próximo build incremental recodifica o par
+        hashes = [None] * anteriores + (list(hashes_novos) if hashes_novos is not None else [None] * len(vetores_novos))
+        gravar_armazem(apelido, entidade, nome_modelo, vetores, [str(item_id) for item_id in ids_indice], hashes, model_dir, backend)
+    except Exception as e:
+        logging.warning(f"Não foi possível atualizar o armazém de vetores de {entidade}/{apelido}: {e}")
+
+# --- LEITURA ---
+
+def abrir_armazem(apelido, entidade, model_dir=None):
+    """
+    Abre o armazém de um par sem carregar os vetores em memória (np.memmap somente leitura).
+
+    Returns:
+        dict: {"vetores": memmap (linhas, dimensão), "ids": [str], "hashes": [str ou None], "cabecalho": dict},
+        ou None se o armazém não existir ou estiver vazio.
+    """
+    cabecalho = ler_cabecalho(apelido, entidade, model_dir)
+    if cabecalho is None or not cabecalho.get("linhas"):
+        return None
+    caminhos = caminhos_armazem(apelido, entidade, model_dir)
+    linhas, dimensao = cabecalho["linhas"], cabecalho["dimensao"]
+    vetores = np.memmap(caminhos["vetores"], dtype=DTYPE_ARMAZEM, mode='r', shape=(linhas, dimensao))
+    ids, hashes = [], []
+    with open(caminhos["ids"], 'r', encoding='utf-8') as f:
+        for _, linha in zip(range(linhas), f):
+            item_id, _, impressao = linha.rstrip("\n").partition("\t")
+            ids.append(item_id)
+            hashes.append(impressao or None)
+    if len(ids) != linhas:
+        logging.warning(f"Armazém de {entidade}/{apelido} com {len(ids)} IDs para {linhas} vetores. Ignorado.")
+        return None
+    return {"vetores": vetores, "ids": ids, "hashes": hashes, "cabecalho": cabecalho}
+
+def vetores_por_id(apelido, entidade, nome_modelo, model_dir=None, backend="torch"):
+    """
+    Vetores do armazém indexados pelo ID original (para o build incremental), se o armazém for do
+    modelo e backend de inferência informados e tiver o hash de texto de todas as linhas.
+
+    Returns:
+        dict: {id_original: (hash_texto, vetor float32)}, vazio se o armazém não puder ser usado.
+    """
+    armazem = abrir_armazem(apelido, entidade, model_dir)
+    if armazem is None or armazem["cabecalho"].get("modelo") != nome_modelo or None in armazem["hashes"]:
+        return {}
+    if _backend(armazem["cabecalho"]) != backend:
+        logging.info(f"Armazém de {entidade}/{apelido} gerado com o backend '{_backend(armazem['cabecalho'])}', não '{backend}'. Ignorado.")
+        return {}
+    vetores = armazem["vetores"]
+    return {item_id: (impressao, vetores[i]) for i, (item_id, impressao) in enumerate(zip(armazem["ids"], armazem["hashes"]))}
+
+# --- RECONSTRUÇÃO DE ÍNDICES ---
+
+def reconstruir_indice(apelido, entidade, tipo_indice, model_dir=None):
+    """
+    Regrava o índice FAISS, os metadados e o manifesto de um par a partir do armazém, sem passar pelo
+    modelo de embeddings (ex.: trocar flat por sq8 ou recuperar um índice corrompido).
+    O texto original não fica no armazém: os metadados reconstruídos têm id_original e hash_texto.
+    """
+    from gerar_tudo import montar_index, salvar_index, salvar_metadados
+    from registro_indices import APELIDO_LEGADO, caminhos_indice, salvar_manifesto
+
+    armazem = abrir_armazem(apelido, entidade, model_dir)
+    if armazem is None:
+        raise FileNotFoundError(f"Armazém de vetores de {entidade}/{apelido} não encontrado em {model_dir or MODEL_DIR}.")
+    index = montar_index(np.asarray(armazem["vetores"]), tipo_indice)
+    caminhos = caminhos_indice(apelido, entidade, model_dir)
+    metadados = pd.DataFrame({"id_original": armazem["ids"], "hash_texto": armazem["hashes"]})
+    if apelido == APELIDO_LEGADO:
+        # Mesmo formato dos metadados gravados pelas páginas de cadastro
+        metadados = pd.DataFrame({"id_original": armazem["ids"], "faiss_id": np.arange(len(armazem["ids"]))})
+    salvar_index(index, caminhos["index"])
+    salvar_metadados(metadados, caminhos["metadados"])
+    salvar_manifesto(apelido, entidade, armazem["cabecalho"]["modelo"], index, tipo_indice, model_dir, _backend(armazem["cabecalho"]))
+    logging.info(f"Índice {tipo_indice} de {entidade}/{apelido} reconstruído do armazém ({index.ntotal} vetores).")
+    return index
+
+if __name__ == "__main__":
+    import argparse
+    from gerar_tudo import TIPOS_INDICE, TIPO_INDICE_PADRAO
+
+    parser = argparse.ArgumentParser(description="Reconstrói índices FAISS a partir do armazém de vetores crus, sem recodificar.")
+    parser.add_argument("--modelos", nargs="+", required=True, help="Apelidos dos modelos (ex.: original, legado).")
+    parser.add_argument("--entidades", nargs="*", choices=["vagas", "candidatos", "prospects"], default=["vagas", "candidatos", "prospects"])
+    parser.add_argument("--tipo-indice", choices=TIPOS_INDICE, default=TIPO_INDICE_PADRAO)
+    args = parser.parse_args()
+    for apelido in args.modelos:
+        for entidade in args.entidades:
+            if ler_cabecalho(apelido, entidade) is None:
+                logging.warning(f"Sem armazém de vetores para {entidade}/{apelido}. Ignorado.")
+                continue
+            reconstruir_indice(apelido, entidade, args.tipo_indice)
@@ -0,0 +1,192 @@
+import os
+import time
+import logging
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_DIR = os.path.join(BASE_DIR, '..', 'models1', 'onnx')
+
+# Backends de inferência disponíveis:
+#   torch     -> SentenceTransformer padrão (PyTorch)
+#   onnx      -> ONNX Runtime em float32
+#   onnx_int8 -> ONNX Runtime com quantização dinâmica int8 (recomendado para CPU)
+BACKENDS_INFERENCIA = ("torch", "onnx", "onnx_int8")
+BACKEND_INFERENCIA = os.environ.get("DECISION_BACKEND_INFERENCIA", "torch")
+
+# Conjunto de instruções usado na quantização int8 (arm64, avx2, avx512, avx512_vnni)
+CONFIG_QUANTIZACAO = os.environ.get("DECISION_CONFIG_QUANTIZACAO", "avx2")
+
+# Similaridade de cosseno mínima entre os embeddings do backend e os do PyTorch
+LIMIAR_EQUIVALENCIA = 0.98
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+TEXTOS_AMOSTRA = [
+    "Vaga: Desenvolvedor Python Sênior Atividades Principais: APIs REST, Django, microsserviços.",
+    "Consultor SAP FI/CO com experiência em implantação e suporte. Inglês avançado.",
+    "Analista de dados com SQL, Power BI e Python. Nível Acadêmico: Ensino Superior Completo.",
+    "Gerente de projetos com certificação PMP e vivência em metodologias ágeis.",
+    "Desenvolvedor Java com Spring Boot, Kafka e AWS. Localização da Vaga: São Paulo, SP",
+    "Analista de infraestrutura Linux, redes e virtualização VMware.",
+    "Product Owner com foco em produtos digitais do setor financeiro.",
+    "Técnico de suporte N1/N2, atendimento a usuários e Service Desk. Espanhol básico.",
+]
+
+# --- FUNÇÕES AUXILIARES ---
+
+def _diretorio_onnx(nome_modelo):
+    """Diretório local onde o modelo exportado para ONNX é salvo."""
+    return os.path.join(ONNX_DIR, nome_modelo.replace("/", "__"))
+
+def _arquivo_int8(config=CONFIG_QUANTIZACAO):
+    return os.path.join("onnx", f"model_qint8_{config}.onnx")
+
+def exportar_modelo_onnx(nome_modelo, int8=True, config=CONFIG_QUANTIZACAO):
+    """
+    Exporta o modelo para ONNX (float32) e, com int8=True, gera a versão com quantização dinâmica int8.
+    A exportação é feita uma única vez: o modelo ONNX só é instanciado aqui quando falta algum arquivo.
+
+    Returns:
+        tuple: (diretório do modelo exportado, modelo ONNX float32 instanciado durante a exportação ou
+            None se os arquivos já existiam)
+    """
+    destino = _diretorio_onnx(nome_modelo)
+    modelo_onnx = None
+    if not os.path.exists(os.path.join(destino, "onnx", "model.onnx")) and not os.path.exists(os.path.join(destino, "model.onnx")):
+        logging.info(f"Exportando '{nome_modelo}' para ONNX em {destino}...")
+        modelo_onnx = SentenceTransformer(nome_modelo, backend="onnx")
+        modelo_onnx.save(destino)
+
+    if int8 and not os.path.exists(os.path.join(destino, _arquivo_int8(config))):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logging.info(f"Gerando quantização dinâmica int8 ({config}) para '{nome_modelo}'...")
+        if modelo_onnx is None:
+            modelo_onnx = SentenceTransformer(destino, backend="onnx")
+        export_dynamic_quantized_onnx_model(modelo_onnx, config, destino)
+    return destino, modelo_onnx
+
+def _com_backend(modelo, backend):
+    modelo.backend_inferencia = backend
+    return modelo
+
+def backend_do_modelo(modelo):
+    """Backend efetivamente carregado por carregar_modelo (pode diferir do pedido se houve fallback)."""
+    return getattr(modelo, "backend_inferencia", "torch")
+
+def carregar_modelo(nome_modelo, backend=None, fallback=True):
+    """
+    Carrega o modelo de embedding no backend de inferência configurado.
+    Em caso de falha nos backends ONNX (ex.: optimum/onnxruntime não instalados),
+    registra o erro e retorna o modelo PyTorch, para que a aplicação continue funcionando.
+    Com fallback=False a falha é propagada (benchmarks e builds, que precisam saber o backend real).
+    O backend carregado fica em backend_do_modelo(modelo).
+    """
+    backend = backend or BACKEND_INFERENCIA
+    if backend not in BACKENDS_INFERENCIA:
+        raise ValueError(f"Backend de inferência desconhecido: {backend}. Opções: {', '.join(BACKENDS_INFERENCIA)}")
+    if backend == "torch":
+        return _com_backend(SentenceTransformer(nome_modelo), "torch")
+
+    try:
+        destino, modelo_onnx = exportar_modelo_onnx(nome_modelo, int8=(backend == "onnx_int8"))
+        if backend == "onnx":
+            # O modelo instanciado na exportação já é o float32: não carrega uma segunda cópia
+            modelo = modelo_onnx or SentenceTransformer(destino, backend="onnx")
+        else:
+            del modelo_onnx
+            modelo = SentenceTransformer(destino, backend="onnx", model_kwargs={"file_name": _arquivo_int8()})
+        logging.info(f"Modelo '{nome_modelo}' carregado com backend '{backend}'.")
+        return _com_backend(modelo, backend)
+    except Exception as e:
+        if not fallback:
+            raise
+        logging.error(f"Falha ao carregar '{nome_modelo}' com backend '{backend}': {e}. Usando PyTorch.")
+        return _com_backend(SentenceTransformer(nome_modelo), "torch")
+
+# --- VERIFICAÇÃO E DESEMPENHO ---
+
+def verificar_equivalencia(modelo_referencia, modelo_candidato, textos=TEXTOS_AMOSTRA, limiar=LIMIAR_EQUIVALENCIA):
+    """
+    Compara os embeddings de dois modelos (ex.: PyTorch vs. ONNX int8) para os mesmos textos.
+
+    Returns:
+        dict: Similaridade de cosseno mínima/média e se o backend é considerado equivalente.
+    """
+    ref = modelo_referencia.encode(textos, convert_to_numpy=True).astype(np.float32)
+    cand = modelo_candidato.encode(textos, convert_to_numpy=True).astype(np.float32)
+    cos = np.sum(ref * cand, axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1))
+    return {
+        "cosseno_minimo": round(float(cos.min()), 5),
+        "cosseno_medio": round(float(cos.mean()), 5),
+        "equivalente": bool(cos.min() >= limiar),
+    }
+
+def medir_desempenho(modelo, textos=TEXTOS_AMOSTRA, repeticoes=5, batch_size=32):
+    """
+    Mede a latência de uma consulta isolada (p50) e o throughput em lote (textos/s).
+    """
+    modelo.encode(textos[:1])  # aquecimento
+    latencias = []
+    for _ in range(repeticoes):
+        for texto in textos:
+            inicio = time.perf_counter()
+            modelo.encode([texto])
+            latencias.append(time.perf_counter() - inicio)
+
+    lote = textos * max(1, 256 // len(textos))
+    inicio = time.perf_counter()
+    modelo.encode(lote, batch_size=batch_size)
+    duracao_lote = time.perf_counter() - inicio
+    return {
+        "latencia_p50_ms": round(float(np.percentile(latencias, 50)) * 1000, 2),
+        "latencia_p99_ms": round(float(np.percentile(latencias, 99)) * 1000, 2),
+        "throughput_textos_s": round(len(lote) / duracao_lote, 1),
+    }
+
+def comparar_backends(nome_modelo, backends=("onnx", "onnx_int8")):
+    """
+    Verifica a equivalência de cada backend com o PyTorch e reporta o ganho de latência/throughput.
+    Um backend que não carrega entra no relatório com o erro, em vez de ser medido como PyTorch.
+    """
+    referencia = carregar_modelo(nome_modelo, "torch")
+    base = medir_desempenho(referencia)
+    base["backend_carregado"] = backend_do_modelo(referencia)
+    relatorio = {"torch": base}
+    logging.info(f"[{nome_modelo}] torch: {base}")
+    for backend in backends:
+        try:
+            modelo = carregar_modelo(nome_modelo, backend, fallback=False)
+        except Exception as e:
+            logging.error(f"[{nome_modelo}] {backend} não pôde ser carregado: {e}")
+            relatorio[backend] = {"backend_carregado": None, "erro": str(e)}
+            continue
+        desempenho = medir_desempenho(modelo)
+        desempenho["backend_carregado"] = backend_do_modelo(modelo)
+        desempenho.update(verificar_equivalencia(referencia, modelo))
+        desempenho["ganho_latencia"] = round(base["latencia_p50_ms"] / desempenho["latencia_p50_ms"], 2)
+        desempenho["ganho_throughput"] = round(desempenho["throughput_textos_s"] / base["throughput_textos_s"], 2)
+        relatorio[backend] = desempenho
+        if not desempenho["equivalente"]:
+            logging.warning(f"[{nome_modelo}] {backend} diverge do PyTorch (cosseno mínimo {desempenho['cosseno_minimo']}).")
+        logging.info(f"[{nome_modelo}] {backend}: {desempenho}")
+    return relatorio
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from gerar_tudo import EMBEDDING_MODELS
+
+    parser = argparse.ArgumentParser(description="Exporta os modelos para ONNX int8 e compara com o PyTorch.")
+    parser.add_argument("--modelos", nargs="*", default=list(EMBEDDING_MODELS.keys()), choices=list(EMBEDDING_MODELS.keys()))
+    parser.add_argument("--saida", help="Caminho opcional para salvar o relatório em JSON.")
+    args = parser.parse_args()
+
+    relatorio = {apelido: comparar_backends(EMBEDDING_MODELS[apelido]) for apelido in args.modelos}
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=4, ensure_ascii=False)
+        logging.info(f"Relatório salvo em: {args.saida}")
@@ -0,0 +1,157 @@
+import os
+import re
+import glob
+import json
+import time
+import logging
+import numpy as np
+import faiss
+
+from gerar_tudo import MODEL_DIR, TIPOS_INDICE, montar_index
+from registro_indices import APELIDO_LEGADO
+from armazem_vetores import abrir_armazem
+
+# Nomes dos índices gravados pelo gerar_tudo e pelas páginas de cadastro (legado)
+_PADRAO_INDICE = re.compile(r"^faiss_index_(vagas|candidatos|prospects)_(.+)\.index$")
+_PADRAO_LEGADO = re.compile(r"^index_(vagas|candidatos|prospects)\.faiss$")
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- FUNÇÕES AUXILIARES ---
+
+def extrair_vetores(index):
+    """
+    Recupera a matriz (n, dim) de vetores float32 armazenados num índice FAISS.
+    Para índices flat a reconstrução é exata; para quantizados, é aproximada.
+    """
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal).astype(np.float32)
+
+def _par_do_indice(caminho):
+    """(apelido, entidade) de um arquivo de índice de models1/, ou None para nomes fora do padrão."""
+    nome = os.path.basename(caminho)
+    correspondencia = _PADRAO_INDICE.match(nome)
+    if correspondencia:
+        entidade, apelido = correspondencia.groups()
+        return apelido, entidade
+    correspondencia = _PADRAO_LEGADO.match(nome)
+    if correspondencia:
+        return APELIDO_LEGADO, correspondencia.group(1)
+    return None
+
+def vetores_de_referencia(caminho, index):
+    """
+    Vetores exatos (float32) usados como referência do benchmark: os do armazém de vetores crus
+    (armazem_vetores.py) quando ele acompanha o índice; senão os reconstruídos do próprio índice, o que só
+    é exato para IndexFlat. Retorna None para um índice quantizado sem armazém: a referência "exata" e os
+    índices requantizados partiriam de vetores já degradados e o recall perdido sairia subestimado.
+    """
+    par = _par_do_indice(caminho)
+    if par is not None:
+        armazem = abrir_armazem(*par, model_dir=os.path.dirname(caminho))
+        if armazem is not None and len(armazem["ids"]) == index.ntotal and armazem["cabecalho"].get("dimensao") == index.d:
+            logging.info(f"Vetores de referência de {os.path.basename(caminho)} lidos do armazém de vetores.")
+            return np.asarray(armazem["vetores"], dtype=np.float32)
+    if isinstance(index, faiss.IndexFlat):
+        return extrair_vetores(index)
+    return None
+
+def tamanho_em_bytes(index):
+    """Tamanho serializado do índice (o mesmo que ocupa em disco e, aproximadamente, em memória)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+def gerar_consultas(vetores, num_consultas, seed=42):
+    """
+    Sorteia vetores do próprio corpus e aplica um pequeno ruído gaussiano,
+    simulando consultas próximas (mas não idênticas) aos itens indexados.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vetores)
+    idx = rng.choice(n, size=min(num_consultas, n), replace=False)
+    ruido = rng.normal(0, vetores.std() * 0.1, size=(len(idx), vetores.shape[1])).astype(np.float32)
+    return np.ascontiguousarray(vetores[idx] + ruido, dtype=np.float32)
+
+def recall_at_k(verdade, aproximado, k):
+    """Fração média dos k vizinhos exatos recuperados pelo índice aproximado."""
+    acertos = [len(set(v[:k]) & set(a[:k])) for v, a in zip(verdade, aproximado)]
+    return float(np.mean(acertos)) / k
+
+# --- BENCHMARK ---
+
+def comparar_tipos_indice(vetores, num_consultas=200, k=10, tipos=TIPOS_INDICE):
+    """
+    Monta um índice por tipo de armazenamento e compara memória, recall@k e latência
+    de busca em relação ao índice flat (float32), que serve como referência exata.
+
+    Returns:
+        list: Uma lista de dicionários, um por tipo de índice.
+    """
+    consultas = gerar_consultas(vetores, num_consultas)
+    k = min(k, len(vetores))
+
+    index_flat = montar_index(vetores, "flat")
+    bytes_flat = tamanho_em_bytes(index_flat)
+    _, verdade = index_flat.search(consultas, k)
+
+    resultados = []
+    for tipo in tipos:
+        index = index_flat if tipo == "flat" else montar_index(vetores, tipo)
+        inicio = time.perf_counter()
+        _, aproximado = index.search(consultas, k)
+        duracao = time.perf_counter() - inicio
+        bytes_tipo = tamanho_em_bytes(index)
+        resultados.append({
+            "tipo_indice": tipo,
+            "vetores": int(index.ntotal),
+            "dimensao": int(index.d),
+            "bytes": bytes_tipo,
+            "reducao_memoria": round(1 - bytes_tipo / bytes_flat, 4),
+            "k": k,
+            "recall": round(recall_at_k(verdade, aproximado, k), 4),
+            "latencia_ms_por_consulta": round(duracao * 1000 / len(consultas), 4),
+        })
+    return resultados
+
+def benchmark_arquivos(caminhos, num_consultas=200, k=10):
+    """Executa a comparação para cada arquivo de índice FAISS informado."""
+    relatorio = {}
+    for caminho in caminhos:
+        try:
+            index = faiss.read_index(caminho)
+        except Exception as e:
+            logging.error(f"Erro ao carregar índice {caminho}: {e}")
+            continue
+        vetores = vetores_de_referencia(caminho, index)
+        if vetores is None:
+            logging.warning(f"Índice {caminho} é {type(index).__name__} (já quantizado) e não há armazém de vetores "
+                            f"alinhado a ele: sem vetores exatos, o recall sairia superestimado. Ignorado.")
+            continue
+        if len(vetores) < 2:
+            logging.warning(f"Índice {caminho} com poucos vetores para benchmark. Ignorado.")
+            continue
+        nome = os.path.basename(caminho)
+        relatorio[nome] = comparar_tipos_indice(vetores, num_consultas, k)
+        for linha in relatorio[nome]:
+            logging.info(f"{nome} | {linha['tipo_indice']:>4} | {linha['bytes'] / 1024:10.1f} KiB | "
+                         f"redução {linha['reducao_memoria']:.1%} | recall@{linha['k']} {linha['recall']:.4f} | "
+                         f"{linha['latencia_ms_por_consulta']:.3f} ms/consulta")
+    return relatorio
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Memória economizada vs. recall@k perdido pelos índices quantizados (fp16/sq8).")
+    parser.add_argument("indices", nargs="*", help="Arquivos de índice FAISS. Padrão: todos os índices em models1/.")
+    parser.add_argument("--consultas", type=int, default=200, help="Número de consultas sorteadas do corpus.")
+    parser.add_argument("--k", type=int, default=10, help="Profundidade do recall.")
+    parser.add_argument("--saida", help="Caminho opcional para salvar o relatório em JSON.")
+    args = parser.parse_args()
+
+    caminhos = args.indices or sorted(glob.glob(os.path.join(MODEL_DIR, "*.faiss")) + glob.glob(os.path.join(MODEL_DIR, "*.index")))
+    relatorio = benchmark_arquivos(caminhos, args.consultas, args.k)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=4, ensure_ascii=False)
+        logging.info(f"Relatório salvo em: {args.saida}")
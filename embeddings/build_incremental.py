@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import faiss
+
+from registro_indices import caminhos_indice
+from indice_particionado import diretorio_particoes, ler_particionamento, carregar_vetores_particionados
+from armazem_vetores import vetores_por_id
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def hash_texto(texto):
+    """
+    Impressão digital do texto usado no embedding (após a mesma limpeza de espaços de gerar_embedding).
+    Dois registros com o mesmo hash produzem o mesmo vetor para um dado modelo.
+    """
+    clean_text = ' '.join(texto.split()).strip()
+    return hashlib.sha1(clean_text.encode('utf-8')).hexdigest()
+
+def codificar_textos_unicos(modelo, textos, cache=None, **kwargs):
+    """
+    Embeddings (float32) de uma lista de textos, codificando cada texto distinto (mesmo hash_texto) uma
+    única vez e replicando o vetor nas posições repetidas.
+
+    Textos vazios (None ou "", ex.: extrair_texto_candidato de um registro sem currículo) não são
+    codificados: a posição correspondente vem como None e o retorno passa a ser uma lista de vetores.
+
+    Args:
+        cache (dict): {hash_texto: vetor} compartilhado entre chamadas (ex.: lotes de uma mesma importação);
+            textos já presentes não são codificados de novo.
+    Returns:
+        tuple: (matriz (len(textos), dim) float32 — ou lista com None nas posições sem texto —,
+            número de textos efetivamente codificados)
+    """
+    cache = {} if cache is None else cache
+    impressoes = [hash_texto(texto) if texto else None for texto in textos]
+    novos = {}
+    for impressao, texto in zip(impressoes, textos):
+        if impressao is not None and impressao not in cache:
+            novos.setdefault(impressao, texto)
+    if novos:
+        vetores = np.asarray(modelo.encode(list(novos.values()), **kwargs), dtype=np.float32)
+        cache.update(zip(novos, vetores))
+    preenchidos = sum(impressao is not None for impressao in impressoes)
+    if preenchidos > len(novos):
+        logging.info(f"{len(novos)} textos codificados para {preenchidos} registros "
+                     f"({1 - len(novos) / preenchidos:.1%} reaproveitados por texto repetido).")
+    if not textos:
+        return np.empty((0, 0), dtype=np.float32), 0
+    if preenchidos < len(textos):
+        logging.warning(f"{len(textos) - preenchidos} registro(s) sem texto para embedding ignorado(s).")
+        return [cache[impressao] if impressao is not None else None for impressao in impressoes], len(novos)
+    return np.vstack([cache[impressao] for impressao in impressoes]), len(novos)
+
+def carregar_build_anterior(apelido, entidade, nome_modelo, model_dir=None, backend="torch"):
+    """
+    Carrega os vetores do último build de um par (modelo, entidade), indexados pelo ID original.
+
+    Só reaproveita builds gerados pelo mesmo modelo e backend de inferência (vetores de backends diferentes
+    não são idênticos) e cujos metadados já trazem a coluna 'hash_texto'; nos demais casos retorna um
+    dicionário vazio (rebuild completo). Builds sem backend registrado contam como PyTorch.
+    Se o par foi gravado em partições, os vetores são lidos de todas as partições.
+    O armazém de vetores crus (armazem_vetores.py) tem prioridade: os vetores saem sem a perda de
+    precisão dos índices fp16/sq8 e sem reconstruir o índice.
+
+    Returns:
+        dict: {id_original: (hash_texto, vetor float32)}
+    """
+    armazenados = vetores_por_id(apelido, entidade, nome_modelo, model_dir, backend)
+    if armazenados:
+        logging.info(f"Build anterior de {entidade}/{apelido} lido do armazém de vetores ({len(armazenados)} vetores).")
+        return armazenados
+
+    caminhos = caminhos_indice(apelido, entidade, model_dir)
+    if not (os.path.exists(caminhos["index"]) and os.path.exists(caminhos["metadados"])):
+        return _carregar_build_particionado(apelido, entidade, nome_modelo, model_dir, backend)
+
+    try:
+        if os.path.exists(caminhos["manifesto"]):
+            with open(caminhos["manifesto"], 'r', encoding='utf-8') as f:
+                manifesto = json.load(f)
+            if manifesto.get("modelo") != nome_modelo:
+                logging.info(f"Build anterior de {entidade}/{apelido} usa outro modelo ({manifesto.get('modelo')}). Rebuild completo.")
+                return {}
+            if manifesto.get("backend", "torch") != backend:
+                logging.info(f"Build anterior de {entidade}/{apelido} usa outro backend ({manifesto.get('backend', 'torch')}). Rebuild completo.")
+                return {}
+
+        metadados = pd.read_pickle(caminhos["metadados"])
+        if "hash_texto" not in metadados.columns:
+            logging.info(f"Metadados de {entidade}/{apelido} sem 'hash_texto'. Rebuild completo.")
+            return {}
+
+        index = faiss.read_index(caminhos["index"])
+        if index.ntotal != len(metadados):
+            logging.warning(f"Índice e metadados de {entidade}/{apelido} desalinhados ({index.ntotal} vs {len(metadados)}). Rebuild completo.")
+            return {}
+
+        vetores = index.reconstruct_n(0, index.ntotal).astype(np.float32)
+    except Exception as e:
+        logging.error(f"Erro ao carregar build anterior de {entidade}/{apelido}: {e}. Rebuild completo.")
+        return {}
+
+    return {
+        str(id_original): (impressao, vetores[i])
+        for i, (id_original, impressao) in enumerate(zip(metadados["id_original"], metadados["hash_texto"]))
+    }
+
+def _carregar_build_particionado(apelido, entidade, nome_modelo, model_dir, backend):
+    diretorio = diretorio_particoes(apelido, entidade, model_dir)
+    particionamento = ler_particionamento(diretorio)
+    if not particionamento:
+        return {}
+    if particionamento.get("modelo") != nome_modelo:
+        logging.info(f"Build anterior de {entidade}/{apelido} usa outro modelo ({particionamento.get('modelo')}). Rebuild completo.")
+        return {}
+    if particionamento.get("backend", "torch") != backend:
+        logging.info(f"Build anterior de {entidade}/{apelido} usa outro backend ({particionamento.get('backend', 'torch')}). Rebuild completo.")
+        return {}
+    try:
+        return carregar_vetores_particionados(diretorio)
+    except Exception as e:
+        logging.error(f"Erro ao carregar partições anteriores de {entidade}/{apelido}: {e}. Rebuild completo.")
+        return {}
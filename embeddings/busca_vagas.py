@@ -0,0 +1,226 @@
+import re
+import bisect
+import heapq
+import itertools
+import logging
+import threading
+import unicodedata
+
+# --- CONFIGURAÇÃO ---
+# Busca rápida por título (info_titulo_vaga), cliente (info_cliente) ou id_vaga
+LIMITE_SUGESTOES = 10
+# Chave do índice no thread de recarga (recarga_indices), compartilhada pela busca e pelo cadastro de vagas
+CHAVE_RECURSO = ("busca", "vagas")
+# Máximo de termos do vocabulário expandidos por um prefixo (ex.: "a" casa milhares de termos)
+LIMITE_EXPANSAO_PREFIXO = 256
+# Similaridade de Jaccard mínima entre os trigramas do termo digitado e de um termo do vocabulário.
+# Com as bordas marcadas ("  termo "), uma transposição ("pyhton" x "python") divide só 3 de 11 trigramas
+# (0.27); abaixo de 0.25 entram termos que só compartilham a primeira letra e a terminação
+LIMIAR_APROXIMADO = 0.25
+# Termos do vocabulário aceitos por termo digitado na busca aproximada
+LIMITE_TERMOS_APROXIMADOS = 8
+# Largura (em posições) da primeira janela percorrida na interseção, das vagas mais recentes para as mais
+# antigas; dobra a cada janela
+JANELA_INICIAL = 1024
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- ÍNDICE EM MEMÓRIA ---
+# Cada vaga recebe uma posição sequencial (posições maiores = vagas inseridas depois, exibidas primeiro
+# em caso de empate). O índice guarda:
+#   "vagas"      -> lista posição -> (id_vaga, título, cliente)
+#   "posicoes"   -> id_vaga -> posição
+#   "ids"        -> id_vaga em ordem alfabética, para busca por prefixo do ID (bisect)
+#   "termos"     -> termo normalizado do título/cliente -> lista ordenada de posições (índice invertido);
+#                   percorrida do fim para o começo, entrega primeiro as vagas mais recentes
+#   "ordenados"  -> vocabulário em ordem alfabética; um prefixo vira uma faixa contígua (bisect)
+#   "trigramas"  -> trigrama -> set de termos do vocabulário (busca aproximada por erros de digitação)
+# Inserções e consultas passam pela trava do índice: o cadastro atualiza o mesmo objeto que as buscas leem.
+
+def normalizar(texto):
+    """Texto em minúsculas e sem acentos."""
+    return unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode("ascii").lower()
+
+def termos(texto):
+    return re.findall(r"[a-z0-9]+", normalizar(texto))
+
+def trigramas(termo):
+    marcado = f"  {termo} "
+    return {marcado[i:i + 3] for i in range(len(marcado) - 2)}
+
+def novo_indice():
+    return {"vagas": [], "posicoes": {}, "ids": [], "termos": {}, "ordenados": [], "trigramas": {}, "trava": threading.Lock()}
+
+def _termos_vaga(titulo, cliente):
+    return set(termos(titulo)) | set(termos(cliente))
+
+def _adicionar(indice, id_vaga, registro, ordenar=True):
+    # ordenar=False (montagem inicial): as listas ordenadas são ordenadas uma única vez no fim
+    id_vaga = str(id_vaga)
+    titulo = str(registro.get("info_titulo_vaga") or "")
+    cliente = str(registro.get("info_cliente") or "")
+    posicao = indice["posicoes"].get(id_vaga)
+    if posicao is not None:
+        # Vaga reimportada/alterada: sai dos termos antigos antes de entrar nos novos
+        for termo in _termos_vaga(*indice["vagas"][posicao][1:]):
+            posicoes = indice["termos"].get(termo)
+            if posicoes and _contem(posicoes, posicao):
+                del posicoes[bisect.bisect_left(posicoes, posicao)]
+        indice["vagas"][posicao] = (id_vaga, titulo, cliente)
+    else:
+        posicao = len(indice["vagas"])
+        indice["vagas"].append((id_vaga, titulo, cliente))
+        indice["posicoes"][id_vaga] = posicao
+        if ordenar:
+            bisect.insort(indice["ids"], id_vaga)
+        else:
+            indice["ids"].append(id_vaga)
+    for termo in _termos_vaga(titulo, cliente):
+        posicoes = indice["termos"].get(termo)
+        if posicoes is None:
+            posicoes = indice["termos"][termo] = []
+            if ordenar:
+                bisect.insort(indice["ordenados"], termo)
+            else:
+                indice["ordenados"].append(termo)
+            for trigrama in trigramas(termo):
+                indice["trigramas"].setdefault(trigrama, set()).add(termo)
+        # Posições novas são sempre as maiores (append); só uma vaga alterada volta para o meio da lista
+        if not posicoes or posicoes[-1] < posicao:
+            posicoes.append(posicao)
+        elif not _contem(posicoes, posicao):
+            bisect.insort(posicoes, posicao)
+
+def adicionar_vaga(indice, id_vaga, registro):
+    """Inclui (ou atualiza) uma vaga no índice, ex.: logo após o cadastro."""
+    with indice["trava"]:
+        _adicionar(indice, id_vaga, registro)
+
+def montar_indice(registros):
+    """
+    Monta o índice a partir de um iterável de (id_vaga, registro), ex.: repositorio_registros.iterar_registros.
+    """
+    indice = novo_indice()
+    for id_vaga, registro in registros:
+        _adicionar(indice, id_vaga, registro, ordenar=False)
+    indice["ids"].sort()
+    indice["ordenados"].sort()
+    logging.info(f"Índice de busca rápida montado: {len(indice['vagas'])} vagas, {len(indice['ordenados'])} termos.")
+    return indice
+
+# --- CONSULTA ---
+
+def _expandir(ordenados, prefixo):
+    """Itens de uma lista ordenada que começam por 'prefixo' (no máximo LIMITE_EXPANSAO_PREFIXO)."""
+    inicio = bisect.bisect_left(ordenados, prefixo)
+    return itertools.takewhile(lambda item: item.startswith(prefixo), ordenados[inicio:inicio + LIMITE_EXPANSAO_PREFIXO])
+
+def _listas_prefixo(indice, prefixo):
+    """Listas de posições das vagas com algum termo (ou o ID) começando por 'prefixo', termo a termo."""
+    listas = [indice["termos"][termo] for termo in _expandir(indice["ordenados"], prefixo)]
+    if prefixo.isdigit():
+        listas.append(sorted(indice["posicoes"][id_vaga] for id_vaga in _expandir(indice["ids"], prefixo)))
+    return [lista for lista in listas if lista]
+
+def _aproximado(indice, termo):
+    """Listas de posições das vagas com termos parecidos (trigramas em comum) com 'termo'."""
+    alvo = trigramas(termo)
+    comuns = {}
+    for trigrama in alvo:
+        for candidato in indice["trigramas"].get(trigrama, ()):
+            comuns[candidato] = comuns.get(candidato, 0) + 1
+    similares = []
+    for candidato, quantidade in comuns.items():
+        similaridade = quantidade / (len(alvo) + len(trigramas(candidato)) - quantidade)
+        if similaridade >= LIMIAR_APROXIMADO:
+            similares.append((similaridade, candidato))
+    melhores = heapq.nlargest(LIMITE_TERMOS_APROXIMADOS, similares)
+    return [indice["termos"][candidato] for _, candidato in melhores if indice["termos"][candidato]]
+
+def _contem(lista, posicao):
+    i = bisect.bisect_left(lista, posicao)
+    return i < len(lista) and lista[i] == posicao
+
+def _trecho(lista, inicio, fim):
+    """Limites [i, j) do trecho de uma lista ordenada de posições que cai no intervalo [inicio, fim)."""
+    return lista, bisect.bisect_left(lista, inicio), bisect.bisect_left(lista, fim)
+
+def _mais_recentes(grupos):
+    """
+    Posições presentes em todos os grupos, da mais recente para a mais antiga, geradas sob demanda.
+    Cada grupo (uma palavra da consulta) é uma lista de listas ordenadas de posições, unidas entre si
+    (ex.: os termos que começam pelo prefixo digitado). As posições são percorridas em janelas do fim para
+    o começo, de largura crescente; cada janela é intersectada só sobre o trecho das listas que cai nela.
+    Quem consome só as primeiras posições não paga pela interseção inteira.
+    """
+    grupos = [[lista for lista in listas if lista] for listas in grupos]
+    if not grupos or not all(grupos):
+        return
+    # Fora de [inicio_minimo, fim) alguma palavra não tem nenhuma vaga
+    fim = min(max(lista[-1] for lista in listas) for listas in grupos) + 1
+    inicio_minimo = max(min(lista[0] for lista in listas) for listas in grupos)
+    largura = JANELA_INICIAL
+    while fim > inicio_minimo:
+        inicio = max(fim - largura, inicio_minimo)
+        trechos = sorted(([_trecho(lista, inicio, fim) for lista in listas] for listas in grupos),
+                         key=lambda limites: sum(j - i for _, i, j in limites))
+        comuns = set().union(*(lista[i:j] for lista, i, j in trechos[0]))
+        for limites in trechos[1:]:
+            if not comuns:
+                break
+            if len(comuns) * 64 < sum(j - i for _, i, j in limites):
+                # Poucas posições restantes: busca binária em cada uma sai mais barato que varrer o trecho
+                comuns = {posicao for posicao in comuns if any(_contem(lista, posicao) for lista, _, _ in limites)}
+            elif len(limites) == 1:
+                lista, i, j = limites[0]
+                comuns.intersection_update(lista[i:j])
+            else:
+                comuns.intersection_update(set().union(*(lista[i:j] for lista, i, j in limites)))
+        yield from sorted(comuns, reverse=True)
+        fim = inicio
+        largura *= 2
+
+def buscar_vagas(indice, consulta, limite=LIMITE_SUGESTOES):
+    """
+    Vagas cujo título, cliente ou ID casam com a consulta, em camadas:
+    ID exato, todas as palavras completas, todas as palavras como prefixo (digitação em andamento) e,
+    se ainda faltarem resultados, palavras sem correspondência trocadas por termos parecidos (erros de digitação).
+    Dentro de uma camada, as vagas mais recentes vêm primeiro.
+
+    Returns:
+        list: [{"id_vaga", "titulo", "cliente"}] com no máximo 'limite' itens.
+    """
+    palavras = list(dict.fromkeys(termos(consulta)))
+    if indice is None or not palavras:
+        return []
+    with indice["trava"]:
+        escolhidas = []
+        vistas = set()
+
+        def incluir(posicoes):
+            # Consome o gerador só até completar o limite (as posições chegam da mais recente para a mais antiga)
+            if len(escolhidas) >= limite:
+                return
+            for posicao in posicoes:
+                if posicao in vistas:
+                    continue
+                escolhidas.append(posicao)
+                vistas.add(posicao)
+                if len(escolhidas) >= limite:
+                    return
+
+        id_exato = indice["posicoes"].get(consulta.strip())
+        if id_exato is not None:
+            incluir([id_exato])
+        incluir(_mais_recentes([[indice["termos"].get(palavra, [])] for palavra in palavras]))
+        if len(escolhidas) < limite:
+            por_prefixo = [_listas_prefixo(indice, palavra) for palavra in palavras]
+            # Se nenhuma palavra casa com outro termo além dela mesma, a camada repetiria a anterior
+            if any(listas != [indice["termos"].get(palavra)] for palavra, listas in zip(palavras, por_prefixo)):
+                incluir(_mais_recentes(por_prefixo))
+            # Termos parecidos só para as palavras sem nenhuma correspondência por prefixo
+            if len(escolhidas) < limite and not all(por_prefixo):
+                incluir(_mais_recentes([listas or _aproximado(indice, palavra) for palavra, listas in zip(palavras, por_prefixo)]))
+        vagas = indice["vagas"]
+        return [{"id_vaga": vagas[p][0], "titulo": vagas[p][1], "cliente": vagas[p][2]} for p in escolhidas]
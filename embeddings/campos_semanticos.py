@@ -0,0 +1,288 @@
+import os
+import json
+import logging
+import numpy as np
+
+from build_incremental import hash_texto, codificar_textos_unicos
+from armazem_vetores import caminhos_armazem, gravar_armazem, abrir_armazem, vetores_por_id
+from versoes_dados import versao_arquivos
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+
+# Modo multivetor: em vez de um único texto por registro (extrair_texto_vaga / extrair_texto_candidato),
+# cada campo semântico tem o seu próprio vetor, e a busca combina as similaridades por campo com pesos
+# escolhidos na hora da consulta (trocar os pesos não exige recodificar nada). Localização e cliente
+# ficam de fora de propósito: eram os trechos que dominavam o vetor único sem dizer nada sobre aderência.
+CAMPOS_SEMANTICOS = ("titulo", "atividades", "competencias", "formacao")
+ROTULOS_CAMPOS = {
+    "titulo": "Título",
+    "atividades": "Atividades/Experiência",
+    "competencias": "Competências Técnicas",
+    "formacao": "Formação/Idiomas",
+}
+ENTIDADES_CAMPOS = ("vagas", "candidatos")
+
+# Pesos padrão dos campos (relativos entre si). Podem ser sobrescritos por
+# DECISION_PESOS_CAMPOS='{"titulo": 2, "formacao": 0}' ou escolhidos na própria busca.
+# A média é dividida pelo peso total dos campos preenchidos na vaga: um campo que a vaga pede e o
+# candidato deixou vazio conta como similaridade 0, então perfis quase vazios não sobem no ranking.
+PESOS_CAMPOS_PADRAO = {
+    "titulo": 1.0,
+    "atividades": 1.0,
+    "competencias": 1.0,
+    "formacao": 0.5,
+}
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def carregar_pesos_campos():
+    """Pesos dos campos configurados (padrão + DECISION_PESOS_CAMPOS)."""
+    pesos = dict(PESOS_CAMPOS_PADRAO)
+    configurados = os.environ.get("DECISION_PESOS_CAMPOS")
+    if configurados:
+        try:
+            for campo, peso in json.loads(configurados).items():
+                if campo not in pesos:
+                    logging.warning(f"Campo desconhecido em DECISION_PESOS_CAMPOS: {campo}. Ignorado.")
+                    continue
+                pesos[campo] = float(peso)
+        except (ValueError, AttributeError, TypeError) as e:
+            logging.error(f"DECISION_PESOS_CAMPOS inválido ({e}). Usando os pesos padrão.")
+            return dict(PESOS_CAMPOS_PADRAO)
+    return pesos
+
+PESOS_CAMPOS = carregar_pesos_campos()
+
+# --- EXTRAÇÃO POR CAMPO ---
+
+def _valor(registro, grupo, campo):
+    """Campo de um registro achatado ("grupo_campo", formato da base) ou aninhado ({"grupo": {"campo": ...}})."""
+    valor = registro.get(f"{grupo}_{campo}")
+    if valor is None and isinstance(registro.get(grupo), dict):
+        valor = registro[grupo].get(campo)
+    return valor
+
+def _idioma(rotulo, nivel):
+    if isinstance(nivel, str) and nivel.strip().lower() not in ["", "nenhum", "-"]:
+        return f"{rotulo}: {nivel.strip()}"
+    return None
+
+def _experiencias(experiencias):
+    if isinstance(experiencias, str):
+        return experiencias
+    partes = []
+    for exp in experiencias if isinstance(experiencias, list) else []:
+        if isinstance(exp, dict):
+            partes.append(", ".join(str(exp[chave]) for chave in ("cargo", "empresa", "descricao") if exp.get(chave)))
+        elif isinstance(exp, str):
+            partes.append(exp)
+    return ". ".join(parte for parte in partes if parte)
+
+def _juntar(*partes):
+    texto = ". ".join(str(parte).strip() for parte in partes if parte and str(parte).strip())
+    return ' '.join(texto.split()) or None
+
+def extrair_campos_vaga(vaga_data):
+    """Texto de cada campo semântico de uma vaga (None para campos vazios)."""
+    return {
+        "titulo": _juntar(vaga_data.get("info_titulo_vaga"),
+                          vaga_data.get("perfil_nivel_profissional", vaga_data.get("perfil_nivel profissional")),
+                          vaga_data.get("perfil_areas_atuacao")),
+        "atividades": _juntar(vaga_data.get("perfil_principais_atividades")),
+        "competencias": _juntar(vaga_data.get("perfil_competencia_tecnicas_e_comportamentais")),
+        "formacao": _juntar(vaga_data.get("perfil_nivel_academico"),
+                            _idioma("Inglês", vaga_data.get("perfil_nivel_ingles")),
+                            _idioma("Espanhol", vaga_data.get("perfil_nivel_espanhol")),
+                            _idioma("Outro idioma", vaga_data.get("perfil_outro_idioma"))),
+    }
+
+def extrair_campos_candidato(candidato_data):
+    """Texto de cada campo semântico de um candidato (None para campos vazios)."""
+    return {
+        "titulo": _juntar(_valor(candidato_data, "informacoes_profissionais", "titulo_profissional"),
+                          _valor(candidato_data, "infos_basicas", "objetivo_profissional"),
+                          _valor(candidato_data, "informacoes_profissionais", "area_atuacao")),
+        "atividades": _juntar(_experiencias(_valor(candidato_data, "informacoes_profissionais", "experiencias")),
+                              candidato_data.get("cv_pt")),
+        "competencias": _juntar(_valor(candidato_data, "informacoes_profissionais", "conhecimentos_tecnicos"),
+                                _valor(candidato_data, "informacoes_profissionais", "certificacoes"),
+                                _valor(candidato_data, "informacoes_profissionais", "outras_certificacoes"),
+                                _valor(candidato_data, "informacoes_profissionais", "qualificacoes")),
+        "formacao": _juntar(_valor(candidato_data, "formacao_e_idiomas", "nivel_academico"),
+                            _valor(candidato_data, "formacao_e_idiomas", "instituicao_ensino_superior"),
+                            _valor(candidato_data, "formacao_e_idiomas", "cursos"),
+                            _idioma("Inglês", _valor(candidato_data, "formacao_e_idiomas", "nivel_ingles")),
+                            _idioma("Espanhol", _valor(candidato_data, "formacao_e_idiomas", "nivel_espanhol")),
+                            _idioma("Outro idioma", _valor(candidato_data, "formacao_e_idiomas", "outro_idioma"))),
+    }
+
+EXTRATORES_CAMPOS = {"vagas": extrair_campos_vaga, "candidatos": extrair_campos_candidato}
+
+# --- GERAÇÃO ---
+# Cada campo é um armazém de vetores (armazem_vetores.py) próprio, "{entidade}.{campo}", alinhado pelo
+# id_original. Campos vazios ficam como vetor nulo (norma 0) e contam como similaridade 0 na busca.
+
+def entidade_campo(entidade, campo):
+    return f"{entidade}.{campo}"
+
+def gerar_campos(apelido, nome_modelo, entidade, registros, obter_modelo, model_dir=None, completo=False, backend="torch"):
+    """
+    Gera (ou atualiza) os vetores por campo de uma entidade. Textos de campo inalterados desde o último build
+    e textos repetidos entre registros reaproveitam o vetor; só o restante passa pelo modelo.
+
+    Args:
+        registros (dict): {id_original: registro}.
+        obter_modelo (callable): Retorna o modelo de embedding (carregado sob demanda).
+    """
+    if not registros:
+        logging.warning(f"Nenhum registro de {entidade} para gerar vetores por campo ({apelido}).")
+        return
+    extrator = EXTRATORES_CAMPOS[entidade]
+    ids = [str(item_id) for item_id in registros]
+    textos_campos = [extrator(registro) for registro in registros.values()]
+
+    for campo in CAMPOS_SEMANTICOS:
+        textos = [campos[campo] or "" for campos in textos_campos]
+        impressoes = [hash_texto(texto) for texto in textos]
+        anterior = {} if completo else vetores_por_id(apelido, entidade_campo(entidade, campo), nome_modelo, model_dir, backend)
+        vazio = hash_texto("")
+        cache = {impressao: vetor for impressao, vetor in anterior.values() if impressao != vazio}
+        preenchidos = [i for i, texto in enumerate(textos) if texto]
+        modelo = obter_modelo() if any(impressoes[i] not in cache for i in preenchidos) else None
+
+        codificados = 0
+        if preenchidos:
+            matriz, codificados = codificar_textos_unicos(modelo, [textos[i] for i in preenchidos], cache)
+            dimensao = matriz.shape[1]
+        else:
+            # Campo vazio em todos os registros: a dimensão vem do build anterior, sem carregar o modelo à toa
+            dimensao = next((len(vetor) for _, vetor in anterior.values()), None) or obter_modelo().get_sentence_embedding_dimension()
+        vetores = np.zeros((len(ids), dimensao), dtype=np.float32)
+        if preenchidos:
+            vetores[preenchidos] = matriz
+
+        gravar_armazem(apelido, entidade_campo(entidade, campo), nome_modelo, vetores, ids, impressoes, model_dir, backend)
+        logging.info(f"{entidade}/{apelido} campo '{campo}': {len(preenchidos)} preenchidos de {len(ids)} "
+                     f"({codificados} textos codificados, {len(preenchidos) - codificados} reaproveitados).")
+
+# --- CARGA ---
+
+def versao_campos(apelido, entidade, model_dir=None):
+    """Versão dos cabeçalhos dos armazéns por campo (gravados por último a cada geração)."""
+    return versao_arquivos(caminhos_armazem(apelido, entidade_campo(entidade, campo), model_dir)["cabecalho"]
+                           for campo in CAMPOS_SEMANTICOS)
+
+def carregar_campos(apelido, entidade, model_dir=None):
+    """
+    Vetores por campo de uma entidade, lidos por np.memmap, com a norma de cada linha pré-calculada.
+
+    Returns:
+        dict: {"ids": [str], "posicoes": {id: linha}, "modelo", "vetores": {campo: memmap}, "normas": {campo: array}},
+        ou None se algum campo não tiver sido gerado ou os campos estiverem desalinhados.
+    """
+    ids, modelo, vetores, normas = None, None, {}, {}
+    for campo in CAMPOS_SEMANTICOS:
+        armazem = abrir_armazem(apelido, entidade_campo(entidade, campo), model_dir)
+        if armazem is None:
+            return None
+        if ids is None:
+            ids, modelo = armazem["ids"], armazem["cabecalho"].get("modelo")
+        elif armazem["ids"] != ids:
+            logging.warning(f"Vetores por campo de {entidade}/{apelido} desalinhados ('{campo}'). Regere com gerar_tudo.py --campos.")
+            return None
+        vetores[campo] = armazem["vetores"]
+        normas[campo] = np.linalg.norm(armazem["vetores"], axis=1)
+    logging.info(f"Vetores por campo de {entidade}/{apelido} carregados ({len(ids)} registros).")
+    return {"ids": ids, "posicoes": {item_id: i for i, item_id in enumerate(ids)}, "modelo": modelo,
+            "vetores": vetores, "normas": normas}
+
+# --- BUSCA ---
+
+def codificar_campos(modelo, registro, entidade="vagas"):
+    """Vetores dos campos preenchidos de um registro, em uma única chamada ao modelo ({campo: vetor})."""
+    textos = {campo: texto for campo, texto in EXTRATORES_CAMPOS[entidade](registro).items() if texto}
+    if not textos:
+        return {}
+    vetores = np.asarray(modelo.encode(list(textos.values())), dtype=np.float32)
+    return dict(zip(textos, vetores))
+
+def campos_armazenados(campos, item_id):
+    """Vetores dos campos preenchidos de um registro já presente nos armazéns ({} se ele não estiver lá)."""
+    posicao = None if campos is None else campos["posicoes"].get(str(item_id))
+    if posicao is None:
+        return {}
+    return {campo: np.asarray(campos["vetores"][campo][posicao]) for campo in CAMPOS_SEMANTICOS
+            if campos["normas"][campo][posicao] > 0}
+
+def similaridades_campos(campos, consulta):
+    """
+    Similaridade de cosseno de todos os registros com a consulta, campo a campo (um produto matriz-vetor por campo).
+
+    Returns:
+        tuple: (similaridades (campos, n) float32, presentes (campos, n) bool, na_consulta (campos,) bool).
+        Um campo só está presente se estiver preenchido no registro e na consulta.
+    """
+    n = len(campos["ids"])
+    similaridades = np.zeros((len(CAMPOS_SEMANTICOS), n), dtype=np.float32)
+    presentes = np.zeros((len(CAMPOS_SEMANTICOS), n), dtype=bool)
+    na_consulta = np.zeros(len(CAMPOS_SEMANTICOS), dtype=bool)
+    for f, campo in enumerate(CAMPOS_SEMANTICOS):
+        vetor = consulta.get(campo)
+        norma_consulta = float(np.linalg.norm(vetor)) if vetor is not None else 0.0
+        if norma_consulta == 0:
+            continue
+        na_consulta[f] = True
+        normas = campos["normas"][campo]
+        presentes[f] = normas > 0
+        np.divide(campos["vetores"][campo] @ vetor, normas * norma_consulta, out=similaridades[f], where=presentes[f])
+    return similaridades, presentes, na_consulta
+
+def combinar_campos(similaridades, presentes, na_consulta, pesos=None):
+    """
+    Média ponderada das similaridades por campo sobre os campos preenchidos na consulta ('na_consulta',
+    bool por campo); campos vazios no registro entram com similaridade 0.
+
+    Returns:
+        tuple: (similaridade combinada (n,), contribuições ponderadas (campos, n)). O campo de maior
+        contribuição é o que mais pesou no resultado de cada registro.
+    """
+    pesos = PESOS_CAMPOS if pesos is None else pesos
+    vetor_pesos = np.array([max(float(pesos.get(campo, 0.0)), 0.0) for campo in CAMPOS_SEMANTICOS], dtype=np.float32)
+    total = float((vetor_pesos * na_consulta).sum())
+    contribuicoes = vetor_pesos[:, None] * presentes * similaridades
+    if total <= 0:
+        return np.zeros(similaridades.shape[1], dtype=np.float32), contribuicoes
+    return (contribuicoes.sum(axis=0) / total).astype(np.float32), contribuicoes
+
+def buscar_por_campos(campos, consulta, k=10, pesos=None):
+    """
+    Os k registros de maior similaridade combinada com a consulta.
+
+    Returns:
+        list: [{"id_original", "similaridade", "similaridades_campos": {campo: float ou None}, "campo_determinante"}],
+        em ordem decrescente de similaridade.
+    """
+    if campos is None or not campos["ids"] or not consulta:
+        return []
+    similaridades, presentes, na_consulta = similaridades_campos(campos, consulta)
+    combinada, contribuicoes = combinar_campos(similaridades, presentes, na_consulta, pesos)
+    k = min(k, len(combinada))
+    melhores = np.argpartition(-combinada, k - 1)[:k]
+    melhores = melhores[np.argsort(-combinada[melhores], kind="stable")]
+    # O campo determinante é escolhido entre os presentes no registro (um campo vazio contribui 0, mas não "decide")
+    determinantes = np.where(presentes[:, melhores], contribuicoes[:, melhores], -np.inf).argmax(axis=0)
+    resultados = []
+    for i, f in zip(melhores, determinantes):
+        if not presentes[:, i].any():
+            continue
+        resultados.append({
+            "id_original": campos["ids"][i],
+            "similaridade": float(combinada[i]),
+            "similaridades_campos": {campo: float(similaridades[g, i]) if presentes[g, i] else None
+                                     for g, campo in enumerate(CAMPOS_SEMANTICOS)},
+            "campo_determinante": CAMPOS_SEMANTICOS[f],
+        })
+    return resultados
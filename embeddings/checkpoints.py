@@ -0,0 +1,82 @@
+import os
+import json
+import shutil
+import logging
+import numpy as np
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.path.join(os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1')), 'checkpoints')
+
+# Número de registros codificados por shard (cada shard é salvo em disco ao terminar)
+TAMANHO_SHARD = 1024
+BATCH_SIZE = 32
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- FUNÇÕES AUXILIARES ---
+
+def diretorio_checkpoint(apelido, entidade, checkpoint_dir=None):
+    """Diretório dos shards (vetores + chaves) de um par (modelo, entidade)."""
+    return os.path.join(checkpoint_dir or CHECKPOINT_DIR, apelido, entidade)
+
+def _salvar_atomico_json(caminho, dados):
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def _salvar_atomico_npy(caminho, vetores):
+    temporario = caminho + ".tmp.npy"
+    np.save(temporario, vetores)
+    os.replace(temporario, caminho)
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+# --- CODIFICAÇÃO COM CHECKPOINT ---
+
+def codificar_shard(n, itens, obter_modelo, nome_modelo, diretorio, batch_size=BATCH_SIZE, backend="torch"):
+    """
+    Codifica um shard de registros, salvando os vetores (.npy) e as chaves do shard (.json).
+
+    Se um build anterior interrompido já salvou o shard n com exatamente as mesmas chaves
+    (modelo + backend + IDs + hashes de texto, na mesma ordem), os vetores são lidos do disco e o
+    modelo não é executado: um build reiniciado retoma a partir do último shard concluído.
+
+    Args:
+        n (int): Número sequencial do shard.
+        itens (list): Lista de tuplas (id_original, texto, hash_texto).
+        obter_modelo (callable): Retorna o modelo de embedding (carregado sob demanda).
+        nome_modelo (str): Nome do modelo, parte da chave do shard.
+        diretorio (str): Diretório do checkpoint deste par (modelo, entidade).
+        backend (str): Backend de inferência do build (backend_inferencia), parte da chave do shard.
+
+    Returns:
+        numpy.ndarray: Matriz (len(itens), dim) float32, na mesma ordem de itens.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    caminho_vetores = os.path.join(diretorio, f"shard_{n:05d}.npy")
+    caminho_chaves = os.path.join(diretorio, f"shard_{n:05d}.json")
+    chaves = {"modelo": nome_modelo, "backend": backend, "itens": [f"{item_id}:{impressao}" for item_id, _, impressao in itens]}
+
+    if os.path.exists(caminho_vetores) and _ler_json(caminho_chaves) == chaves:
+        logging.info(f"Shard {n + 1} retomado do checkpoint em {diretorio}.")
+        return np.load(caminho_vetores)
+
+    textos = [' '.join(texto.split()).strip() for _, texto, _ in itens]
+    vetores = obter_modelo().encode(textos, batch_size=batch_size, convert_to_numpy=True).astype(np.float32)
+    _salvar_atomico_npy(caminho_vetores, vetores)
+    _salvar_atomico_json(caminho_chaves, chaves)
+    logging.info(f"Shard {n + 1} salvo em {diretorio}.")
+    return vetores
+
+def limpar_checkpoint(diretorio):
+    """Remove os shards de um build concluído (o índice final já foi salvo)."""
+    if os.path.isdir(diretorio):
+        shutil.rmtree(diretorio, ignore_errors=True)
@@ -0,0 +1,219 @@
+import os
+import json
+import logging
+from datetime import datetime
+import numpy as np
+import faiss
+
+from registro_indices import APELIDO_LEGADO, descobrir_indices, carregar_vetores
+from repositorio_registros import ENTIDADES_REGISTRO, chaves_registro, buscar_por_chaves, chaves_repetidas
+from agrupamento import carregar_pools
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+
+# Dois vetores são quase duplicados quando a distância L2² entre eles não passa de LIMIAR_DUPLICADO vezes
+# a norma² do vetor consultado (0.05 ≈ distância de ~22% do comprimento do vetor). Relativo à norma para
+# não depender da escala do modelo de embeddings.
+LIMIAR_DUPLICADO = float(os.environ.get("DECISION_LIMIAR_DUPLICADO", "0.05"))
+# Consultas por chamada de range_search no relatório em lote
+TAMANHO_LOTE_RELATORIO = 1024
+
+# Campos que não são sobrescritos ao mesclar um cadastro novo em um existente
+CAMPOS_PRESERVADOS = ("infos_basicas_codigo_profissional", "infos_basicas_data_criacao", "infos_basicas_inserido_por")
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- BUSCA POR RAIO ---
+
+def vizinhos_no_raio(index, vetor, limiar=LIMIAR_DUPLICADO):
+    """
+    Vetores do índice dentro do raio de quase duplicado em torno de 'vetor' (range_search do FAISS).
+
+    Returns:
+        list: [(posição no índice, distância relativa)] em ordem crescente de distância.
+    """
+    if index is None or index.ntotal == 0:
+        return []
+    consulta = np.asarray(vetor, dtype=np.float32).reshape(1, -1)
+    norma = float((consulta ** 2).sum())
+    if norma == 0:
+        return []
+    _, distancias, posicoes = index.range_search(consulta, limiar * norma)
+    ordem = np.argsort(distancias, kind="stable")
+    return [(int(posicoes[i]), float(distancias[i]) / norma) for i in ordem]
+
+def procurar_duplicados(registro, vetor, index=None, metadados=None, entidade="candidatos", limiar=LIMIAR_DUPLICADO,
+                        caminho_base=None):
+    """
+    Cadastros existentes que parecem ser a mesma pessoa do registro: mesma chave exata (email, hash do CPF)
+    ou embedding dentro do raio de quase duplicado.
+
+    Args:
+        registro (dict): Registro ainda não gravado.
+        vetor (np.array): Embedding do texto do registro (None para verificar só as chaves).
+        index, metadados: Índice FAISS da entidade e seus metadados (id_original na ordem dos vetores).
+    Returns:
+        list: [{"id", "motivos": [...], "distancia": float ou None}], chaves exatas primeiro e depois
+        por distância.
+    """
+    id_proprio = str((registro or {}).get(ENTIDADES_REGISTRO[entidade][1], ""))
+    encontrados = {}
+    for item_id, chaves in buscar_por_chaves(entidade, chaves_registro(entidade, registro), caminho_base).items():
+        encontrados[item_id] = {"id": item_id, "motivos": sorted(chave.split(":", 1)[0] for chave in chaves), "distancia": None}
+
+    if vetor is not None and index is not None and metadados is not None:
+        ids = metadados["id_original"].astype(str).to_numpy()
+        for posicao, distancia in vizinhos_no_raio(index, vetor, limiar):
+            if posicao >= len(ids):
+                continue
+            item = encontrados.setdefault(ids[posicao], {"id": ids[posicao], "motivos": [], "distancia": None})
+            if item["distancia"] is None:
+                item["motivos"].append("vetor")
+                item["distancia"] = distancia
+
+    encontrados.pop(id_proprio, None)
+    return sorted(encontrados.values(), key=lambda item: (item["motivos"] == ["vetor"],
+                                                          item["distancia"] if item["distancia"] is not None else 0.0))
+
+def mesclar_registros(existente, novo):
+    """
+    Registro resultante da mesclagem de um cadastro novo em um existente: campos preenchidos no novo
+    prevalecem, campos vazios no novo mantêm o valor existente, e ID/data de criação são preservados.
+    """
+    mesclado = dict(existente)
+    for campo, valor in novo.items():
+        if campo in CAMPOS_PRESERVADOS:
+            continue
+        if valor is None or (isinstance(valor, str) and not valor.strip()):
+            continue
+        mesclado[campo] = valor
+    return mesclado
+
+# --- RELATÓRIO EM LOTE ---
+
+def caminho_relatorio(apelido, entidade, model_dir=None):
+    return os.path.join(model_dir or MODEL_DIR, f"duplicados_{entidade}_{apelido}.json")
+
+def _raiz(pais, x):
+    while pais.setdefault(x, x) != x:
+        pais[x] = pais[pais[x]]
+        x = pais[x]
+    return x
+
+def _unir(pais, a, b):
+    raiz_a, raiz_b = _raiz(pais, a), _raiz(pais, b)
+    if raiz_a != raiz_b:
+        pais[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+
+def _pares_no_raio(vetores, limiar):
+    """Pares (i, j), i < j, de vetores quase duplicados dentro de um grupo, com a distância relativa."""
+    normas = (vetores ** 2).sum(axis=1)
+    index = faiss.IndexFlatL2(vetores.shape[1])
+    index.add(vetores)
+    for inicio in range(0, len(vetores), TAMANHO_LOTE_RELATORIO):
+        fim = min(inicio + TAMANHO_LOTE_RELATORIO, len(vetores))
+        lims, distancias, posicoes = index.range_search(vetores[inicio:fim], limiar * float(normas[inicio:fim].max()))
+        for q in range(fim - inicio):
+            i = inicio + q
+            for d, j in zip(distancias[lims[q]:lims[q + 1]], posicoes[lims[q]:lims[q + 1]]):
+                # Simétrico: o par precisa estar no raio dos dois vetores (usa a menor norma)
+                menor_norma = min(normas[i], normas[j])
+                if j > i and menor_norma > 0 and d <= limiar * menor_norma:
+                    yield i, int(j), float(d) / float(menor_norma)
+
+def relatorio_duplicados(apelido=APELIDO_LEGADO, entidade="candidatos", limiar=LIMIAR_DUPLICADO, model_dir=None,
+                         caminho_base=None, modelos=None):
+    """
+    Varre um índice inteiro atrás de grupos de cadastros duplicados (chaves exatas repetidas na base e
+    pares de vetores dentro do raio de quase duplicado) e grava o relatório em models1/duplicados_*.json.
+    Se o par já foi agrupado em pools (agrupamento.py), a busca por raio é feita dentro de cada pool,
+    o que evita a comparação de todos contra todos.
+
+    Returns:
+        dict: Relatório gravado (ou None se o índice não existir).
+    """
+    model_dir = model_dir or MODEL_DIR
+    info = descobrir_indices(model_dir, modelos).get(apelido, {}).get(entidade)
+    if info is None:
+        logging.warning(f"Índice de {entidade} do modelo '{apelido}' não encontrado em {model_dir}. Relatório ignorado.")
+        return None
+    vetores, ids = carregar_vetores(info)
+    ids = [str(item_id) for item_id in ids]
+
+    grupos = [np.arange(len(ids))]
+    pools = carregar_pools(apelido, entidade, model_dir)
+    if pools is not None and pools["atribuicoes"]["id_original"].astype(str).tolist() == ids:
+        atribuicao = pools["atribuicoes"]["pool"].to_numpy()
+        grupos = [np.flatnonzero(atribuicao == pool) for pool in np.unique(atribuicao)]
+        logging.info(f"Busca por raio restrita a {len(grupos)} pools de {entidade}/{apelido}.")
+    elif pools is not None:
+        logging.warning(f"Pools de {entidade}/{apelido} desatualizados em relação ao índice; comparando o índice inteiro.")
+
+    pais = {}
+    motivos = {}
+    for grupo in grupos:
+        if len(grupo) < 2:
+            continue
+        for i, j, distancia in _pares_no_raio(np.ascontiguousarray(vetores[grupo]), limiar):
+            a, b = ids[grupo[i]], ids[grupo[j]]
+            _unir(pais, a, b)
+            par = motivos.setdefault((min(a, b), max(a, b)), {"motivos": set(), "distancia": None})
+            par["motivos"].add("vetor")
+            par["distancia"] = distancia
+
+    for chave, ids_chave in chaves_repetidas(entidade, caminho_base).items():
+        for outro in ids_chave[1:]:
+            a, b = ids_chave[0], outro
+            _unir(pais, a, b)
+            par = motivos.setdefault((min(a, b), max(a, b)), {"motivos": set(), "distancia": None})
+            par["motivos"].add(chave.split(":", 1)[0])
+
+    membros = {}
+    for item_id in pais:
+        membros.setdefault(_raiz(pais, item_id), []).append(item_id)
+    pares_por_raiz = {}
+    for par, dados in motivos.items():
+        pares_por_raiz.setdefault(_raiz(pais, par[0]), []).append(
+            {"ids": list(par), "motivos": sorted(dados["motivos"]), "distancia": dados["distancia"]})
+    posicao = {item_id: i for i, item_id in enumerate(ids)}
+    grupos_duplicados = []
+    for raiz, lista in membros.items():
+        if len(lista) < 2:
+            continue
+        # O primeiro cadastro (menor posição no índice / ordem de inserção) é sugerido como o registro a manter
+        lista.sort(key=lambda item_id: (posicao.get(item_id, len(ids)), item_id))
+        grupos_duplicados.append({"manter": lista[0], "duplicados": lista[1:], "pares": pares_por_raiz.get(raiz, [])})
+    grupos_duplicados.sort(key=lambda grupo: (-len(grupo["duplicados"]), posicao.get(grupo["manter"], len(ids))))
+
+    relatorio = {
+        "apelido": apelido,
+        "entidade": entidade,
+        "limiar": limiar,
+        "vetores": len(ids),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "grupos": grupos_duplicados,
+    }
+    caminho = caminho_relatorio(apelido, entidade, model_dir)
+    with open(caminho + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=4, ensure_ascii=False)
+    os.replace(caminho + ".tmp", caminho)
+    total = sum(len(grupo["duplicados"]) for grupo in grupos_duplicados)
+    logging.info(f"{entidade}/{apelido}: {len(grupos_duplicados)} grupos de duplicados ({total} cadastros a colapsar). "
+                 f"Relatório em {caminho}")
+    return relatorio
+
+if __name__ == "__main__":
+    import argparse
+    from gerar_tudo import EMBEDDING_MODELS
+
+    parser = argparse.ArgumentParser(description="Relatório de cadastros duplicados (chaves exatas e vetores quase idênticos).")
+    parser.add_argument("--modelos", nargs="*", default=[APELIDO_LEGADO],
+                        help="Apelidos dos modelos (padrão: legado, o índice atualizado pelo cadastro).")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_DUPLICADO,
+                        help="Distância L2² máxima, relativa à norma² do vetor, para considerar dois vetores duplicados.")
+    args = parser.parse_args()
+    for apelido in args.modelos:
+        relatorio_duplicados(apelido, "candidatos", args.limiar, modelos=EMBEDDING_MODELS)
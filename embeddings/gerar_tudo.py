@@ -2,14 +2,25 @@ import os
 import pandas as pd
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+from backend_inferencia import BACKEND_INFERENCIA, carregar_modelo
+from registro_indices import caminhos_indice, salvar_manifesto
+from build_incremental import carregar_build_anterior
+from checkpoints import TAMANHO_SHARD, diretorio_checkpoint, codificar_shard, limpar_checkpoint
+from pipeline_build import extrair_em_paralelo, novas_metricas, resumir_metricas
+from instrumentacao import medir, requisicao
+from repositorio_registros import exportar_pendentes
+from indice_particionado import CRITERIOS_PARTICAO, salvar_particionado, remover_particoes
+from armazem_vetores import gravar_armazem
+from campos_semanticos import gerar_campos
 import json
+import time
 import logging
 from datetime import datetime
 
 # --- CONFIGURAÇÃO ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, '..', 'models1')
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(BASE_DIR, '..', 'data'))
 
 EMBEDDING_MODELS = {
     "original": 'paraphrase-multilingual-mpnet-base-v2',  # Seu modelo atual
@@ -17,6 +28,13 @@ EMBEDDING_MODELS = {
     "all_mpnet_base": 'sentence-transformers/all-mpnet-base-v2' # Muito forte em inglês, bom geral
 }
 
+# Tipos de armazenamento dos vetores no FAISS:
+#   flat -> float32 sem perdas (4 bytes por dimensão)
+#   fp16 -> meia precisão (2 bytes por dimensão)
+#   sq8  -> quantização escalar de 8 bits (1 byte por dimensão, requer treino)
+TIPOS_INDICE = ("flat", "fp16", "sq8")
+TIPO_INDICE_PADRAO = "flat"
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -69,6 +87,31 @@ def salvar_metadados(df, caminho):
     except Exception as e:
         logging.error(f"Erro ao salvar metadados {caminho}: {e}")
 
+def criar_index(dim, tipo_indice=TIPO_INDICE_PADRAO):
+    """
+    Cria um índice FAISS (métrica L2) vazio para o tipo de armazenamento escolhido.
+    """
+    if tipo_indice == "flat":
+        return faiss.IndexFlatL2(dim)
+    if tipo_indice == "fp16":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    if tipo_indice == "sq8":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    raise ValueError(f"Tipo de índice desconhecido: {tipo_indice}. Opções: {', '.join(TIPOS_INDICE)}")
+
+def montar_index(vetores, tipo_indice=TIPO_INDICE_PADRAO):
+    """
+    Monta um índice FAISS a partir de uma matriz (n, dim) de embeddings.
+    Treina o quantizador quando necessário e adiciona todos os vetores de uma vez,
+    preservando a ordem (a posição i no índice corresponde à linha i dos metadados).
+    """
+    vetores = np.ascontiguousarray(vetores, dtype=np.float32)
+    index = criar_index(vetores.shape[1], tipo_indice)
+    if not index.is_trained:
+        index.train(vetores)
+    index.add(vetores)
+    return index
+
 # --- FUNÇÕES DE EXTRAÇÃO DE TEXTO ---
 
 def extrair_texto_vaga(vaga_data):
@@ -194,9 +237,50 @@ def extrair_texto_prospect(prospect_data):
     texto_final = " ".join(p.strip() for p in partes if p and isinstance(p, str)).strip()
     return texto_final if texto_final else None
 
+# O mesmo candidato aparece em várias vagas no histórico: cada interação (candidato, vaga) é um registro
+# próprio no índice de prospects, identificado por "{prospect_codigo}:{id_vaga}"
+SEPARADOR_INTERACAO = ":"
+
+def chave_interacao_prospect(prospect_data):
+    """ID de uma interação do histórico de prospects (candidato e vaga)."""
+    return f"{prospect_data.get('prospect_codigo')}{SEPARADOR_INTERACAO}{prospect_data.get('id_vaga')}"
+
+def separar_chave_interacao(chave):
+    """
+    Inverso de chave_interacao_prospect: retorna (prospect_codigo, id_vaga).
+    Em índices gerados antes da chave por interação (só o código do candidato), id_vaga é None.
+    """
+    prospect_codigo, separador, id_vaga = str(chave).partition(SEPARADOR_INTERACAO)
+    return prospect_codigo, (id_vaga if separador else None)
+
 # --- FUNÇÃO PRINCIPAL DE GERAÇÃO DE ÍNDICES ---
-def gerar_indices_para_todos_os_modelos():
-    logging.info("Iniciando geração de índices para múltiplos modelos...")
+def gerar_indices_para_todos_os_modelos(tipo_indice=TIPO_INDICE_PADRAO, completo=False, apelidos=None, particionar_candidatos=None,
+                                         campos=False):
+    """
+    Gera (ou atualiza) os índices de vagas, candidatos e prospects para cada modelo de EMBEDDING_MODELS.
+
+    Por padrão o build é incremental: o hash do texto extraído de cada registro é salvo nos metadados
+    e, no build seguinte, apenas registros novos ou alterados passam pelo modelo; os demais reaproveitam
+    o vetor anterior e IDs removidos saem do índice. Use completo=True para recodificar tudo.
+    O backend de inferência (DECISION_BACKEND_INFERENCIA) fica registrado no manifesto e no armazém de vetores;
+    trocá-lo força o rebuild completo, e uma falha ao carregar o backend interrompe o build do modelo em vez de
+    misturar vetores do PyTorch com os do backend pedido.
+    apelidos restringe o build a alguns modelos de EMBEDDING_MODELS (padrão: todos).
+    particionar_candidatos ('faixa' ou 'local') grava o índice de candidatos em partições independentes
+    (ver indice_particionado) em vez de um único arquivo; só as partições alteradas são regravadas.
+    campos=True também grava um vetor por campo semântico de vagas e candidatos (ver campos_semanticos),
+    usado pela busca com pesos por campo.
+    """
+    if tipo_indice not in TIPOS_INDICE:
+        raise ValueError(f"Tipo de índice desconhecido: {tipo_indice}. Opções: {', '.join(TIPOS_INDICE)}")
+    if particionar_candidatos and particionar_candidatos not in CRITERIOS_PARTICAO:
+        raise ValueError(f"Critério de particionamento desconhecido: {particionar_candidatos}. Opções: {', '.join(CRITERIOS_PARTICAO)}")
+    logging.info(f"Iniciando geração de índices para múltiplos modelos (armazenamento: {tipo_indice})...")
+
+    # Cadastros feitos pela aplicação ficam na base SQLite até serem exportados para os JSON
+    caminho_registros = os.path.join(DATA_DIR, "registros.sqlite")
+    if os.path.exists(caminho_registros):
+        exportar_pendentes(DATA_DIR, caminho_registros)
 
     # Carrega os dados brutos
     vagas_raw = carregar_json(os.path.join(DATA_DIR, "vagas.json"))
@@ -212,16 +296,16 @@ def gerar_indices_para_todos_os_modelos():
         out = {}
         if isinstance(dados_brutos, list):
             for i, item in enumerate(dados_brutos):
-                item_id = str(item.get(chave_id, f"{tipo_dado}_{i}"))
+                item_id = str(chave_id(item) if callable(chave_id) else item.get(chave_id, f"{tipo_dado}_{i}"))
                 if item_id in out:
                     logging.warning(f"ID duplicado {item_id} em {tipo_dado}. Ignorado.")
                     continue
                 out[item_id] = item
         elif isinstance(dados_brutos, dict):
             # Se for um único dicionário no nível raiz, use a chave_id ou um fallback
-            item_id = str(dados_brutos.get(chave_id, f"{tipo_dado}_0"))
+            item_id = str(chave_id(dados_brutos) if callable(chave_id) else dados_brutos.get(chave_id, f"{tipo_dado}_0"))
             out[item_id] = dados_brutos
-            if chave_id not in dados_brutos:
+            if not callable(chave_id) and chave_id not in dados_brutos:
                 logging.warning(f"Arquivo {tipo_dado}.json é um único dicionário sem '{chave_id}'. Usando '{item_id}' como ID.")
         else:
             logging.warning(f"Arquivo {tipo_dado}.json não está no formato esperado (lista ou dicionário). Ignorando.")
@@ -229,83 +313,176 @@ def gerar_indices_para_todos_os_modelos():
 
     vagas = preparar_dados_para_processamento(vagas_raw, "id_vaga", "vaga")
     candidatos = preparar_dados_para_processamento(candidatos_raw, "infos_basicas_codigo_profissional", "candidato")
-    prospects = preparar_dados_para_processamento(prospects_raw, "prospect_codigo", "prospect")
+    prospects = preparar_dados_para_processamento(prospects_raw, chave_interacao_prospect, "prospect")
 
     os.makedirs(MODEL_DIR, exist_ok=True)
 
+    backend = BACKEND_INFERENCIA
+
     # Loop sobre modelos
     for apelido_modelo, nome_modelo in EMBEDDING_MODELS.items():
-        logging.info(f"Iniciando processamento para o modelo: {apelido_modelo} ({nome_modelo})")
-
+        if apelidos and apelido_modelo not in apelidos:
+            continue
+        logging.info(f"Iniciando processamento para o modelo: {apelido_modelo} ({nome_modelo}, backend {backend})")
+
+        # O modelo só é carregado quando algum registro precisa ser (re)codificado:
+        # se nada mudou desde o último build, o transformer nem chega a ser instanciado.
+        modelo_carregado = {}
+        def obter_modelo():
+            if "modelo" not in modelo_carregado:
+                modelo = carregar_modelo(nome_modelo, backend, fallback=False)
+                logging.info(f"Modelo '{nome_modelo}' carregado. Dimensão: {modelo.get_sentence_embedding_dimension()}")
+                modelo_carregado["modelo"] = modelo
+            return modelo_carregado["modelo"]
+
+        # Função interna para processar e acumular embeddings.
+        # A extração de texto roda em paralelo (pipeline_build) e alimenta uma fila limitada;
+        # este loop consome os lotes extraídos: registros inalterados reaproveitam o vetor do
+        # build anterior, textos repetidos compartilham um único vetor e os demais são codificados em
+        # shards com checkpoint em disco.
+        # Os índices FAISS são montados ao final, com um único add (e treino, no caso do sq8).
+        def processar_e_adicionar(dados_dict, extrator_func, entidade, tipo_dado_nome):
+            with medir("build.carregar_build_anterior"):
+                anterior = {} if completo else carregar_build_anterior(apelido_modelo, entidade, nome_modelo, MODEL_DIR, backend)
+            diretorio = diretorio_checkpoint(apelido_modelo, entidade, os.path.join(MODEL_DIR, "checkpoints"))
+            metricas = novas_metricas()
+            metadados_list = []
+            vetores_list = []
+            pendentes = []  # (posição, id, texto, hash) aguardando o próximo shard, um por texto distinto
+            # Registros com texto idêntico (mesmo hash) compartilham o vetor: cada texto é codificado uma
+            # única vez e o vetor é replicado para as demais posições
+            vetores_por_hash = {impressao: vetor for impressao, vetor in anterior.values()}
+            posicoes_pendentes = {}  # hash -> posições que aguardam o vetor do shard em andamento
+            total_encoded = 0
+            total_reused = 0
+            total_repetidos = 0
+            shards = 0
+
+            def codificar_pendentes():
+                nonlocal shards
+                inicio = time.perf_counter()
+                with medir("build.codificar_shard"):
+                    vetores = codificar_shard(shards, [(item_id, texto, impressao) for _, item_id, texto, impressao in pendentes],
+                                              obter_modelo, nome_modelo, diretorio, backend=backend)
+                metricas["codificacao_s"] += time.perf_counter() - inicio
+                for (_, _, _, impressao), vetor in zip(pendentes, vetores):
+                    vetores_por_hash[impressao] = vetor
+                    for posicao in posicoes_pendentes.pop(impressao):
+                        vetores_list[posicao] = vetor
+                shards += 1
+                pendentes.clear()
+
+            for lote in extrair_em_paralelo(dados_dict, extrator_func, metricas):
+                for item_id, texto, impressao in lote:
+                    if not texto:
+                        logging.warning(f"{tipo_dado_nome} ID: {item_id} sem texto útil para embedding (campos importantes vazios).")
+                        continue
+                    posicao = len(metadados_list)
+                    metadados_list.append({"id_original": item_id, "texto_original": texto, "hash_texto": impressao})
+                    if item_id in anterior and anterior[item_id][0] == impressao:
+                        vetores_list.append(anterior[item_id][1])
+                        total_reused += 1
+                    elif impressao in vetores_por_hash:
+                        vetores_list.append(vetores_por_hash[impressao])
+                        total_repetidos += 1
+                    elif impressao in posicoes_pendentes:
+                        vetores_list.append(None)
+                        posicoes_pendentes[impressao].append(posicao)
+                        total_repetidos += 1
+                    else:
+                        vetores_list.append(None)
+                        posicoes_pendentes[impressao] = [posicao]
+                        pendentes.append((posicao, item_id, texto, impressao))
+                        total_encoded += 1
+                        if len(pendentes) >= TAMANHO_SHARD:
+                            codificar_pendentes()
+            if pendentes:
+                codificar_pendentes()
+
+            total_removed = len(set(anterior) - set(dados_dict))
+            a_codificar = total_encoded + total_repetidos
+            logging.info(f"{tipo_dado_nome}: {len(dados_dict)} processados, {len(vetores_list)} indexados "
+                         f"({total_encoded} codificados, {total_reused} reaproveitados, {total_repetidos} por texto repetido, "
+                         f"{total_removed} removidos).")
+            if total_repetidos:
+                logging.info(f"{tipo_dado_nome}: deduplicação de textos evitou {total_repetidos} de {a_codificar} codificações "
+                             f"({total_repetidos / a_codificar:.1%}).")
+            resumir_metricas(metricas, f"{entidade}/{apelido_modelo}")
+            return vetores_list, metadados_list
+
+        # Salva o índice, metadados e manifesto (carimbo de build) de uma entidade e descarta seus shards
+        def salvar_entidade(entidade, vetores_list, metadados_list, tipo_dado_nome):
+            if not vetores_list:
+                logging.warning(f"Nenhum {tipo_dado_nome} indexado para o modelo {apelido_modelo}. Arquivos não serão criados.")
+                return
+            caminhos = caminhos_indice(apelido_modelo, entidade, MODEL_DIR)
+            # Vetores crus float32 fora do índice: base do próximo build incremental e de reconstruções de índice
+            with medir("build.salvar_armazem"):
+                gravar_armazem(apelido_modelo, entidade, nome_modelo, np.vstack(vetores_list),
+                               [m["id_original"] for m in metadados_list], [m["hash_texto"] for m in metadados_list], MODEL_DIR,
+                               backend)
+            if entidade == "candidatos" and particionar_candidatos:
+                with medir("build.montar_index"):
+                    salvar_particionado(apelido_modelo, entidade, nome_modelo, vetores_list, metadados_list, candidatos,
+                                        particionar_candidatos, montar_index, tipo_indice, MODEL_DIR, backend)
+                # O índice único anterior sairia do registro de qualquer forma; removê-lo evita dois conjuntos divergentes
+                for caminho in caminhos.values():
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                limpar_checkpoint(diretorio_checkpoint(apelido_modelo, entidade, os.path.join(MODEL_DIR, "checkpoints")))
+                return
+            with medir("build.montar_index"):
+                index = montar_index(np.vstack(vetores_list), tipo_indice)
+            with medir("build.salvar"):
+                salvar_index(index, caminhos["index"])
+                salvar_metadados(pd.DataFrame(metadados_list), caminhos["metadados"])
+            salvar_manifesto(apelido_modelo, entidade, nome_modelo, index, tipo_indice, MODEL_DIR, backend)
+            remover_particoes(apelido_modelo, entidade, MODEL_DIR)
+            limpar_checkpoint(diretorio_checkpoint(apelido_modelo, entidade, os.path.join(MODEL_DIR, "checkpoints")))
+
+        # Processa e salva cada entidade assim que concluída, para que uma falha
+        # na entidade seguinte não descarte o trabalho já feito
         try:
-            modelo = SentenceTransformer(nome_modelo)
-            dim = modelo.get_sentence_embedding_dimension()
-            logging.info(f"Modelo '{nome_modelo}' carregado. Dimensão: {dim}")
+            for entidade, dados_dict, extrator_func, tipo_dado_nome in (
+                ("vagas", vagas, extrair_texto_vaga, "vaga"),
+                ("candidatos", candidatos, extrair_texto_candidato, "candidato"),
+                ("prospects", prospects, extrair_texto_prospect, "prospect"),
+            ):
+                logging.info(f"Processando {entidade} para {apelido_modelo}...")
+                with requisicao(f"build_{entidade}"):
+                    vetores_list, metadados_list = processar_e_adicionar(dados_dict, extrator_func, entidade, tipo_dado_nome)
+                    salvar_entidade(entidade, vetores_list, metadados_list, tipo_dado_nome)
         except Exception as e:
-            logging.error(f"Falha ao carregar modelo {nome_modelo}: {e}. Pulando para o próximo.")
+            logging.error(f"Falha ao processar o modelo {nome_modelo}: {e}. Checkpoints preservados; pulando para o próximo.")
             continue
 
-        # Inicializa FAISS e listas de metadados para o modelo atual
-        index_vagas = faiss.IndexFlatL2(dim)
-        index_candidatos = faiss.IndexFlatL2(dim)
-        index_prospects = faiss.IndexFlatL2(dim)
-
-        metadados_vagas = []
-        metadados_candidatos = []
-        metadados_prospects = []
-
-        # Função interna para processar e adicionar embeddings
-        def processar_e_adicionar(dados_dict, extrator_func, faiss_index, metadados_list, tipo_dado_nome):
-            total_processed = 0
-            total_indexed = 0
-            for item_id, item_data in dados_dict.items():
-                texto = extrator_func(item_data)
-                if texto:
-                    emb = gerar_embedding(texto, modelo) # Usa o modelo carregado no loop externo
-                    if emb is not None:
-                        faiss_index.add(np.array([emb]))
-                        metadados_list.append({"id_original": item_id, "texto_original": texto})
-                        total_indexed += 1
-                    else:
-                        logging.warning(f"Não foi possível gerar embedding para {tipo_dado_nome} ID: {item_id} (texto vazio após limpeza ou erro no modelo).")
-                else:
-                    logging.warning(f"{tipo_dado_nome} ID: {item_id} sem texto útil para embedding (campos importantes vazios).")
-                total_processed += 1
-            logging.info(f"{tipo_dado_nome}: {total_processed} processados, {total_indexed} indexados.")
-            return total_processed, total_indexed
-
-        # Processa os dados para o modelo atual
-        logging.info(f"Processando vagas para {apelido_modelo}...")
-        processar_e_adicionar(vagas, extrair_texto_vaga, index_vagas, metadados_vagas, "vaga")
-
-        logging.info(f"Processando candidatos para {apelido_modelo}...")
-        processar_e_adicionar(candidatos, extrair_texto_candidato, index_candidatos, metadados_candidatos, "candidato")
-
-        logging.info(f"Processando prospects para {apelido_modelo}...")
-        processar_e_adicionar(prospects, extrair_texto_prospect, index_prospects, metadados_prospects, "prospect")
-
-        # Salva os índices e metadados para o modelo atual
-        if index_vagas.ntotal > 0:
-            salvar_index(index_vagas, os.path.join(MODEL_DIR, f'faiss_index_vagas_{apelido_modelo}.index'))
-            salvar_metadados(pd.DataFrame(metadados_vagas), os.path.join(MODEL_DIR, f'metadados_vagas_{apelido_modelo}.pkl'))
-        else:
-            logging.warning(f"Nenhuma vaga indexada para o modelo {apelido_modelo}. Arquivos não serão criados.")
-
-        if index_candidatos.ntotal > 0:
-            salvar_index(index_candidatos, os.path.join(MODEL_DIR, f'faiss_index_candidatos_{apelido_modelo}.index'))
-            salvar_metadados(pd.DataFrame(metadados_candidatos), os.path.join(MODEL_DIR, f'metadados_candidatos_{apelido_modelo}.pkl'))
-        else:
-            logging.warning(f"Nenhum candidato indexado para o modelo {apelido_modelo}. Arquivos não serão criados.")
-
-        if index_prospects.ntotal > 0:
-            salvar_index(index_prospects, os.path.join(MODEL_DIR, f'faiss_index_prospects_{apelido_modelo}.index'))
-            salvar_metadados(pd.DataFrame(metadados_prospects), os.path.join(MODEL_DIR, f'metadados_prospects_{apelido_modelo}.pkl'))
-        else:
-            logging.warning(f"Nenhum prospect indexado para o modelo {apelido_modelo}. Arquivos não serão criados.")
+        if campos:
+            try:
+                for entidade, dados_dict in (("vagas", vagas), ("candidatos", candidatos)):
+                    with requisicao(f"build_campos_{entidade}"):
+                        gerar_campos(apelido_modelo, nome_modelo, entidade, dados_dict, obter_modelo, MODEL_DIR, completo, backend)
+            except Exception as e:
+                logging.error(f"Falha ao gerar os vetores por campo do modelo {nome_modelo}: {e}. Pulando para o próximo.")
+                continue
 
         logging.info(f"Finalizado para o modelo: {apelido_modelo}")
 
     logging.info("Geração de todos os índices concluída com sucesso.")
 
 if __name__ == "__main__":
-    gerar_indices_para_todos_os_modelos()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera os índices FAISS e metadados para todos os modelos de embedding.")
+    parser.add_argument("--tipo-indice", choices=TIPOS_INDICE, default=TIPO_INDICE_PADRAO,
+                        help="Armazenamento dos vetores: flat (float32), fp16 ou sq8 (int8 quantizado).")
+    parser.add_argument("--completo", action="store_true",
+                        help="Ignora o build anterior e recodifica todos os registros.")
+    parser.add_argument("--modelos", nargs="*", choices=list(EMBEDDING_MODELS.keys()),
+                        help="Apelidos dos modelos a gerar. Padrão: todos.")
+    parser.add_argument("--particionar-candidatos", choices=CRITERIOS_PARTICAO,
+                        help="Grava o índice de candidatos em partições por faixa de código ou por região (infos_basicas_local).")
+    parser.add_argument("--campos", action="store_true",
+                        help="Também gera um vetor por campo (título, atividades, competências, formação) de vagas e candidatos.")
+    args = parser.parse_args()
+    gerar_indices_para_todos_os_modelos(tipo_indice=args.tipo_indice, completo=args.completo, apelidos=args.modelos,
+                                         particionar_candidatos=args.particionar_candidatos, campos=args.campos)
@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import heapq
+import itertools
+import hashlib
+import logging
+import unicodedata
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import faiss
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+
+# Critérios de particionamento:
+#   faixa -> faixas de TAMANHO_FAIXA_IDS códigos numéricos (ex.: ids_00001 = códigos 10000 a 19999)
+#   local -> uma partição por região (infos_basicas_local)
+CRITERIOS_PARTICAO = ("faixa", "local")
+TAMANHO_FAIXA_IDS = 10_000
+ARQUIVO_PARTICIONAMENTO = "particionamento.json"
+# Threads da busca em leque (o search do FAISS libera o GIL, então as partições rodam em paralelo)
+THREADS_BUSCA = int(os.environ.get("DECISION_THREADS_BUSCA", str(min(8, os.cpu_count() or 1))))
+
+_executor = None
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CAMINHOS ---
+
+def diretorio_particoes(apelido, entidade, model_dir=None):
+    """Diretório com as partições e o particionamento.json de um par (modelo, entidade)."""
+    return os.path.join(model_dir or MODEL_DIR, f"particoes_{entidade}_{apelido}")
+
+def caminhos_particao(diretorio, nome):
+    return {
+        "index": os.path.join(diretorio, f"{nome}.index"),
+        "metadados": os.path.join(diretorio, f"{nome}_metadados.pkl"),
+    }
+
+def ler_particionamento(diretorio):
+    """Conteúdo do particionamento.json (ou None se o par não estiver particionado)."""
+    caminho = os.path.join(diretorio, ARQUIVO_PARTICIONAMENTO)
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Particionamento inválido {caminho}: {e}")
+        return None
+
+def _slug(texto):
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "_", texto).strip("_")
+
+def nome_particao(item_id, registro, criterio):
+    """Partição de um registro segundo o critério escolhido."""
+    if criterio == "faixa":
+        try:
+            return f"ids_{int(item_id) // TAMANHO_FAIXA_IDS:05d}"
+        except (TypeError, ValueError):
+            return "ids_outros"
+    if criterio == "local":
+        return f"local_{_slug((registro or {}).get('infos_basicas_local') or '') or 'sem_local'}"
+    raise ValueError(f"Critério de particionamento desconhecido: {criterio}. Opções: {', '.join(CRITERIOS_PARTICAO)}")
+
+# --- BUILD ---
+
+def _impressao_particao(metadados_list):
+    # Muda sempre que um registro entra, sai ou tem o texto alterado na partição
+    impressao = hashlib.sha1()
+    for metadado in metadados_list:
+        impressao.update(f"{metadado['id_original']}\x1f{metadado.get('hash_texto', '')}\x1e".encode('utf-8'))
+    return impressao.hexdigest()
+
+def salvar_particionado(apelido, entidade, nome_modelo, vetores_list, metadados_list, registros, criterio,
+                        montar_index, tipo_indice, model_dir=None, backend="torch"):
+    """
+    Distribui os vetores de uma entidade em partições e grava cada uma como um índice independente.
+    Partições cujo conteúdo (IDs e hashes de texto) não mudou desde o build anterior não são regravadas,
+    e partições que ficaram vazias são removidas.
+
+    Args:
+        registros (dict): {id: registro}, usado pelo critério 'local'.
+        montar_index (callable): Monta o índice FAISS a partir de uma matriz (n, dim) (gerar_tudo.montar_index).
+    Returns:
+        dict: Conteúdo do particionamento.json gravado.
+    """
+    diretorio = diretorio_particoes(apelido, entidade, model_dir)
+    os.makedirs(diretorio, exist_ok=True)
+    anterior = ler_particionamento(diretorio) or {}
+    mesmo_build = (anterior.get("tipo_indice") == tipo_indice and anterior.get("modelo") == nome_modelo
+                   and anterior.get("backend", "torch") == backend)
+    particoes_anteriores = anterior.get("particoes", {}) if mesmo_build else {}
+
+    posicoes = {}
+    for posicao, metadado in enumerate(metadados_list):
+        nome = nome_particao(metadado["id_original"], registros.get(metadado["id_original"]), criterio)
+        posicoes.setdefault(nome, []).append(posicao)
+
+    particoes = {}
+    regravadas = 0
+    for nome, indices in sorted(posicoes.items()):
+        metadados_particao = [metadados_list[i] for i in indices]
+        impressao = _impressao_particao(metadados_particao)
+        caminhos = caminhos_particao(diretorio, nome)
+        particoes[nome] = {"vetores": len(indices), "impressao": impressao}
+        if particoes_anteriores.get(nome, {}).get("impressao") == impressao and all(map(os.path.exists, caminhos.values())):
+            continue
+        index = montar_index(np.vstack([vetores_list[i] for i in indices]), tipo_indice)
+        faiss.write_index(index, caminhos["index"] + ".tmp")
+        pd.DataFrame(metadados_particao).to_pickle(caminhos["metadados"] + ".tmp")
+        os.replace(caminhos["index"] + ".tmp", caminhos["index"])
+        os.replace(caminhos["metadados"] + ".tmp", caminhos["metadados"])
+        regravadas += 1
+
+    for nome in set(particoes_anteriores) - set(particoes):
+        for caminho in caminhos_particao(diretorio, nome).values():
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    particionamento = {
+        "apelido": apelido,
+        "entidade": entidade,
+        "modelo": nome_modelo,
+        "backend": backend,
+        "criterio": criterio,
+        "tipo_indice": tipo_indice,
+        "dimensao": int(len(vetores_list[0])) if vetores_list else None,
+        "vetores": len(metadados_list),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "particoes": particoes,
+    }
+    temporario = os.path.join(diretorio, ARQUIVO_PARTICIONAMENTO + ".tmp")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(particionamento, f, indent=4, ensure_ascii=False)
+    os.replace(temporario, os.path.join(diretorio, ARQUIVO_PARTICIONAMENTO))
+    logging.info(f"{entidade}/{apelido}: {len(particoes)} partições por '{criterio}' ({regravadas} regravadas) em {diretorio}")
+    return particionamento
+
+def carregar_vetores_particionados(diretorio):
+    """
+    Vetores de todas as partições de um par, indexados pelo ID original (para o build incremental).
+
+    Returns:
+        dict: {id_original: (hash_texto, vetor float32)}
+    """
+    particionamento = ler_particionamento(diretorio) or {}
+    vetores_por_id = {}
+    for nome in particionamento.get("particoes", {}):
+        caminhos = caminhos_particao(diretorio, nome)
+        index = faiss.read_index(caminhos["index"])
+        metadados = pd.read_pickle(caminhos["metadados"])
+        if index.ntotal != len(metadados) or "hash_texto" not in metadados.columns:
+            logging.warning(f"Partição {nome} de {diretorio} desalinhada ou sem 'hash_texto'. Ignorada.")
+            continue
+        vetores = index.reconstruct_n(0, index.ntotal).astype(np.float32)
+        for i, (id_original, impressao) in enumerate(zip(metadados["id_original"], metadados["hash_texto"])):
+            vetores_por_id[str(id_original)] = (impressao, vetores[i])
+    return vetores_por_id
+
+def remover_particoes(apelido, entidade, model_dir=None):
+    """Apaga as partições de um par (usado quando a entidade volta a ser gravada como índice único)."""
+    diretorio = diretorio_particoes(apelido, entidade, model_dir)
+    particionamento = ler_particionamento(diretorio)
+    if particionamento is None:
+        return
+    for nome in particionamento.get("particoes", {}):
+        for caminho in caminhos_particao(diretorio, nome).values():
+            if os.path.exists(caminho):
+                os.remove(caminho)
+    os.remove(os.path.join(diretorio, ARQUIVO_PARTICIONAMENTO))
+    if not os.listdir(diretorio):
+        os.rmdir(diretorio)
+    logging.info(f"Partições de {entidade}/{apelido} removidas de {diretorio}")
+
+# --- BUSCA EM LEQUE ---
+
+def _obter_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=THREADS_BUSCA, thread_name_prefix="busca-particoes")
+    return _executor
+
+def _buscar_particao(parte, consulta, k):
+    index, metadados = parte
+    distancias, indices = index.search(consulta, min(k, index.ntotal))
+    ids = metadados["id_original"].to_numpy()
+    return [(float(d), ids[i]) for d, i in zip(distancias[0], indices[0]) if 0 <= i < len(ids)]
+
+def buscar_particionado(consulta, partes, k):
+    """
+    Busca os k vizinhos mais próximos em todas as partições em paralelo e junta os resultados com um heap.
+
+    Args:
+        consulta (np.array): Matriz (1, dim) float32.
+        partes (list): [(faiss.Index, DataFrame de metadados)] das partições.
+    Returns:
+        list: [(distância, id_original)] em ordem crescente de distância.
+    """
+    partes = [parte for parte in partes if parte[0] is not None and parte[0].ntotal > 0]
+    if len(partes) == 1:
+        return _buscar_particao(partes[0], consulta, k)
+    resultados = _obter_executor().map(lambda parte: _buscar_particao(parte, consulta, k), partes)
+    return list(itertools.islice(heapq.merge(*resultados, key=lambda r: r[0]), k))
+
+# --- BUSCA POR RAIO ---
+
+def _buscar_raio_particao(parte, consulta, raio, limite, params=None):
+    index, metadados = parte
+    if params is not None:
+        _, distancias, posicoes = index.range_search(consulta, raio, params=params)
+    else:
+        _, distancias, posicoes = index.range_search(consulta, raio)
+    total = len(distancias)
+    if total > limite:
+        # Só os 'limite' mais próximos precisam ser ordenados
+        mais_proximos = np.argpartition(distancias, limite - 1)[:limite]
+        distancias, posicoes = distancias[mais_proximos], posicoes[mais_proximos]
+    ordem = np.argsort(distancias, kind="stable")
+    ids = metadados["id_original"].to_numpy()
+    return total, [(float(distancias[i]), ids[posicoes[i]]) for i in ordem if 0 <= posicoes[i] < len(ids)]
+
+def buscar_raio(consulta, partes, raio, limite, params=None):
+    """
+    Todos os vetores a até 'raio' (distância L2²) da consulta, em uma ou várias partições
+    (range_search em paralelo e junção por heap), limitados aos 'limite' mais próximos.
+
+    Args:
+        consulta (np.array): Matriz (1, dim) float32.
+        partes (list): [(faiss.Index, DataFrame de metadados)].
+        params (faiss.SearchParameters, optional): Ex.: seletor de posições (só para índice único).
+    Returns:
+        tuple: (total de vetores dentro do raio, [(distância, id_original)] em ordem crescente de distância)
+    """
+    partes = [parte for parte in partes if parte[0] is not None and parte[0].ntotal > 0]
+    if not partes:
+        return 0, []
+    if len(partes) == 1:
+        return _buscar_raio_particao(partes[0], consulta, raio, limite, params)
+    resultados = list(_obter_executor().map(lambda parte: _buscar_raio_particao(parte, consulta, raio, limite), partes))
+    total = sum(total_parte for total_parte, _ in resultados)
+    return total, list(itertools.islice(heapq.merge(*(lista for _, lista in resultados), key=lambda r: r[0]), limite))
@@ -0,0 +1,175 @@
+import os
+import time
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- CONFIGURAÇÃO ---
+# Porta do endpoint local de métricas (formato texto do Prometheus). 0 desativa o endpoint.
+PORTA_METRICAS = int(os.environ.get("DECISION_PORTA_METRICAS", "9464"))
+# Limites (em segundos) dos buckets dos histogramas de duração por etapa
+LIMITES_HISTOGRAMA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_trava = threading.Lock()
+_histogramas = {}  # etapa -> {"buckets": [...], "soma": float, "contagem": int}
+_contadores = {}   # nome -> int
+_local = threading.local()  # requisição em andamento no thread atual (para o detalhamento na interface)
+_servidor = None
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- REGISTRO DE MÉTRICAS ---
+
+def _observar(etapa, duracao):
+    with _trava:
+        histograma = _histogramas.get(etapa)
+        if histograma is None:
+            histograma = _histogramas[etapa] = {"buckets": [0] * len(LIMITES_HISTOGRAMA), "soma": 0.0, "contagem": 0}
+        for i, limite in enumerate(LIMITES_HISTOGRAMA):
+            if duracao <= limite:
+                histograma["buckets"][i] += 1
+        histograma["soma"] += duracao
+        histograma["contagem"] += 1
+
+def incrementar(nome, valor=1):
+    """Incrementa um contador (ex.: buscas realizadas, erros, candidatos indexados)."""
+    with _trava:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+@contextmanager
+def medir(etapa):
+    """
+    Span de tempo de uma etapa. A duração vai para o histograma da etapa, para o log (nível DEBUG)
+    e, se houver uma requisição em andamento no thread, para o seu detalhamento.
+
+    Uso:
+        with medir("busca.faiss_search"):
+            index.search(...)
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        _observar(etapa, duracao)
+        logging.debug(f"[tempo] {etapa}: {duracao * 1000:.2f}ms")
+        detalhamento = getattr(_local, "detalhamento", None)
+        if detalhamento is not None:
+            acumulado = detalhamento.setdefault(etapa, {"chamadas": 0, "total_ms": 0.0})
+            acumulado["chamadas"] += 1
+            acumulado["total_ms"] += duracao * 1000
+
+@contextmanager
+def requisicao(nome):
+    """
+    Agrupa os spans executados dentro do bloco em um detalhamento por etapa.
+    Ao final registra uma linha de log com o resumo e incrementa o contador da requisição.
+
+    Uso:
+        with requisicao("busca_candidatos") as detalhamento:
+            ...
+        # detalhamento: {etapa: {"chamadas": n, "total_ms": x}, "total": {...}}
+    """
+    anterior = getattr(_local, "detalhamento", None)
+    detalhamento = {}
+    _local.detalhamento = detalhamento
+    inicio = time.perf_counter()
+    try:
+        yield detalhamento
+    finally:
+        duracao = time.perf_counter() - inicio
+        _local.detalhamento = anterior
+        _observar(nome, duracao)
+        incrementar(f"{nome}_total")
+        detalhamento["total"] = {"chamadas": 1, "total_ms": duracao * 1000}
+        _local.ultimo_detalhamento = detalhamento
+        resumo = " | ".join(f"{etapa} {v['total_ms']:.1f}ms" + (f" ({v['chamadas']}x)" if v["chamadas"] > 1 else "")
+                            for etapa, v in detalhamento.items() if etapa != "total")
+        logging.info(f"[tempos {nome}] total {duracao * 1000:.1f}ms | {resumo}")
+
+def cronometrar(nome):
+    """Decorador: executa a função dentro de requisicao(nome)."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with requisicao(nome):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+def ultimo_detalhamento():
+    """Detalhamento da última requisição concluída no thread atual (ou {} se nenhuma)."""
+    return getattr(_local, "ultimo_detalhamento", {})
+
+def detalhamento_como_linhas(detalhamento):
+    """Converte um detalhamento em linhas (etapa, chamadas, total_ms, % do total) para exibição."""
+    total_ms = detalhamento.get("total", {}).get("total_ms") or 0.0
+    linhas = []
+    for etapa, valores in detalhamento.items():
+        percentual = (valores["total_ms"] / total_ms * 100) if total_ms else 0.0
+        linhas.append({"etapa": etapa, "chamadas": valores["chamadas"], "total_ms": round(valores["total_ms"], 3),
+                       "% do total": round(percentual, 1)})
+    return linhas
+
+# --- EXPORTAÇÃO ---
+
+def _nome_metrica(texto):
+    return "".join(c if c.isalnum() else "_" for c in texto)
+
+def exportar_texto():
+    """Serializa contadores e histogramas no formato texto do Prometheus."""
+    with _trava:
+        contadores = dict(_contadores)
+        histogramas = {etapa: {"buckets": list(h["buckets"]), "soma": h["soma"], "contagem": h["contagem"]}
+                       for etapa, h in _histogramas.items()}
+
+    linhas = []
+    for nome, valor in sorted(contadores.items()):
+        metrica = f"decision_{_nome_metrica(nome)}"
+        linhas.append(f"# TYPE {metrica} counter")
+        linhas.append(f"{metrica} {valor}")
+
+    linhas.append("# TYPE decision_etapa_duracao_segundos histogram")
+    for etapa, h in sorted(histogramas.items()):
+        for limite, contagem in zip(LIMITES_HISTOGRAMA, h["buckets"]):
+            linhas.append(f'decision_etapa_duracao_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {contagem}')
+        linhas.append(f'decision_etapa_duracao_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {h["contagem"]}')
+        linhas.append(f'decision_etapa_duracao_segundos_sum{{etapa="{etapa}"}} {h["soma"]:.6f}')
+        linhas.append(f'decision_etapa_duracao_segundos_count{{etapa="{etapa}"}} {h["contagem"]}')
+    return "\n".join(linhas) + "\n"
+
+class _ManipuladorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        corpo = exportar_texto().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass  # evita poluir o log da aplicação a cada coleta
+
+def iniciar_servidor_metricas(porta=PORTA_METRICAS):
+    """
+    Sobe (uma única vez por processo) o endpoint http://127.0.0.1:<porta>/metrics em um thread daemon.
+    Retorna o servidor, ou None se desativado (porta 0) ou se a porta estiver ocupada.
+    """
+    global _servidor
+    if _servidor is not None or not porta:
+        return _servidor
+    try:
+        _servidor = ThreadingHTTPServer(("127.0.0.1", porta), _ManipuladorMetricas)
+    except OSError as e:
+        logging.warning(f"Endpoint de métricas não iniciado na porta {porta}: {e}")
+        return None
+    threading.Thread(target=_servidor.serve_forever, name="metricas-decision", daemon=True).start()
+    logging.info(f"Endpoint de métricas disponível em http://127.0.0.1:{porta}/metrics")
+    return _servidor
@@ -0,0 +1,137 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from build_incremental import hash_texto
+
+# --- CONFIGURAÇÃO ---
+# Processos dedicados à extração de texto (o processo principal fica com a codificação)
+NUM_WORKERS_EXTRACAO = max(1, (os.cpu_count() or 2) - 1)
+# Registros enviados a cada worker por tarefa
+TAMANHO_LOTE_EXTRACAO = 256
+# Lotes extraídos que podem aguardar na fila antes de o produtor ser bloqueado
+TAMANHO_FILA = 8
+
+_FIM = object()
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- ESTÁGIO DE EXTRAÇÃO (executado nos workers) ---
+
+def extrair_lote(extrator_func, lote):
+    """
+    Extrai o texto de um lote de registros e calcula o hash do texto limpo.
+
+    Returns:
+        list: Tuplas (id_original, texto ou None, hash_texto ou None), na ordem do lote.
+    """
+    resultado = []
+    for item_id, item_data in lote:
+        texto = extrator_func(item_data)
+        resultado.append((item_id, texto, hash_texto(texto) if texto else None))
+    return resultado
+
+def _lotes(dados_dict, tamanho_lote):
+    lote = []
+    for item in dados_dict.items():
+        lote.append(item)
+        if len(lote) == tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+# --- PIPELINE PRODUTOR/CONSUMIDOR ---
+
+def novas_metricas():
+    """Acumuladores de tempo (s) de cada estágio do pipeline."""
+    return {"extracao_s": 0.0, "produtor_bloqueado_s": 0.0, "consumidor_esperando_s": 0.0, "codificacao_s": 0.0, "registros": 0}
+
+def extrair_em_paralelo(dados_dict, extrator_func, metricas, num_workers=NUM_WORKERS_EXTRACAO,
+                        tamanho_lote=TAMANHO_LOTE_EXTRACAO, tamanho_fila=TAMANHO_FILA):
+    """
+    Gera lotes de (id_original, texto, hash_texto) na ordem original de dados_dict.
+
+    Um thread produtor distribui a extração entre num_workers processos e coloca os lotes
+    prontos numa fila limitada; o chamador (consumidor) codifica um lote enquanto os seguintes
+    já estão sendo extraídos. Os tempos de espera de cada lado vão para 'metricas':
+    consumidor esperando => a extração limita o throughput; produtor bloqueado => a codificação.
+    """
+    fila = queue.Queue(maxsize=tamanho_fila)
+    parar = threading.Event()  # sinalizado se o consumidor abandonar o pipeline (ex.: erro na codificação)
+
+    def colocar(item):
+        inicio = time.perf_counter()
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        metricas["produtor_bloqueado_s"] += time.perf_counter() - inicio
+
+    def produtor():
+        try:
+            if num_workers <= 1:
+                for lote in _lotes(dados_dict, tamanho_lote):
+                    if parar.is_set():
+                        return
+                    inicio = time.perf_counter()
+                    extraido = extrair_lote(extrator_func, lote)
+                    metricas["extracao_s"] += time.perf_counter() - inicio
+                    colocar(extraido)
+                return
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                pendentes = []
+                for lote in _lotes(dados_dict, tamanho_lote):
+                    if parar.is_set():
+                        break
+                    pendentes.append((time.perf_counter(), executor.submit(extrair_lote, extrator_func, lote)))
+                    # Mantém no máximo 2 tarefas por worker em voo, preservando a ordem dos lotes
+                    while len(pendentes) >= 2 * num_workers:
+                        enviado_em, futuro = pendentes.pop(0)
+                        extraido = futuro.result()
+                        metricas["extracao_s"] += time.perf_counter() - enviado_em
+                        colocar(extraido)
+                for enviado_em, futuro in pendentes:
+                    if parar.is_set():
+                        futuro.cancel()
+                        continue
+                    extraido = futuro.result()
+                    metricas["extracao_s"] += time.perf_counter() - enviado_em
+                    colocar(extraido)
+        except Exception as e:
+            logging.error(f"Erro no estágio de extração: {e}")
+            colocar(e)
+        finally:
+            colocar(_FIM)
+
+    thread = threading.Thread(target=produtor, name="extracao-gerar-tudo", daemon=True)
+    thread.start()
+    try:
+        while True:
+            inicio = time.perf_counter()
+            item = fila.get()
+            metricas["consumidor_esperando_s"] += time.perf_counter() - inicio
+            if item is _FIM:
+                break
+            if isinstance(item, Exception):
+                raise item
+            metricas["registros"] += len(item)
+            yield item
+    finally:
+        parar.set()
+        thread.join()
+
+def resumir_metricas(metricas, rotulo):
+    """Registra no log o tempo de cada estágio e qual deles limitou o throughput."""
+    gargalo = "extração" if metricas["consumidor_esperando_s"] > metricas["produtor_bloqueado_s"] else "codificação"
+    logging.info(
+        f"[pipeline {rotulo}] {metricas['registros']} registros | extração {metricas['extracao_s']:.2f}s | "
+        f"codificação {metricas['codificacao_s']:.2f}s | consumidor esperando {metricas['consumidor_esperando_s']:.2f}s | "
+        f"produtor bloqueado {metricas['produtor_bloqueado_s']:.2f}s | gargalo: {gargalo}"
+    )
@@ -0,0 +1,246 @@
+import os
+import re
+import json
+import zlib
+import logging
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURAÇÃO ---
+# Pesos dos sinais de aderência (relativos entre si; sinais com peso 0 não são calculados). O histórico
+# continua sendo misturado à aderência pelo peso_historico da busca. Podem ser sobrescritos por
+# DECISION_PESOS_ADERENCIA='{"ingles": 0.1, "local": 0.2}'. O padrão reproduz o ranqueamento só por similaridade.
+PESOS_ADERENCIA_PADRAO = {
+    "similaridade": 1.0,
+    "ingles": 0.0,
+    "espanhol": 0.0,
+    "academico": 0.0,
+    "local": 0.0,
+}
+
+# Pontos por situação do candidato em processos anteriores (média por candidato, escala -10 a 10)
+PONTUACOES_SITUACAO = {
+    "Contratado": 10,
+    "Encaminhado ao Requisitante": 8,
+    "Entrevista com Cliente": 7,
+    "Em Negociação": 6,
+    "Em Andamento": 3,
+    "Aguardando Contato": 2,
+    "Em avaliação pelo RH": -1, # Ligeiramente negativo para indicar que está em outro processo
+    "Desistiu": -5,
+    "Rejeitado": -8,
+    "Não Atende aos Requisitos": -10,
+    "Outros": 0 # Situações não mapeadas
+}
+MIN_HISTORICO, MAX_HISTORICO = -10, 10
+
+# Escalas ordinais (0 = não informado / nenhum)
+NIVEIS_IDIOMA = {"nenhum": 0, "basico": 1, "tecnico": 1, "intermediario": 2, "avancado": 3, "fluente": 4}
+# Avaliados em ordem: o primeiro padrão encontrado define o nível
+NIVEIS_ACADEMICOS = (
+    ("doutorado", 8),
+    ("mestrado", 7),
+    ("pos", 6),
+    ("superior_completo", 5),
+    ("superior", 4),  # incompleto / cursando
+    ("tecnico", 3),
+    ("medio", 2),
+    ("fundamental", 1),
+)
+SIGLAS_UF = ("AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA", "PB", "PR", "PE",
+             "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO")
+NOMES_UF = {
+    "acre": "AC", "alagoas": "AL", "amapa": "AP", "amazonas": "AM", "bahia": "BA", "ceara": "CE",
+    "distrito_federal": "DF", "espirito_santo": "ES", "goias": "GO", "maranhao": "MA", "mato_grosso": "MT",
+    "mato_grosso_do_sul": "MS", "minas_gerais": "MG", "para": "PA", "paraiba": "PB", "parana": "PR",
+    "pernambuco": "PE", "piaui": "PI", "rio_de_janeiro": "RJ", "rio_grande_do_norte": "RN",
+    "rio_grande_do_sul": "RS", "rondonia": "RO", "roraima": "RR", "santa_catarina": "SC", "sao_paulo": "SP",
+    "sergipe": "SE", "tocantins": "TO",
+}
+# Pontuação de local quando a vaga é em outra cidade do mesmo estado (mesma cidade = 100, outro estado = 0)
+PONTUACAO_MESMA_UF = 50.0
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def carregar_pesos():
+    """Pesos de aderência configurados (padrão + DECISION_PESOS_ADERENCIA)."""
+    pesos = dict(PESOS_ADERENCIA_PADRAO)
+    configurados = os.environ.get("DECISION_PESOS_ADERENCIA")
+    if configurados:
+        try:
+            for sinal, peso in json.loads(configurados).items():
+                if sinal not in pesos:
+                    logging.warning(f"Sinal de aderência desconhecido em DECISION_PESOS_ADERENCIA: {sinal}. Ignorado.")
+                    continue
+                pesos[sinal] = float(peso)
+        except (ValueError, AttributeError, TypeError) as e:
+            logging.error(f"DECISION_PESOS_ADERENCIA inválido ({e}). Usando os pesos padrão.")
+            return dict(PESOS_ADERENCIA_PADRAO)
+    return pesos
+
+PESOS_ADERENCIA = carregar_pesos()
+
+# --- NORMALIZAÇÃO DOS CAMPOS ---
+
+def _slug(texto):
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "_", texto).strip("_")
+
+def nivel_idioma(texto):
+    return NIVEIS_IDIOMA.get(_slug(texto).split("_")[0] if texto else "", 0)
+
+def nivel_academico(texto):
+    slug = _slug(texto)
+    if not slug:
+        return 0
+    for padrao, nivel in NIVEIS_ACADEMICOS:
+        if padrao in slug:
+            return nivel
+    return 0
+
+def _codigo_uf(sigla):
+    return SIGLAS_UF.index(sigla) if sigla in SIGLAS_UF else -1
+
+def _codigo_cidade(cidade):
+    slug = _slug(cidade)
+    return zlib.crc32(slug.encode("ascii")) if slug else 0
+
+def localizacao(texto):
+    """(código da cidade, código da UF) de um texto 'Cidade, UF' ou 'Cidade - Estado'; 0/-1 se ausentes."""
+    partes = [parte.strip() for parte in re.split(r"[,/\-]", str(texto or "")) if parte.strip()]
+    if not partes:
+        return 0, -1
+    uf = -1
+    for parte in reversed(partes):
+        sigla = parte.upper() if len(parte) == 2 else NOMES_UF.get(_slug(parte))
+        if sigla in SIGLAS_UF:
+            uf = _codigo_uf(sigla)
+            break
+    cidade = partes[0] if len(partes) > 1 or uf == -1 else ""
+    return _codigo_cidade(cidade), uf
+
+# --- ATRIBUTOS PRÉ-CALCULADOS ---
+
+def montar_atributos(registros):
+    """
+    Arrays de atributos estruturados por candidato, na ordem de 'registros'.
+
+    Args:
+        registros: Iterável de (id, registro do candidato).
+    Returns:
+        dict: {"ids": pd.Index, "ingles", "espanhol", "academico": int8, "cidade": int64, "uf": int8}
+    """
+    ids, ingles, espanhol, academico, cidade, uf = [], [], [], [], [], []
+    for item_id, registro in registros:
+        ids.append(str(item_id))
+        ingles.append(nivel_idioma(registro.get("formacao_e_idiomas_nivel_ingles")))
+        espanhol.append(nivel_idioma(registro.get("formacao_e_idiomas_nivel_espanhol")))
+        academico.append(nivel_academico(registro.get("formacao_e_idiomas_nivel_academico")))
+        codigo_cidade, codigo_uf = localizacao(registro.get("infos_basicas_local") or registro.get("informacoes_pessoais_endereco"))
+        cidade.append(codigo_cidade)
+        uf.append(codigo_uf)
+    return {
+        "ids": pd.Index(ids),
+        "ingles": np.array(ingles, dtype=np.int8),
+        "espanhol": np.array(espanhol, dtype=np.int8),
+        "academico": np.array(academico, dtype=np.int8),
+        "cidade": np.array(cidade, dtype=np.int64),
+        "uf": np.array(uf, dtype=np.int8),
+    }
+
+def historico_por_candidato(prospects):
+    """Média dos pontos de situação (PONTUACOES_SITUACAO) por candidato. Retorna pd.Series indexada pelo ID."""
+    if not prospects:
+        return pd.Series(dtype=np.float64)
+    historico = pd.DataFrame({
+        "id": [str(p.get("prospect_codigo")) for p in prospects],
+        "pontos": [PONTUACOES_SITUACAO.get(p.get("prospect_situacao_candidado", "Outros"), PONTUACOES_SITUACAO["Outros"])
+                   for p in prospects],
+    })
+    return historico.groupby("id")["pontos"].mean()
+
+def requisitos_vaga(vaga):
+    """Vetor de requisitos de uma vaga (mesmas escalas dos atributos dos candidatos)."""
+    cidade = _codigo_cidade(vaga.get("perfil_cidade"))
+    sigla = str(vaga.get("perfil_estado") or "").strip()
+    uf = _codigo_uf(sigla.upper() if len(sigla) == 2 else NOMES_UF.get(_slug(sigla)))
+    if uf == -1 and cidade == 0:
+        cidade, uf = localizacao(vaga.get("perfil_local_trabalho"))
+    return {
+        "ingles": nivel_idioma(vaga.get("perfil_nivel_ingles")),
+        "espanhol": nivel_idioma(vaga.get("perfil_nivel_espanhol")),
+        "academico": nivel_academico(vaga.get("perfil_nivel_academico")),
+        "cidade": cidade,
+        "uf": uf,
+    }
+
+def selecionar_atributos(atributos, ids, complementar=None):
+    """
+    Atributos dos candidatos 'ids' (na mesma ordem). IDs ausentes dos arrays pré-calculados (ex.: cadastrados
+    depois da última montagem) são calculados por complementar(ids_ausentes) -> iterável de (id, registro).
+    """
+    posicoes = atributos["ids"].get_indexer(ids)
+    selecionados = {campo: valores[np.clip(posicoes, 0, None)] if len(valores) else np.zeros(len(ids), valores.dtype)
+                    for campo, valores in atributos.items() if campo != "ids"}
+    ausentes = np.flatnonzero(posicoes < 0)
+    for campo in selecionados:
+        selecionados[campo][ausentes] = -1 if campo == "uf" else 0
+    if len(ausentes) and complementar is not None:
+        extras = montar_atributos(complementar([ids[i] for i in ausentes]))
+        posicoes_extras = extras["ids"].get_indexer([ids[i] for i in ausentes])
+        encontrados = posicoes_extras >= 0
+        for campo in selecionados:
+            selecionados[campo][ausentes[encontrados]] = extras[campo][posicoes_extras[encontrados]]
+    return selecionados
+
+# --- PONTUAÇÃO ---
+
+def _cobertura(nivel_candidato, nivel_requerido):
+    # 100 quando o candidato atinge o nível pedido; proporcional abaixo dele. Sem exigência, o sinal é neutro (100)
+    if nivel_requerido <= 0:
+        return np.full(len(nivel_candidato), 100.0)
+    return np.clip(nivel_candidato.astype(np.float64) / nivel_requerido, 0, 1) * 100
+
+def pontuar(similaridade, atributos, historico, requisitos, peso_historico, pesos=None):
+    """
+    Pontuação final de todos os candidatos recuperados de uma vez (sem laço por candidato).
+
+    Args:
+        similaridade (np.array): Similaridade textual (0-100) de cada candidato.
+        atributos (dict): Atributos dos candidatos (selecionar_atributos), na mesma ordem.
+        historico (np.array): Média de pontos de situação de cada candidato (-10 a 10).
+        requisitos (dict): requisitos_vaga da vaga.
+        peso_historico (float): Fração da pontuação final vinda do histórico.
+        pesos (dict): Pesos dos sinais de aderência (padrão: PESOS_ADERENCIA).
+    Returns:
+        dict: {"final": pontuação final (0-100, 2 casas), "aderencia": aderência (0-100), "sinais": {sinal: array}}
+    """
+    pesos = PESOS_ADERENCIA if pesos is None else pesos
+    sinais = {"similaridade": similaridade}
+    if pesos.get("ingles"):
+        sinais["ingles"] = _cobertura(atributos["ingles"], requisitos["ingles"])
+    if pesos.get("espanhol"):
+        sinais["espanhol"] = _cobertura(atributos["espanhol"], requisitos["espanhol"])
+    if pesos.get("academico"):
+        sinais["academico"] = _cobertura(atributos["academico"], requisitos["academico"])
+    if pesos.get("local"):
+        if requisitos["uf"] < 0 and not requisitos["cidade"]:
+            sinais["local"] = np.full(len(similaridade), 100.0)
+        else:
+            mesma_cidade = (atributos["cidade"] == requisitos["cidade"]) & (requisitos["cidade"] != 0)
+            mesma_uf = (atributos["uf"] == requisitos["uf"]) & (requisitos["uf"] >= 0)
+            sinais["local"] = np.where(mesma_cidade, 100.0, np.where(mesma_uf, PONTUACAO_MESMA_UF, 0.0))
+
+    pesos_usados = {sinal: pesos.get(sinal, 0.0) for sinal in sinais if pesos.get(sinal, 0.0) > 0}
+    if pesos_usados:
+        total = sum(pesos_usados.values())
+        aderencia = sum(sinais[sinal] * peso for sinal, peso in pesos_usados.items()) / total
+    else:
+        aderencia = similaridade
+
+    # Histórico reescalado de -10..10 para 0..100
+    historico_normalizado = (historico - MIN_HISTORICO) / (MAX_HISTORICO - MIN_HISTORICO) * 100
+    final = np.clip(aderencia * (1 - peso_historico) + historico_normalizado * peso_historico, 0, 100).round(2)
+    return {"final": final, "aderencia": aderencia, "sinais": sinais}
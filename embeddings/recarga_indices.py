@@ -0,0 +1,129 @@
+import os
+import time
+import logging
+import threading
+
+from versoes_dados import registrar_versao
+
+# --- CONFIGURAÇÃO ---
+# Intervalo (em segundos) entre verificações de nova geração dos arquivos. 0 desativa o thread de recarga
+# (a versão passa a ser verificada a cada consulta, no próprio caminho da busca).
+INTERVALO_RECARGA = float(os.environ.get("DECISION_INTERVALO_RECARGA", "5"))
+
+_trava = threading.Lock()
+_trava_carga = threading.Lock()  # uma geração montada por vez (evita leituras duplicadas do mesmo arquivo)
+_recursos = {}   # chave -> {"versao": função sem argumentos, "carregar": função sem argumentos}
+_snapshots = {}  # chave -> {"versao": ..., "dados": ..., "erro": str ou None, "carregado_em": float}
+_acordar = threading.Event()
+_thread = None
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- SNAPSHOTS ---
+# Cada recurso (índice FAISS + metadados de um modelo, lista de prospects...) é mantido como um snapshot
+# imutável. O thread de recarga monta a nova geração fora do caminho das buscas e só então troca a
+# referência em _snapshots; uma busca em andamento continua usando o snapshot que obteve no início.
+
+def registrar_recurso(chave, versao, carregar):
+    """
+    Registra um recurso recarregável e carrega a sua primeira geração (no thread atual).
+    Sem o thread de recarga ativo, cada chamada verifica a versão e recarrega aqui mesmo se necessário.
+
+    Args:
+        chave: Identificador do recurso (ex.: ("indice", "legado", "candidatos")).
+        versao: Função sem argumentos que retorna a versão atual dos arquivos (ver versoes_dados).
+        carregar: Função sem argumentos que monta os dados do recurso. Exceções ficam registradas no
+            snapshot (campo "erro") e mantêm a geração anterior em uso.
+    Returns:
+        dict: Snapshot atual do recurso.
+    """
+    with _trava:
+        if chave not in _recursos:
+            _recursos[chave] = {"versao": versao, "carregar": carregar}
+    if chave not in _snapshots or _thread is None:
+        atualizar(chave)
+    return _snapshots[chave]
+
+def remover_recurso(chave):
+    """Deixa de acompanhar um recurso (ex.: partição que não existe mais) e libera o seu snapshot."""
+    with _trava:
+        _recursos.pop(chave, None)
+    _snapshots.pop(chave, None)
+
+def obter_snapshot(chave):
+    """Snapshot atual do recurso (ou None se ele não foi registrado)."""
+    return _snapshots.get(chave)
+
+def atualizar(chave):
+    """
+    Verifica a versão dos arquivos do recurso e, se mudou, monta a nova geração e troca a referência.
+    Retorna True se houve troca.
+    """
+    with _trava_carga:
+        return _atualizar(chave)
+
+def _atualizar(chave):
+    recurso = _recursos.get(chave)
+    if recurso is None:
+        return False
+    versao = recurso["versao"]()
+    atual = _snapshots.get(chave)
+    if atual is not None and atual["versao"] == versao:
+        return False
+
+    registrar_versao(f"snapshot:{'/'.join(map(str, chave))}", versao)
+    inicio = time.perf_counter()
+    try:
+        dados = recurso["carregar"]()
+        erro = None
+    except Exception as e:
+        logging.error(f"Erro ao recarregar o recurso {chave}: {e}. A geração anterior continua em uso.")
+        dados = atual["dados"] if atual is not None else None
+        erro = str(e)
+
+    # Arquivos regravados durante a leitura (ex.: cadastro gravando índice e metadados): descarta a
+    # geração montada e tenta de novo na próxima verificação
+    if recurso["versao"]() != versao:
+        logging.info(f"Arquivos do recurso {chave} mudaram durante a recarga; nova tentativa na próxima verificação.")
+        if atual is not None:
+            return False
+
+    _snapshots[chave] = {"versao": versao, "dados": dados, "erro": erro, "carregado_em": time.time()}
+    if atual is not None and erro is None:
+        logging.info(f"Nova geração do recurso {chave} em uso (montada em {time.perf_counter() - inicio:.2f}s).")
+    return True
+
+def atualizar_todos():
+    with _trava:
+        chaves = list(_recursos)
+    for chave in chaves:
+        try:
+            atualizar(chave)
+        except Exception as e:
+            logging.error(f"Falha ao verificar o recurso {chave}: {e}")
+
+# --- THREAD DE RECARGA ---
+
+def _laco_recarga(intervalo):
+    while True:
+        _acordar.wait(intervalo)
+        _acordar.clear()
+        atualizar_todos()
+
+def solicitar_recarga():
+    """Antecipa a próxima verificação (ex.: logo após um cadastro gravar o índice)."""
+    _acordar.set()
+
+def iniciar_recarga(intervalo=INTERVALO_RECARGA):
+    """
+    Sobe (uma única vez por processo) o thread daemon que detecta novas gerações dos arquivos
+    e troca os snapshots. Retorna o thread, ou None se desativado (intervalo 0).
+    """
+    global _thread
+    if _thread is not None or not intervalo:
+        return _thread
+    _thread = threading.Thread(target=_laco_recarga, args=(intervalo,), name="recarga-indices", daemon=True)
+    _thread.start()
+    logging.info(f"Recarga de índices em segundo plano ativa (verificação a cada {intervalo:g}s).")
+    return _thread
@@ -0,0 +1,228 @@
+import os
+import re
+import glob
+import json
+import struct
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import faiss
+
+from indice_particionado import diretorio_particoes, caminhos_particao, ler_particionamento, ARQUIVO_PARTICIONAMENTO
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+
+ENTIDADES = ("vagas", "candidatos", "prospects")
+
+# Arquivos index_{entidade}.faiss / {entidade}_metadados.pkl usados (e atualizados pelo cadastro)
+# antes do registro; foram gerados com o modelo 'original'.
+APELIDO_LEGADO = "legado"
+MODELO_LEGADO = 'paraphrase-multilingual-mpnet-base-v2'
+
+_PADRAO_INDICE = re.compile(r"^faiss_index_(vagas|candidatos|prospects)_(.+)\.index$")
+_PADRAO_PARTICOES = re.compile(r"^particoes_(vagas|candidatos|prospects)_(.+)$")
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CAMINHOS ---
+
+def caminhos_indice(apelido, entidade, model_dir=None):
+    """
+    Retorna os caminhos do índice FAISS, dos metadados e do manifesto de um par (modelo, entidade).
+    """
+    model_dir = model_dir or MODEL_DIR
+    if apelido == APELIDO_LEGADO:
+        return {
+            "index": os.path.join(model_dir, f"index_{entidade}.faiss"),
+            "metadados": os.path.join(model_dir, f"{entidade}_metadados.pkl"),
+            "manifesto": os.path.join(model_dir, f"manifesto_{entidade}.json"),
+        }
+    return {
+        "index": os.path.join(model_dir, f"faiss_index_{entidade}_{apelido}.index"),
+        "metadados": os.path.join(model_dir, f"metadados_{entidade}_{apelido}.pkl"),
+        "manifesto": os.path.join(model_dir, f"manifesto_{entidade}_{apelido}.json"),
+    }
+
+def salvar_manifesto(apelido, entidade, nome_modelo, index, tipo_indice, model_dir=None, backend="torch"):
+    """
+    Grava o carimbo de build de um índice: modelo, backend de inferência, dimensão, total de vetores, tipo e data.
+    """
+    caminho = caminhos_indice(apelido, entidade, model_dir)["manifesto"]
+    manifesto = {
+        "apelido": apelido,
+        "entidade": entidade,
+        "modelo": nome_modelo,
+        "backend": backend,
+        "dimensao": int(index.d),
+        "vetores": int(index.ntotal),
+        "tipo_indice": tipo_indice,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    try:
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, indent=4, ensure_ascii=False)
+        logging.info(f"Manifesto salvo em: {caminho}")
+    except Exception as e:
+        logging.error(f"Erro ao salvar manifesto {caminho}: {e}")
+    return manifesto
+
+def _ler_cabecalho_faiss(caminho):
+    """
+    Lê apenas o cabeçalho do arquivo FAISS (tipo, dimensão e total de vetores),
+    sem carregar os vetores em memória.
+    """
+    with open(caminho, 'rb') as f:
+        cabecalho = f.read(16)
+    tipo, dim, ntotal = struct.unpack("<4siq", cabecalho)
+    return tipo.decode("ascii", errors="replace"), dim, ntotal
+
+def _descrever_particionado(apelido, entidade, nome_modelo, model_dir):
+    """
+    Entrada do registro para um par gravado em partições: 'particoes' mapeia o nome de cada partição
+    aos caminhos do seu índice e metadados, e 'particionamento' aponta para o particionamento.json.
+    """
+    diretorio = diretorio_particoes(apelido, entidade, model_dir)
+    particionamento = ler_particionamento(diretorio)
+    if not particionamento:
+        return None
+    info = {"apelido": apelido, "entidade": entidade, "modelo": nome_modelo, **particionamento,
+            "particionamento": os.path.join(diretorio, ARQUIVO_PARTICIONAMENTO)}
+    info["particoes"] = {nome: caminhos_particao(diretorio, nome) for nome in particionamento.get("particoes", {})}
+    return info
+
+def _descrever_indice(apelido, entidade, nome_modelo, model_dir):
+    particionado = _descrever_particionado(apelido, entidade, nome_modelo, model_dir)
+    if particionado:
+        return particionado
+    caminhos = caminhos_indice(apelido, entidade, model_dir)
+    if not (os.path.exists(caminhos["index"]) and os.path.exists(caminhos["metadados"])):
+        return None
+
+    info = {"apelido": apelido, "entidade": entidade, "modelo": nome_modelo, **caminhos}
+    if os.path.exists(caminhos["manifesto"]):
+        try:
+            with open(caminhos["manifesto"], 'r', encoding='utf-8') as f:
+                info.update(json.load(f))
+            return info
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Manifesto inválido {caminhos['manifesto']}: {e}. Lendo cabeçalho do índice.")
+
+    try:
+        tipo, dim, ntotal = _ler_cabecalho_faiss(caminhos["index"])
+    except Exception as e:
+        logging.warning(f"Não foi possível ler o cabeçalho de {caminhos['index']}: {e}")
+        tipo, dim, ntotal = None, None, None
+    info.update({
+        "dimensao": dim,
+        "vetores": ntotal,
+        "tipo_indice": tipo,
+        "gerado_em": datetime.fromtimestamp(os.path.getmtime(caminhos["index"])).isoformat(timespec="seconds"),
+    })
+    return info
+
+# --- REGISTRO ---
+
+def descobrir_indices(model_dir=None, modelos=None):
+    """
+    Descobre os conjuntos de índices (modelo, entidade) já gerados em models1/.
+
+    Args:
+        model_dir (str, optional): Diretório dos índices. Padrão: models1/.
+        modelos (dict, optional): Mapa apelido -> nome do modelo (ex.: EMBEDDING_MODELS).
+
+    Returns:
+        dict: {apelido: {entidade: info}}, onde info traz caminhos, modelo, dimensão,
+              total de vetores, tipo de índice e data de geração.
+    """
+    model_dir = model_dir or MODEL_DIR
+    modelos = modelos or {}
+    registro = {}
+
+    for entidade in ENTIDADES:
+        info = _descrever_indice(APELIDO_LEGADO, entidade, MODELO_LEGADO, model_dir)
+        if info:
+            registro.setdefault(APELIDO_LEGADO, {})[entidade] = info
+
+    for caminho in sorted(glob.glob(os.path.join(model_dir, "faiss_index_*.index"))):
+        correspondencia = _PADRAO_INDICE.match(os.path.basename(caminho))
+        if not correspondencia:
+            continue
+        entidade, apelido = correspondencia.groups()
+        if apelido not in modelos:
+            logging.warning(f"Índice {os.path.basename(caminho)} de modelo desconhecido '{apelido}'. Ignorado.")
+            continue
+        info = _descrever_indice(apelido, entidade, modelos[apelido], model_dir)
+        if info:
+            registro.setdefault(apelido, {})[entidade] = info
+
+    # Pares gravados em partições (gerar_tudo --particionar-candidatos) não têm o faiss_index_*.index único
+    for caminho in sorted(glob.glob(os.path.join(model_dir, "particoes_*", ARQUIVO_PARTICIONAMENTO))):
+        correspondencia = _PADRAO_PARTICOES.match(os.path.basename(os.path.dirname(caminho)))
+        if not correspondencia:
+            continue
+        entidade, apelido = correspondencia.groups()
+        if apelido not in modelos or entidade in registro.get(apelido, {}):
+            continue
+        info = _descrever_particionado(apelido, entidade, modelos[apelido], model_dir)
+        if info:
+            registro.setdefault(apelido, {})[entidade] = info
+    return registro
+
+def carregar_indice(info):
+    """
+    Carrega o índice FAISS e os metadados descritos por uma entrada do registro.
+
+    Returns:
+        tuple: (faiss.Index ou None, pandas.DataFrame)
+    """
+    try:
+        index = faiss.read_index(info["index"])
+        metadados = pd.read_pickle(info["metadados"])
+        logging.info(f"Índice '{info['entidade']}' do modelo '{info['apelido']}' carregado ({index.ntotal} vetores).")
+        return index, metadados
+    except Exception as e:
+        logging.error(f"Erro ao carregar índice {info['index']}: {e}")
+        return None, pd.DataFrame()
+
+def carregar_particao(info, nome):
+    """
+    Carrega o índice FAISS e os metadados de uma partição de um par particionado.
+
+    Returns:
+        tuple: (faiss.Index ou None, pandas.DataFrame)
+    """
+    caminhos = info["particoes"][nome]
+    try:
+        index = faiss.read_index(caminhos["index"])
+        metadados = pd.read_pickle(caminhos["metadados"])
+        logging.info(f"Partição '{nome}' de '{info['entidade']}' do modelo '{info['apelido']}' carregada ({index.ntotal} vetores).")
+        return index, metadados
+    except Exception as e:
+        logging.error(f"Erro ao carregar partição {caminhos['index']}: {e}")
+        return None, pd.DataFrame()
+
+def carregar_vetores(info):
+    """
+    Vetores (float32) e IDs originais de uma entrada do registro, na ordem do índice
+    (para pares particionados, as partições em ordem de nome).
+
+    Returns:
+        tuple: (np.ndarray (n, dim), list de IDs como str)
+    """
+    if "particoes" in info:
+        partes = [carregar_particao(info, nome) for nome in info["particoes"]]
+    else:
+        partes = [carregar_indice(info)]
+    vetores, ids = [], []
+    for index, metadados in partes:
+        if index is None or index.ntotal == 0:
+            continue
+        vetores.append(index.reconstruct_n(0, index.ntotal).astype(np.float32))
+        ids.extend(str(i) for i in metadados["id_original"])
+    if not vetores:
+        return np.empty((0, 0), dtype=np.float32), []
+    return np.vstack(vetores), ids
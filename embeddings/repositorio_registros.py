@@ -0,0 +1,501 @@
+import os
+import re
+import time
+import json
+import atexit
+import hashlib
+import tempfile
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(BASE_DIR, '..', 'data'))
+# Base SQLite com um registro JSON por linha, indexada pelo ID de cada entidade.
+# É a fonte de verdade dos cadastros: os JSON de data/ são importados na primeira execução (ou quando
+# alterados externamente) e regravados por exportar_pendentes() para quem ainda os consome.
+CAMINHO_BASE = os.path.join(DATA_DIR, "registros.sqlite")
+
+# entidade -> (arquivo JSON de origem, chave de ID, prefixo de ID para registros sem chave)
+ENTIDADES_REGISTRO = {
+    "vagas": ("vagas.json", "id_vaga", "vaga_anon"),
+    "candidatos": ("applicants.json", "infos_basicas_codigo_profissional", "anon_cand"),
+}
+# Prospects não têm ID único (um candidato aparece em várias vagas): ficam numa tabela própria,
+# indexada por candidato e por vaga
+ARQUIVO_PROSPECTS = "prospects.json"
+# Campos que identificam a mesma pessoa entre cadastros (tabela 'chaves', usada na deduplicação).
+# O CPF é guardado apenas como hash dos dígitos.
+CAMPOS_CHAVE = {
+    "candidatos": {
+        "email": ("infos_basicas_email", "informacoes_pessoais_email", "informacoes_pessoais_email_secundario"),
+        "cpf": ("informacoes_pessoais_cpf",),
+    },
+}
+# Primeiro ID gerado quando a entidade ainda não tem IDs numéricos
+ID_INICIAL = {"vagas": 5000, "candidatos": 10000}
+
+# Registros mantidos em memória (LRU) na frente da base, por processo
+TAMANHO_LRU = 2048
+# Limite de parâmetros por consulta IN (o SQLite aceita no mínimo 999)
+TAMANHO_LOTE_CONSULTA = 900
+# Intervalo (em segundos) entre exportações das entidades pendentes para os JSON pelo thread em segundo
+# plano (iniciar_exportacao). 0 desativa o thread; a exportação fica para o gerar_tudo ou para a linha de comando.
+INTERVALO_EXPORTACAO = float(os.environ.get("DECISION_INTERVALO_EXPORTACAO", "30"))
+
+_conexoes = {}
+_trava = threading.Lock()
+_thread_exportacao = None
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- CONEXÃO ---
+
+def conectar(caminho=None):
+    """
+    Retorna a conexão (única por processo) com a base de registros, criando as tabelas se necessário.
+    """
+    caminho = caminho or CAMINHO_BASE
+    with _trava:
+        conexao = _conexoes.get(caminho)
+        if conexao is None:
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+            conexao = sqlite3.connect(caminho, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            chaves_novas = conexao.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chaves'").fetchone() is None
+            for entidade in ENTIDADES_REGISTRO:
+                conexao.execute(f"CREATE TABLE IF NOT EXISTS {entidade} (id TEXT PRIMARY KEY, dados TEXT NOT NULL)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS prospects (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                            "prospect_codigo TEXT, id_vaga TEXT, dados TEXT NOT NULL)")
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_prospects_codigo ON prospects (prospect_codigo)")
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_prospects_vaga ON prospects (id_vaga)")
+            # Marca de qual versão do JSON cada tabela foi importada
+            conexao.execute("CREATE TABLE IF NOT EXISTS origem (entidade TEXT PRIMARY KEY, arquivo TEXT, mtime REAL, tamanho INTEGER)")
+            # Último ID numérico emitido por entidade
+            conexao.execute("CREATE TABLE IF NOT EXISTS sequencias (entidade TEXT PRIMARY KEY, ultimo INTEGER NOT NULL)")
+            # Entidades com gravações ainda não exportadas para o JSON
+            conexao.execute("CREATE TABLE IF NOT EXISTS exportacao (entidade TEXT PRIMARY KEY, pendente INTEGER NOT NULL)")
+            # Contador de alterações por entidade (versao_base): chave de cache de quem lê a base inteira
+            conexao.execute("CREATE TABLE IF NOT EXISTS alteracoes (entidade TEXT PRIMARY KEY, contador INTEGER NOT NULL)")
+            # Chaves exatas (email normalizado, hash do CPF) -> IDs que as usam
+            conexao.execute("CREATE TABLE IF NOT EXISTS chaves (entidade TEXT, chave TEXT, id TEXT, PRIMARY KEY (entidade, chave, id))")
+            conexao.execute("CREATE INDEX IF NOT EXISTS idx_chaves_id ON chaves (entidade, id)")
+            if chaves_novas:
+                # Base criada antes da tabela de chaves: preenche a partir dos registros já gravados
+                for entidade in CAMPOS_CHAVE:
+                    _indexar_chaves(conexao, entidade, ((item_id, json.loads(dados)) for item_id, dados in
+                                                        conexao.execute(f"SELECT id, dados FROM {entidade}").fetchall()))
+            conexao.commit()
+            _conexoes[caminho] = conexao
+        return conexao
+
+def _validar_entidade(entidade, aceita_prospects=False):
+    if entidade not in ENTIDADES_REGISTRO and not (aceita_prospects and entidade == "prospects"):
+        raise ValueError(f"Entidade desconhecida: {entidade}. Use uma de {list(ENTIDADES_REGISTRO)}.")
+
+# --- CHAVES EXATAS ---
+
+def _normalizar_chave(tipo, valor):
+    if not isinstance(valor, str) or not valor.strip():
+        return None
+    if tipo == "email":
+        valor = valor.strip().lower()
+        return f"email:{valor}" if "@" in valor else None
+    if tipo == "cpf":
+        digitos = re.sub(r"\D", "", valor)
+        if len(digitos) != 11 or len(set(digitos)) == 1:  # vazio, incompleto ou 000.000.000-00
+            return None
+        return f"cpf:{hashlib.sha1(digitos.encode('ascii')).hexdigest()}"
+    raise ValueError(f"Tipo de chave desconhecido: {tipo}")
+
+def chaves_registro(entidade, registro):
+    """Chaves exatas de um registro (ex.: {'email:fulano@x.com', 'cpf:<sha1>'}); vazio se a entidade não tiver chaves."""
+    chaves = set()
+    for tipo, campos in CAMPOS_CHAVE.get(entidade, {}).items():
+        for campo in campos:
+            chave = _normalizar_chave(tipo, (registro or {}).get(campo))
+            if chave:
+                chaves.add(chave)
+    return chaves
+
+def _indexar_chaves(conexao, entidade, registros):
+    """Grava as chaves de [(id, registro)] (a chamada é feita dentro da transação de quem grava os registros)."""
+    if entidade not in CAMPOS_CHAVE:
+        return
+    conexao.executemany("INSERT OR IGNORE INTO chaves (entidade, chave, id) VALUES (?, ?, ?)",
+                        ((entidade, chave, item_id) for item_id, registro in registros for chave in chaves_registro(entidade, registro)))
+
+# --- IMPORTAÇÃO DOS JSON ---
+
+def _registros_do_json(caminho_arquivo, id_key, default_prefix):
+    with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+        data_raw = json.load(f)
+    if isinstance(data_raw, list):
+        return [(str(item.get(id_key, f"{default_prefix}_{i}")), item) for i, item in enumerate(data_raw)]
+    if isinstance(data_raw, dict):
+        # Um único registro no nível raiz
+        return [(str(data_raw.get(id_key, f"{default_prefix}_0")), data_raw)]
+    logging.warning(f"Formato inesperado para {caminho_arquivo}. Esperado lista ou dicionário.")
+    return []
+
+def _id_numerico(item_id):
+    try:
+        return int(item_id)
+    except (TypeError, ValueError):
+        return None
+
+def _avancar_sequencia(conexao, entidade, ids):
+    """Garante que a sequência da entidade está à frente de todos os IDs numéricos informados."""
+    maior = max((n for n in map(_id_numerico, ids) if n is not None), default=None)
+    if maior is not None:
+        conexao.execute("INSERT INTO sequencias VALUES (?, ?) ON CONFLICT(entidade) DO UPDATE SET ultimo = MAX(ultimo, excluded.ultimo)",
+                        (entidade, maior))
+
+def _marcar_alteracao(conexao, entidade):
+    conexao.execute("INSERT INTO alteracoes VALUES (?, 1) ON CONFLICT(entidade) DO UPDATE SET contador = contador + 1", (entidade,))
+
+def _pendente(conexao, entidade):
+    linha = conexao.execute("SELECT pendente FROM exportacao WHERE entidade = ?", (entidade,)).fetchone()
+    return bool(linha and linha[0])
+
+def _registrar_origem(conexao, entidade, caminho_arquivo):
+    estado = os.stat(caminho_arquivo)
+    conexao.execute("INSERT OR REPLACE INTO origem VALUES (?, ?, ?, ?)", (entidade, caminho_arquivo, estado.st_mtime, estado.st_size))
+    conexao.execute("INSERT OR REPLACE INTO exportacao VALUES (?, 0)", (entidade,))
+
+def _importar_prospects(conexao, caminho_arquivo):
+    with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+        data_raw = json.load(f)
+    prospects = data_raw if isinstance(data_raw, list) else [data_raw]
+    conexao.execute("DELETE FROM prospects")
+    conexao.executemany("INSERT INTO prospects (prospect_codigo, id_vaga, dados) VALUES (?, ?, ?)",
+                        ((str(p.get("prospect_codigo")), str(p.get("id_vaga")), json.dumps(p, ensure_ascii=False)) for p in prospects))
+    return len(prospects)
+
+def _importar_entidade(conexao, entidade, caminho_arquivo):
+    _marcar_alteracao(conexao, entidade)
+    if entidade == "prospects":
+        return _importar_prospects(conexao, caminho_arquivo)
+    _, id_key, default_prefix = ENTIDADES_REGISTRO[entidade]
+    registros = _registros_do_json(caminho_arquivo, id_key, default_prefix)
+    conexao.execute(f"DELETE FROM {entidade}")
+    conexao.execute("DELETE FROM chaves WHERE entidade = ?", (entidade,))
+    # Em IDs repetidos prevalece o último registro, como no dicionário em memória
+    conexao.executemany(f"INSERT OR REPLACE INTO {entidade} (id, dados) VALUES (?, ?)",
+                        ((item_id, json.dumps(item, ensure_ascii=False)) for item_id, item in registros))
+    _indexar_chaves(conexao, entidade, dict(registros).items())
+    _avancar_sequencia(conexao, entidade, (item_id for item_id, _ in registros))
+    return len(registros)
+
+def sincronizar_base(data_dir=None, caminho=None):
+    """
+    Importa para a base cada JSON de origem que mudou desde a última importação/exportação
+    (comparando mtime e tamanho). Sem mudanças, custa apenas um stat por arquivo.
+    Se a entidade tiver gravações ainda não exportadas, a base prevalece e o JSON não é reimportado.
+
+    Returns:
+        dict: {entidade: "atualizada" | "inalterada" | "ausente" | "erro" | "conflito"}
+    """
+    data_dir = data_dir or DATA_DIR
+    conexao = conectar(caminho)
+    arquivos = {entidade: arquivo for entidade, (arquivo, _, _) in ENTIDADES_REGISTRO.items()}
+    arquivos["prospects"] = ARQUIVO_PROSPECTS
+    situacao = {}
+    for entidade, arquivo in arquivos.items():
+        caminho_arquivo = os.path.join(data_dir, arquivo)
+        if not os.path.exists(caminho_arquivo):
+            logging.warning(f"Arquivo não encontrado: {caminho_arquivo}")
+            situacao[entidade] = "ausente"
+            continue
+        estado = os.stat(caminho_arquivo)
+        registrado = conexao.execute("SELECT mtime, tamanho FROM origem WHERE entidade = ?", (entidade,)).fetchone()
+        if registrado == (estado.st_mtime, estado.st_size):
+            situacao[entidade] = "inalterada"
+            continue
+        if _pendente(conexao, entidade):
+            logging.warning(f"'{arquivo}' foi alterado fora da aplicação, mas a base tem cadastros de {entidade} ainda não "
+                            f"exportados. Mantendo a base; exporte-a (exportar_pendentes) para sobrescrever o JSON.")
+            situacao[entidade] = "conflito"
+            continue
+        try:
+            with _trava, conexao:
+                total = _importar_entidade(conexao, entidade, caminho_arquivo)
+                _registrar_origem(conexao, entidade, caminho_arquivo)
+            logging.info(f"{total} registros de '{arquivo}' importados para a base de {entidade}.")
+            situacao[entidade] = "atualizada"
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Erro ao importar {caminho_arquivo} para a base: {e}")
+            situacao[entidade] = "erro"
+    if "atualizada" in situacao.values():
+        limpar_cache()
+    return situacao
+
+# --- GRAVAÇÃO ---
+
+def reservar_ids(entidade, quantidade=1, caminho=None):
+    """
+    Reserva atomicamente os próximos 'quantidade' IDs numéricos da entidade (sequência persistida),
+    sem varrer os registros. Retorna a lista de IDs (int).
+    """
+    _validar_entidade(entidade)
+    conexao = conectar(caminho)
+    with _trava, conexao:
+        linha = conexao.execute("SELECT ultimo FROM sequencias WHERE entidade = ?", (entidade,)).fetchone()
+        ultimo = linha[0] if linha else ID_INICIAL[entidade] - 1
+        conexao.execute("INSERT OR REPLACE INTO sequencias VALUES (?, ?)", (entidade, ultimo + quantidade))
+    return list(range(ultimo + 1, ultimo + quantidade + 1))
+
+def inserir_registros(entidade, registros, caminho=None):
+    """
+    Insere novos registros em uma única transação (O(1) por registro, sem regravar o JSON).
+    Falha (sqlite3.IntegrityError) se algum ID já existir; nesse caso nada é gravado.
+    """
+    _validar_entidade(entidade, aceita_prospects=True)
+    conexao = conectar(caminho)
+    with _trava, conexao:
+        if entidade == "prospects":
+            conexao.executemany("INSERT INTO prospects (prospect_codigo, id_vaga, dados) VALUES (?, ?, ?)",
+                                ((str(p.get("prospect_codigo")), str(p.get("id_vaga")), json.dumps(p, ensure_ascii=False)) for p in registros))
+        else:
+            id_key = ENTIDADES_REGISTRO[entidade][1]
+            ids = [str(item[id_key]) for item in registros]
+            conexao.executemany(f"INSERT INTO {entidade} (id, dados) VALUES (?, ?)",
+                                ((item_id, json.dumps(item, ensure_ascii=False)) for item_id, item in zip(ids, registros)))
+            _avancar_sequencia(conexao, entidade, ids)
+            _indexar_chaves(conexao, entidade, zip(ids, registros))
+        conexao.execute("INSERT OR REPLACE INTO exportacao VALUES (?, 1)", (entidade,))
+        _marcar_alteracao(conexao, entidade)
+    limpar_cache()
+    logging.info(f"{len(registros)} registro(s) de {entidade} gravado(s) na base.")
+
+def atualizar_registro(entidade, item_id, registro, caminho=None):
+    """
+    Substitui os dados de um registro existente (ex.: mesclagem de um cadastro duplicado), mantendo o ID.
+    Falha (KeyError) se o ID não existir.
+    """
+    _validar_entidade(entidade)
+    item_id = str(item_id)
+    conexao = conectar(caminho)
+    with _trava, conexao:
+        cursor = conexao.execute(f"UPDATE {entidade} SET dados = ? WHERE id = ?", (json.dumps(registro, ensure_ascii=False), item_id))
+        if cursor.rowcount == 0:
+            raise KeyError(f"{entidade} {item_id} não encontrado na base.")
+        conexao.execute("DELETE FROM chaves WHERE entidade = ? AND id = ?", (entidade, item_id))
+        _indexar_chaves(conexao, entidade, [(item_id, registro)])
+        conexao.execute("INSERT OR REPLACE INTO exportacao VALUES (?, 1)", (entidade,))
+        _marcar_alteracao(conexao, entidade)
+    limpar_cache()
+    logging.info(f"Registro {item_id} de {entidade} atualizado na base.")
+
+# --- EXPORTAÇÃO PARA JSON ---
+
+def exportar_json(entidade, data_dir=None, caminho=None):
+    """
+    Regrava o JSON de uma entidade (lista, indent=4, como o cadastro fazia) a partir da base.
+    A escrita é feita em arquivo temporário e substitui o original de forma atômica.
+    """
+    _validar_entidade(entidade, aceita_prospects=True)
+    data_dir = data_dir or DATA_DIR
+    arquivo = ARQUIVO_PROSPECTS if entidade == "prospects" else ENTIDADES_REGISTRO[entidade][0]
+    caminho_arquivo = os.path.join(data_dir, arquivo)
+    ordem = "seq" if entidade == "prospects" else "rowid"
+    conexao = conectar(caminho)
+    os.makedirs(data_dir, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=data_dir, prefix=f".{arquivo}.", suffix=".tmp")
+    with _trava:
+        try:
+            with os.fdopen(descritor, "w", encoding="utf-8") as f:
+                f.write("[")
+                for i, (dados,) in enumerate(conexao.execute(f"SELECT dados FROM {entidade} ORDER BY {ordem}")):
+                    texto = json.dumps(json.loads(dados), indent=4, ensure_ascii=False)
+                    f.write(("," if i else "") + "\n    " + texto.replace("\n", "\n    "))
+                f.write("\n]")
+            os.replace(temporario, caminho_arquivo)
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        with conexao:
+            _registrar_origem(conexao, entidade, caminho_arquivo)
+    logging.info(f"Base de {entidade} exportada para {caminho_arquivo}.")
+
+def exportar_pendentes(data_dir=None, caminho=None):
+    """Exporta para JSON apenas as entidades com gravações ainda não exportadas. Retorna a lista exportada."""
+    conexao = conectar(caminho)
+    pendentes = [linha[0] for linha in conexao.execute("SELECT entidade FROM exportacao WHERE pendente = 1")]
+    for entidade in pendentes:
+        exportar_json(entidade, data_dir, caminho)
+    return pendentes
+
+# --- EXPORTAÇÃO EM SEGUNDO PLANO ---
+# As páginas só gravam na base; os JSON são regravados por um thread daemon a cada INTERVALO_EXPORTACAO
+# segundos e uma última vez no encerramento do processo, fora do caminho de renderização.
+
+def _laco_exportacao(intervalo, data_dir, caminho):
+    while True:
+        time.sleep(intervalo)
+        try:
+            exportar_pendentes(data_dir, caminho)
+        except Exception as e:
+            logging.error(f"Falha na exportação dos cadastros para JSON: {e}. Nova tentativa em {intervalo:g}s.")
+
+def _exportar_ao_encerrar(data_dir, caminho):
+    try:
+        exportar_pendentes(data_dir, caminho)
+    except Exception as e:
+        logging.error(f"Falha na exportação dos cadastros para JSON no encerramento: {e}")
+
+def iniciar_exportacao(data_dir=None, caminho=None, intervalo=INTERVALO_EXPORTACAO):
+    """
+    Sobe (uma única vez por processo) o thread daemon que exporta as entidades pendentes para os JSON
+    e agenda uma última exportação no encerramento (atexit). Retorna o thread, ou None se desativado (intervalo 0).
+    """
+    global _thread_exportacao
+    with _trava:
+        if _thread_exportacao is not None or not intervalo:
+            return _thread_exportacao
+        _thread_exportacao = threading.Thread(target=_laco_exportacao, args=(intervalo, data_dir, caminho),
+                                              name="exportacao-registros", daemon=True)
+    _thread_exportacao.start()
+    atexit.register(_exportar_ao_encerrar, data_dir, caminho)
+    logging.info(f"Exportação dos cadastros para JSON em segundo plano ativa (a cada {intervalo:g}s).")
+    return _thread_exportacao
+
+# --- CONSULTAS ---
+
+def versao_base(entidades=None, caminho=None):
+    """
+    Versão da base para as entidades informadas (padrão: vagas, candidatos e prospects): uma tupla
+    (entidade, contador de alterações) por entidade, que muda a cada gravação ou reimportação.
+    """
+    entidades = entidades or list(ENTIDADES_REGISTRO) + ["prospects"]
+    contadores = dict(conectar(caminho).execute("SELECT entidade, contador FROM alteracoes").fetchall())
+    return tuple((entidade, contadores.get(entidade, 0)) for entidade in entidades)
+
+@lru_cache(maxsize=TAMANHO_LRU)
+def _obter_registro_cache(entidade, item_id, caminho):
+    linha = conectar(caminho).execute(f"SELECT dados FROM {entidade} WHERE id = ?", (item_id,)).fetchone()
+    return json.loads(linha[0]) if linha else None
+
+def obter_registro(entidade, item_id, caminho=None):
+    """
+    Busca um registro pelo ID (com LRU em memória). Retorna o dicionário ou None.
+    O dicionário retornado é compartilhado pelo cache: não deve ser modificado.
+    """
+    _validar_entidade(entidade)
+    return _obter_registro_cache(entidade, str(item_id), caminho or CAMINHO_BASE)
+
+def obter_registros(entidade, ids, caminho=None):
+    """
+    Busca vários registros de uma vez. Retorna {id: registro} apenas com os IDs encontrados.
+    """
+    _validar_entidade(entidade)
+    caminho = caminho or CAMINHO_BASE
+    ids = list(dict.fromkeys(str(item_id) for item_id in ids))
+    conexao = conectar(caminho)
+    encontrados = {}
+    for inicio in range(0, len(ids), TAMANHO_LOTE_CONSULTA):
+        lote = ids[inicio:inicio + TAMANHO_LOTE_CONSULTA]
+        marcadores = ",".join("?" * len(lote))
+        for item_id, dados in conexao.execute(f"SELECT id, dados FROM {entidade} WHERE id IN ({marcadores})", lote):
+            encontrados[item_id] = json.loads(dados)
+    return encontrados
+
+def existentes(entidade, ids, caminho=None):
+    """Retorna o subconjunto de ids presentes na base, sem decodificar os registros."""
+    _validar_entidade(entidade)
+    ids = list(dict.fromkeys(str(item_id) for item_id in ids))
+    conexao = conectar(caminho)
+    presentes = set()
+    for inicio in range(0, len(ids), TAMANHO_LOTE_CONSULTA):
+        lote = ids[inicio:inicio + TAMANHO_LOTE_CONSULTA]
+        marcadores = ",".join("?" * len(lote))
+        presentes.update(linha[0] for linha in conexao.execute(f"SELECT id FROM {entidade} WHERE id IN ({marcadores})", lote))
+    return presentes
+
+def listar_ids(entidade, caminho=None):
+    """Lista os IDs de uma entidade na ordem de inserção."""
+    _validar_entidade(entidade)
+    return [linha[0] for linha in conectar(caminho).execute(f"SELECT id FROM {entidade} ORDER BY rowid")]
+
+def iterar_registros(entidade, caminho=None):
+    """
+    Percorre todos os registros de uma entidade na ordem de inserção, gerando (id, registro).
+    Lê em lotes pelo rowid, sem manter uma consulta aberta nem a tabela inteira em memória.
+    """
+    _validar_entidade(entidade)
+    conexao = conectar(caminho)
+    ultimo = 0
+    while True:
+        lote = conexao.execute(f"SELECT rowid, id, dados FROM {entidade} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                               (ultimo, TAMANHO_LOTE_CONSULTA)).fetchall()
+        if not lote:
+            return
+        for _, item_id, dados in lote:
+            yield item_id, json.loads(dados)
+        ultimo = lote[-1][0]
+
+def contar_registros(entidade, caminho=None):
+    _validar_entidade(entidade, aceita_prospects=True)
+    return conectar(caminho).execute(f"SELECT COUNT(*) FROM {entidade}").fetchone()[0]
+
+def listar_prospects(prospect_codigo=None, id_vaga=None, caminho=None):
+    """Lista prospects filtrando (via índice) por candidato e/ou vaga."""
+    condicoes, parametros = [], []
+    if prospect_codigo is not None:
+        condicoes.append("prospect_codigo = ?")
+        parametros.append(str(prospect_codigo))
+    if id_vaga is not None:
+        condicoes.append("id_vaga = ?")
+        parametros.append(str(id_vaga))
+    filtro = f" WHERE {' AND '.join(condicoes)}" if condicoes else ""
+    return [json.loads(linha[0]) for linha in conectar(caminho).execute(f"SELECT dados FROM prospects{filtro} ORDER BY seq", parametros)]
+
+def buscar_por_chaves(entidade, chaves, caminho=None):
+    """IDs que compartilham alguma das chaves exatas informadas. Retorna {id: [chaves em comum]}."""
+    _validar_entidade(entidade)
+    chaves = list(dict.fromkeys(chaves))
+    conexao = conectar(caminho)
+    encontrados = {}
+    for inicio in range(0, len(chaves), TAMANHO_LOTE_CONSULTA):
+        lote = chaves[inicio:inicio + TAMANHO_LOTE_CONSULTA]
+        marcadores = ",".join("?" * len(lote))
+        for item_id, chave in conexao.execute(f"SELECT id, chave FROM chaves WHERE entidade = ? AND chave IN ({marcadores})",
+                                              [entidade] + lote):
+            encontrados.setdefault(item_id, []).append(chave)
+    return encontrados
+
+def chaves_repetidas(entidade, caminho=None):
+    """Chaves exatas usadas por mais de um registro. Retorna {chave: [ids]}."""
+    _validar_entidade(entidade)
+    repetidas = {}
+    for chave, item_id in conectar(caminho).execute(
+            "SELECT chave, id FROM chaves WHERE entidade = ? AND chave IN "
+            "(SELECT chave FROM chaves WHERE entidade = ? GROUP BY chave HAVING COUNT(*) > 1) ORDER BY chave, rowid",
+            (entidade, entidade)):
+        repetidas.setdefault(chave, []).append(item_id)
+    return repetidas
+
+def limpar_cache():
+    """Descarta o LRU de registros (após reimportação ou gravação)."""
+    _obter_registro_cache.cache_clear()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manutenção da base de registros (SQLite) de vagas, candidatos e prospects.")
+    parser.add_argument("acao", choices=["importar", "exportar"],
+                        help="importar: carrega os JSON alterados para a base; exportar: regrava os JSON a partir da base.")
+    parser.add_argument("--todas", action="store_true", help="Com 'exportar', regrava todas as entidades e não só as pendentes.")
+    args = parser.parse_args()
+
+    if args.acao == "importar":
+        logging.info(f"Situação: {sincronizar_base()}")
+    elif args.todas:
+        for entidade in list(ENTIDADES_REGISTRO) + ["prospects"]:
+            exportar_json(entidade)
+    else:
+        logging.info(f"Entidades exportadas: {exportar_pendentes() or 'nenhuma'}")
@@ -0,0 +1,266 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import faiss
+
+from registro_indices import APELIDO_LEGADO, MODELO_LEGADO, descobrir_indices, carregar_vetores
+from versoes_dados import versao_indice
+from build_incremental import codificar_textos_unicos
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(BASE_DIR, '..', 'data'))
+
+# Candidatos mais próximos guardados por vaga. A busca recupera 5x o número de candidatos exibidos
+# (até 20 na interface) antes de ponderar pelo histórico, então 100 cobre qualquer consulta da tela.
+TAMANHO_LISTA = 100
+TAMANHO_LOTE_CODIFICACAO = 64
+
+_conexoes = {}
+# Reentrante: as atualizações seguram a trava do começo ao fim e ainda passam por conectar()
+_trava = threading.RLock()
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- TABELA ---
+# Uma base SQLite por modelo (models1/topk_{apelido}.sqlite) com, para cada vaga, o vetor da vaga e a lista
+# ordenada dos TAMANHO_LISTA candidatos mais próximos (IDs e distâncias L2). A tabela vale para uma versão
+# dos arquivos do índice de candidatos (versoes_dados.versao_indice), gravada em 'meta': se o índice mudar
+# por outro caminho que não o cadastro (ex.: novo build), a tabela é ignorada até ser materializada de novo.
+
+def caminho_tabela(apelido, model_dir=None):
+    return os.path.join(model_dir or MODEL_DIR, f"topk_{apelido}.sqlite")
+
+def conectar(caminho):
+    """Retorna a conexão (única por processo) com a tabela, criando-a se necessário."""
+    with _trava:
+        conexao = _conexoes.get(caminho)
+        if conexao is None:
+            conexao = sqlite3.connect(caminho, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("CREATE TABLE IF NOT EXISTS vagas (pos INTEGER PRIMARY KEY, id_vaga TEXT UNIQUE NOT NULL, vetor BLOB NOT NULL)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS topk (id_vaga TEXT PRIMARY KEY, ids TEXT NOT NULL, "
+                            "distancias BLOB NOT NULL, pior REAL NOT NULL, tamanho INTEGER NOT NULL)")
+            conexao.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+            conexao.commit()
+            _conexoes[caminho] = conexao
+        return conexao
+
+@contextmanager
+def _transacao(conexao):
+    """
+    Leitura, cálculo e gravação atômicos na tabela. As sessões do Streamlit compartilham a conexão, então a
+    trava impede que os comandos de dois cadastros se intercalem; o BEGIN IMMEDIATE protege contra outro
+    processo gravando a mesma base (ex.: materialização pela linha de comando).
+    """
+    with _trava:
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conexao.rollback()
+            raise
+        conexao.commit()
+
+def _versao_texto(versao):
+    return json.dumps(versao)
+
+def _ler_meta(conexao, chave):
+    linha = conexao.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+    return linha[0] if linha else None
+
+def _linha_topk(id_vaga, ids, distancias):
+    distancias = np.asarray(distancias, dtype=np.float32)
+    pior = float(distancias[-1]) if len(distancias) else float("inf")
+    return (str(id_vaga), json.dumps(list(ids)), distancias.tobytes(), pior, len(ids))
+
+def _indice_candidatos(info):
+    """Índice flat em memória com os vetores de candidatos (de um índice único ou de todas as partições) e seus IDs."""
+    vetores, ids = carregar_vetores(info)
+    if not ids:
+        return None, []
+    index = faiss.IndexFlatL2(vetores.shape[1])
+    index.add(vetores)
+    return index, ids
+
+def _vizinhos(index, ids_candidatos, consultas, tamanho_lista):
+    """Top-tamanho_lista candidatos (ids, distâncias L2 ao quadrado) para cada linha de consultas."""
+    distancias, posicoes = index.search(np.ascontiguousarray(consultas, dtype=np.float32), min(tamanho_lista, index.ntotal))
+    return [([ids_candidatos[i] for i in linha_pos if i >= 0], linha_dist[linha_pos >= 0])
+            for linha_dist, linha_pos in zip(distancias, posicoes)]
+
+# --- MATERIALIZAÇÃO OFFLINE ---
+
+def materializar(apelido, vagas, modelo, model_dir=None, modelos=None, tamanho_lista=TAMANHO_LISTA):
+    """
+    Recalcula a tabela inteira de um modelo: codifica o texto de cada vaga e guarda os candidatos mais próximos.
+
+    Args:
+        vagas (dict): {id_vaga: texto da vaga (extrair_texto_vaga)}.
+        modelo: Modelo de embedding do apelido (o mesmo usado nas buscas).
+    Returns:
+        int: Número de vagas materializadas.
+    """
+    model_dir = model_dir or MODEL_DIR
+    info = descobrir_indices(model_dir, modelos).get(apelido, {}).get("candidatos")
+    if info is None:
+        logging.warning(f"Índice de candidatos do modelo '{apelido}' não encontrado. Tabela não materializada.")
+        return 0
+    versao = versao_indice(info)
+    index, ids_candidatos = _indice_candidatos(info)
+    if index is None:
+        logging.warning(f"Índice de candidatos do modelo '{apelido}' vazio. Tabela não materializada.")
+        return 0
+
+    itens = [(str(id_vaga), texto) for id_vaga, texto in vagas.items() if texto]
+    # Vagas reimportadas costumam repetir o mesmo texto: cada texto distinto é codificado uma vez
+    cache_vetores = {}
+    conexao = conectar(caminho_tabela(apelido, model_dir))
+    with conexao:
+        conexao.execute("DELETE FROM vagas")
+        conexao.execute("DELETE FROM topk")
+        for inicio in range(0, len(itens), TAMANHO_LOTE_CODIFICACAO):
+            lote = itens[inicio:inicio + TAMANHO_LOTE_CODIFICACAO]
+            consultas, _ = codificar_textos_unicos(modelo, [texto for _, texto in lote], cache_vetores)
+            vizinhos = _vizinhos(index, ids_candidatos, consultas, tamanho_lista)
+            conexao.executemany("INSERT INTO vagas (pos, id_vaga, vetor) VALUES (?, ?, ?)",
+                                [(inicio + i, id_vaga, consultas[i].tobytes()) for i, (id_vaga, _) in enumerate(lote)])
+            conexao.executemany("INSERT INTO topk VALUES (?, ?, ?, ?, ?)",
+                                [_linha_topk(id_vaga, ids, distancias) for (id_vaga, _), (ids, distancias) in zip(lote, vizinhos)])
+        conexao.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+            ("versao_indice", _versao_texto(versao)),
+            ("modelo", info.get("modelo") or ""),
+            ("tamanho_lista", str(tamanho_lista)),
+            ("gerado_em", datetime.now().isoformat(timespec="seconds")),
+        ])
+    logging.info(f"Tabela top-{tamanho_lista} do modelo '{apelido}' materializada para {len(itens)} vagas.")
+    return len(itens)
+
+# --- CONSULTA ---
+
+def consultar(apelido, id_vaga, quantidade, versao_atual, model_dir=None):
+    """
+    Os 'quantidade' candidatos mais próximos de uma vaga, em ordem crescente de distância: [(id, distância)].
+    Retorna None se não houver tabela, se a vaga não estiver nela, se 'quantidade' exceder a lista guardada
+    ou se a tabela foi calculada para outra versão do índice de candidatos.
+    """
+    caminho = caminho_tabela(apelido, model_dir)
+    if not os.path.exists(caminho):
+        return None
+    conexao = conectar(caminho)
+    with _trava:
+        if _ler_meta(conexao, "versao_indice") != _versao_texto(versao_atual):
+            return None
+        if quantidade > int(_ler_meta(conexao, "tamanho_lista") or 0):
+            return None
+        linha = conexao.execute("SELECT ids, distancias, tamanho FROM topk WHERE id_vaga = ?", (str(id_vaga),)).fetchone()
+    if linha is None:
+        return None
+    ids = json.loads(linha[0])[:quantidade]
+    distancias = np.frombuffer(linha[1], dtype=np.float32)[:quantidade]
+    return [(id_candidato, float(distancia)) for id_candidato, distancia in zip(ids, distancias)]
+
+# --- ATUALIZAÇÃO INCREMENTAL ---
+
+def inserir_candidato(apelido, id_candidato, vetor, versao_anterior, versao_nova, model_dir=None):
+    """
+    Atualiza a tabela com um candidato recém-adicionado ao índice: a distância do candidato a todas as vagas
+    sai de um único produto matricial e ele só entra nas listas em que supera o pior candidato guardado.
+
+    versao_anterior/versao_nova são as versões do índice antes e depois da gravação do candidato; se a tabela
+    não correspondia à versão anterior ela já estava desatualizada e não é alterada.
+    Returns:
+        int: Número de listas de vagas em que o candidato entrou.
+    """
+    caminho = caminho_tabela(apelido, model_dir)
+    if not os.path.exists(caminho):
+        return 0
+    conexao = conectar(caminho)
+    with _transacao(conexao):
+        if _ler_meta(conexao, "versao_indice") != _versao_texto(versao_anterior):
+            logging.info(f"Tabela top-K do modelo '{apelido}' desatualizada; candidato {id_candidato} não inserido (rematerialize).")
+            return 0
+
+        linhas = conexao.execute("SELECT v.id_vaga, v.vetor, t.pior, t.tamanho FROM vagas v JOIN topk t ON t.id_vaga = v.id_vaga ORDER BY v.pos").fetchall()
+        tamanho_lista = int(_ler_meta(conexao, "tamanho_lista") or TAMANHO_LISTA)
+        atualizadas = []
+        if linhas:
+            vetor = np.asarray(vetor, dtype=np.float32)
+            vetores_vagas = np.vstack([np.frombuffer(linha[1], dtype=np.float32) for linha in linhas])
+            distancias = np.maximum((vetores_vagas ** 2).sum(axis=1) - 2 * (vetores_vagas @ vetor) + float(vetor @ vetor), 0)
+            piores = np.array([linha[2] for linha in linhas])
+            tamanhos = np.array([linha[3] for linha in linhas])
+            for posicao in np.flatnonzero((distancias < piores) | (tamanhos < tamanho_lista)):
+                id_vaga = linhas[posicao][0]
+                ids_linha, distancias_linha = conexao.execute("SELECT ids, distancias FROM topk WHERE id_vaga = ?", (id_vaga,)).fetchone()
+                ids = json.loads(ids_linha)
+                lista = np.frombuffer(distancias_linha, dtype=np.float32)
+                entrada = int(np.searchsorted(lista, distancias[posicao], side="right"))
+                ids.insert(entrada, str(id_candidato))
+                lista = np.insert(lista, entrada, distancias[posicao])
+                atualizadas.append(_linha_topk(id_vaga, ids[:tamanho_lista], lista[:tamanho_lista]))
+
+        conexao.executemany("INSERT OR REPLACE INTO topk VALUES (?, ?, ?, ?, ?)", atualizadas)
+        conexao.execute("INSERT OR REPLACE INTO meta VALUES ('versao_indice', ?)", (_versao_texto(versao_nova),))
+    logging.info(f"Candidato {id_candidato} inserido em {len(atualizadas)} listas da tabela top-K do modelo '{apelido}'.")
+    return len(atualizadas)
+
+def inserir_vaga(apelido, id_vaga, vetor, model_dir=None, modelos=None):
+    """
+    Materializa a lista de uma vaga recém-cadastrada (o vetor é o mesmo embedding usado na busca).
+    Retorna True se a vaga entrou na tabela.
+    """
+    model_dir = model_dir or MODEL_DIR
+    caminho = caminho_tabela(apelido, model_dir)
+    if not os.path.exists(caminho):
+        return False
+    conexao = conectar(caminho)
+    info = descobrir_indices(model_dir, modelos).get(apelido, {}).get("candidatos")
+    if info is None:
+        return False
+    versao = _versao_texto(versao_indice(info))
+    with _trava:
+        if _ler_meta(conexao, "versao_indice") != versao:
+            return False
+        tamanho_lista = int(_ler_meta(conexao, "tamanho_lista") or TAMANHO_LISTA)
+    # A busca no índice de candidatos (a parte cara) fica fora da trava; a versão é conferida de novo antes de gravar
+    index, ids_candidatos = _indice_candidatos(info)
+    if index is None:
+        return False
+    consulta = np.asarray(vetor, dtype=np.float32)[None, :]
+    (ids, distancias), = _vizinhos(index, ids_candidatos, consulta, tamanho_lista)
+    with _transacao(conexao):
+        if _ler_meta(conexao, "versao_indice") != versao:
+            return False
+        posicao = conexao.execute("SELECT COALESCE(MAX(pos), -1) + 1 FROM vagas").fetchone()[0]
+        conexao.execute("DELETE FROM vagas WHERE id_vaga = ?", (str(id_vaga),))
+        conexao.execute("INSERT INTO vagas (pos, id_vaga, vetor) VALUES (?, ?, ?)", (posicao, str(id_vaga), consulta[0].tobytes()))
+        conexao.execute("INSERT OR REPLACE INTO topk VALUES (?, ?, ?, ?, ?)", _linha_topk(id_vaga, ids, distancias))
+    return True
+
+if __name__ == "__main__":
+    import argparse
+    from gerar_tudo import EMBEDDING_MODELS, extrair_texto_vaga
+    from backend_inferencia import carregar_modelo
+    from repositorio_registros import sincronizar_base, listar_ids, obter_registros
+
+    parser = argparse.ArgumentParser(description="Materializa a tabela top-K de candidatos por vaga.")
+    parser.add_argument("--modelos", nargs="*", default=[APELIDO_LEGADO],
+                        help="Apelidos dos modelos (padrão: legado, o índice atualizado pelo cadastro).")
+    parser.add_argument("--tamanho-lista", type=int, default=TAMANHO_LISTA)
+    args = parser.parse_args()
+
+    caminho_registros = os.path.join(DATA_DIR, "registros.sqlite")
+    sincronizar_base(DATA_DIR, caminho_registros)
+    registros = obter_registros("vagas", listar_ids("vagas", caminho_registros), caminho_registros)
+    textos = {id_vaga: extrair_texto_vaga(vaga) for id_vaga, vaga in registros.items()}
+    for apelido in args.modelos:
+        modelo = carregar_modelo(MODELO_LEGADO if apelido == APELIDO_LEGADO else EMBEDDING_MODELS[apelido])
+        materializar(apelido, textos, modelo, modelos=EMBEDDING_MODELS, tamanho_lista=args.tamanho_lista)
@@ -0,0 +1,78 @@
+import os
+import glob
+import logging
+import threading
+
+# --- CONFIGURAÇÃO ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("DECISION_DATA_DIR", os.path.join(BASE_DIR, '..', 'data'))
+MODEL_DIR = os.environ.get("DECISION_MODEL_DIR", os.path.join(BASE_DIR, '..', 'models1'))
+
+ARQUIVOS_DADOS = {
+    "vagas": "vagas.json",
+    "candidatos": "applicants.json",
+    "prospects": "prospects.json",
+}
+# Arquivos de models1/ que compõem os índices (legados e do gerar_tudo) e seus manifestos.
+# Nos pares particionados só o particionamento.json entra: ele é regravado a cada build e cada partição
+# tem a sua própria versão (recarregada sozinha)
+PADROES_MODELOS = ("*.faiss", "*.index", "*.pkl", "manifesto_*.json", os.path.join("particoes_*", "particionamento.json"))
+
+_ultimas_versoes = {}
+_trava = threading.Lock()
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- VERSÕES ---
+# Uma versão é uma tupla imutável (nome, mtime_ns, tamanho) por arquivo: muda sempre que o arquivo
+# é regravado e serve de chave para os caches do Streamlit (st.cache_data / st.cache_resource),
+# de modo que só o recurso alterado é recarregado.
+
+def versao_arquivo(caminho):
+    """Retorna (nome, mtime_ns, tamanho) do arquivo, ou (nome, None, None) se ele não existir."""
+    try:
+        estado = os.stat(caminho)
+        return (os.path.basename(caminho), estado.st_mtime_ns, estado.st_size)
+    except FileNotFoundError:
+        return (os.path.basename(caminho), None, None)
+
+def versao_arquivos(caminhos):
+    return tuple(versao_arquivo(caminho) for caminho in caminhos)
+
+def versao_dados(entidades=None, data_dir=None):
+    """
+    Versão dos JSON de dados das entidades informadas (padrão: vagas, candidatos e prospects).
+    """
+    data_dir = data_dir or DATA_DIR
+    entidades = entidades or list(ARQUIVOS_DADOS)
+    return versao_arquivos(os.path.join(data_dir, ARQUIVOS_DADOS[entidade]) for entidade in entidades)
+
+def versao_indice(caminhos):
+    """
+    Versão de um conjunto de índice (dict com 'index', 'metadados' e opcionalmente 'manifesto' ou
+    'particionamento', como retornado por registro_indices.caminhos_indice, pelas entradas de
+    descobrir_indices ou pelas partições de uma entrada particionada).
+    """
+    return versao_arquivos(caminhos[chave] for chave in ("index", "metadados", "manifesto", "particionamento") if chave in caminhos)
+
+def versao_modelos(model_dir=None):
+    """
+    Versão do conjunto de arquivos de índice em models1/ (muda quando um índice é criado, regravado ou removido).
+    """
+    model_dir = model_dir or MODEL_DIR
+    caminhos = sorted({caminho for padrao in PADROES_MODELOS for caminho in glob.glob(os.path.join(model_dir, padrao))})
+    return versao_arquivos(caminhos)
+
+def registrar_versao(recurso, versao):
+    """
+    Anota a versão vista de um recurso e registra no log quando ela muda desde a última observação.
+    Retorna True se a versão mudou (ou se é a primeira vez que o recurso é observado).
+    """
+    with _trava:
+        anterior = _ultimas_versoes.get(recurso)
+        _ultimas_versoes[recurso] = versao
+    if anterior is not None and anterior != versao:
+        alterados = sorted({nome for nome, *_ in set(versao) ^ set(anterior)})
+        logging.info(f"Recurso '{recurso}' alterado ({', '.join(alterados)}); recarregando apenas este recurso.")
+    return anterior != versao
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# Os módulos de embeddings/ são importados pelo nome (mesmo sys.path das páginas do app)
+embeddings_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'embeddings'))
+if embeddings_path not in sys.path:
+    sys.path.insert(0, embeddings_path)
+
+# Diretórios padrão fora do repositório: nenhum teste grava em models1/ ou data/
+_temporario = tempfile.mkdtemp(prefix="decision_testes_")
+os.environ.setdefault("DECISION_MODEL_DIR", os.path.join(_temporario, "models"))
+os.environ.setdefault("DECISION_DATA_DIR", os.path.join(_temporario, "data"))
+os.environ.setdefault("DECISION_PORTA_METRICAS", "0")
@@ -0,0 +1,74 @@
+import threading
+
+import faiss
+import numpy as np
+import pandas as pd
+import pytest
+
+from agrupamento import agrupar, atribuir_novo, caminhos_pools, carregar_pools, ler_manifesto_pools
+from registro_indices import APELIDO_LEGADO, caminhos_indice
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """Índice legado de candidatos com 40 vetores, já agrupado em 4 pools."""
+    vetores = np.random.default_rng(0).standard_normal((40, 8)).astype(np.float32)
+    index = faiss.IndexFlatL2(8)
+    index.add(vetores)
+    caminhos = caminhos_indice(APELIDO_LEGADO, "candidatos", str(tmp_path))
+    faiss.write_index(index, caminhos["index"])
+    pd.DataFrame({"id_original": [str(i) for i in range(40)], "faiss_id": np.arange(40)}).to_pickle(caminhos["metadados"])
+    agrupar(APELIDO_LEGADO, "candidatos", 4, model_dir=str(tmp_path))
+    return str(tmp_path)
+
+
+def test_atribuicoes_novas_entram_no_fim(model_dir):
+    vetor = np.ones(8, dtype=np.float32)
+    pool = atribuir_novo(APELIDO_LEGADO, "candidatos", "novo", vetor, model_dir)
+    pools = carregar_pools(APELIDO_LEGADO, "candidatos", model_dir)
+    atribuicoes = pools["atribuicoes"]
+    assert len(atribuicoes) == 41
+    assert atribuicoes["id_original"].iloc[-1] == "novo"
+    assert atribuicoes["pool"].iloc[-1] == pool
+    distancia = ((pools["centroides"][pool] - vetor) ** 2).sum()
+    assert atribuicoes["distancia"].iloc[-1] == pytest.approx(distancia)
+    manifesto = pools["manifesto"]
+    assert manifesto["vetores"] == 41
+    assert sum(manifesto["tamanhos"].values()) == 41
+
+
+def test_cadastros_concorrentes_nao_perdem_atribuicoes(model_dir):
+    vetores = np.random.default_rng(1).standard_normal((16, 8)).astype(np.float32)
+    threads = [threading.Thread(target=atribuir_novo, args=(APELIDO_LEGADO, "candidatos", f"n{i}", vetores[i], model_dir))
+               for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    atribuicoes = carregar_pools(APELIDO_LEGADO, "candidatos", model_dir)["atribuicoes"]
+    assert len(atribuicoes) == 56
+    assert set(atribuicoes["id_original"].iloc[40:]) == {f"n{i}" for i in range(16)}
+    assert ler_manifesto_pools(APELIDO_LEGADO, "candidatos", model_dir)["vetores"] == 56
+
+
+def test_acrescimo_interrompido_e_descartado(model_dir):
+    atribuir_novo(APELIDO_LEGADO, "candidatos", "a", np.zeros(8, dtype=np.float32), model_dir)
+    # Linha gravada sem o manifesto correspondente (processo interrompido no meio do cadastro)
+    with open(caminhos_pools(APELIDO_LEGADO, "candidatos", model_dir)["novos"], 'ab') as f:
+        f.write(b"perdido\t0\t1.")
+    assert carregar_pools(APELIDO_LEGADO, "candidatos", model_dir)["atribuicoes"]["id_original"].iloc[-1] == "a"
+    atribuir_novo(APELIDO_LEGADO, "candidatos", "b", np.zeros(8, dtype=np.float32), model_dir)
+    ids = carregar_pools(APELIDO_LEGADO, "candidatos", model_dir)["atribuicoes"]["id_original"].tolist()
+    assert ids[40:] == ["a", "b"]
+
+
+def test_reagrupar_absorve_atribuicoes_novas(model_dir):
+    atribuir_novo(APELIDO_LEGADO, "candidatos", "a", np.zeros(8, dtype=np.float32), model_dir)
+    agrupar(APELIDO_LEGADO, "candidatos", 4, model_dir=model_dir)
+    pools = carregar_pools(APELIDO_LEGADO, "candidatos", model_dir)
+    assert len(pools["atribuicoes"]) == 40
+    assert pools["manifesto"]["bytes_novos"] == 0
+
+
+def test_sem_agrupamento(tmp_path):
+    assert atribuir_novo(APELIDO_LEGADO, "candidatos", "a", np.zeros(8, dtype=np.float32), str(tmp_path)) is None
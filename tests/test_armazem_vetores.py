@@ -0,0 +1,158 @@
+import json
+
+import faiss
+import numpy as np
+import pandas as pd
+import pytest
+
+from armazem_vetores import (abrir_armazem, acompanhar_indice, anexar_armazem, caminhos_armazem, gravar_armazem,
+                             ler_cabecalho, vetores_por_id)
+
+DIMENSAO = 8
+
+
+def _vetores(quantidade, seed=0):
+    return np.random.default_rng(seed).standard_normal((quantidade, DIMENSAO)).astype(np.float32)
+
+
+def _conferir(armazem, vetores, ids, hashes):
+    np.testing.assert_array_equal(np.asarray(armazem["vetores"]), vetores)
+    assert armazem["ids"] == ids
+    assert armazem["hashes"] == hashes
+
+
+def test_gravar_e_abrir(tmp_path):
+    vetores = _vetores(5)
+    gravar_armazem("original", "vagas", "modelo", vetores, list("abcde"), [f"h{i}" for i in range(5)], str(tmp_path), "onnx")
+    armazem = abrir_armazem("original", "vagas", str(tmp_path))
+    _conferir(armazem, vetores, list("abcde"), [f"h{i}" for i in range(5)])
+    assert armazem["cabecalho"]["backend"] == "onnx" and armazem["cabecalho"]["dimensao"] == DIMENSAO
+
+
+def test_anexar_sem_armazem_cria(tmp_path):
+    vetores = _vetores(2)
+    anexar_armazem("original", "vagas", "modelo", vetores, ["a", "b"], ["h1", "h2"], str(tmp_path))
+    _conferir(abrir_armazem("original", "vagas", str(tmp_path)), vetores, ["a", "b"], ["h1", "h2"])
+
+
+def test_anexar_descarta_acrescimo_interrompido(tmp_path):
+    model_dir = str(tmp_path)
+    vetores = _vetores(4)
+    gravar_armazem("original", "vagas", "modelo", vetores[:3], ["a", "b", "c"], ["h1", "h2", "h3"], model_dir)
+    # Processo interrompido depois de gravar parte do vetor e do ID, antes do cabeçalho
+    caminhos = caminhos_armazem("original", "vagas", model_dir)
+    with open(caminhos["vetores"], 'ab') as f:
+        f.write(_vetores(1, seed=9).tobytes()[:13])
+    with open(caminhos["ids"], 'ab') as f:
+        f.write(b"perdido\th")
+    _conferir(abrir_armazem("original", "vagas", model_dir), vetores[:3], ["a", "b", "c"], ["h1", "h2", "h3"])
+
+    anexar_armazem("original", "vagas", "modelo", vetores[3], ["d"], ["h4"], model_dir)
+    _conferir(abrir_armazem("original", "vagas", model_dir), vetores, ["a", "b", "c", "d"], ["h1", "h2", "h3", "h4"])
+    assert ler_cabecalho("original", "vagas", model_dir)["linhas"] == 4
+
+
+def test_anexar_de_outro_modelo_ou_backend_falha(tmp_path):
+    gravar_armazem("original", "vagas", "modelo", _vetores(2), ["a", "b"], model_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        anexar_armazem("original", "vagas", "outro", _vetores(1), ["c"], model_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        anexar_armazem("original", "vagas", "modelo", _vetores(1), ["c"], model_dir=str(tmp_path), backend="onnx_int8")
+    assert ler_cabecalho("original", "vagas", str(tmp_path))["linhas"] == 2
+
+
+def _cadastrar(index, metadados, vetor, item_id):
+    """Mesma sequência das páginas de cadastro: adiciona ao índice e aos metadados, depois ao armazém."""
+    index.add(vetor.reshape(1, -1))
+    return pd.concat([metadados, pd.DataFrame([{"id_original": item_id, "faiss_id": index.ntotal - 1}])], ignore_index=True)
+
+
+def test_acompanhar_indice_semeia_e_acrescenta(tmp_path):
+    model_dir = str(tmp_path)
+    vetores = _vetores(6)
+    index = faiss.IndexFlatL2(DIMENSAO)
+    index.add(vetores[:3])
+    metadados = pd.DataFrame({"id_original": ["a", "b", "c"], "faiss_id": [0, 1, 2]})
+
+    # Sem armazém: semeado com os vetores já no índice (sem hash) e o novo vetor (com hash)
+    metadados = _cadastrar(index, metadados, vetores[3], "d")
+    acompanhar_indice("legado", "candidatos", "modelo", index, metadados["id_original"], vetores[3], ["d"], model_dir, hashes_novos=["h4"])
+    _conferir(abrir_armazem("legado", "candidatos", model_dir), vetores[:4], ["a", "b", "c", "d"], [None, None, None, "h4"])
+
+    # Armazém alinhado: só acrescenta
+    for i, item_id in ((4, "e"), (5, "f")):
+        metadados = _cadastrar(index, metadados, vetores[i], item_id)
+        acompanhar_indice("legado", "candidatos", "modelo", index, metadados["id_original"], vetores[i], [item_id], model_dir,
+                          hashes_novos=[f"h{i + 1}"])
+    armazem = abrir_armazem("legado", "candidatos", model_dir)
+    _conferir(armazem, vetores, list("abcdef"), [None, None, None, "h4", "h5", "h6"])
+    assert armazem["ids"] == metadados["id_original"].tolist()
+    np.testing.assert_array_equal(np.asarray(armazem["vetores"]), index.reconstruct_n(0, index.ntotal))
+
+
+def test_acompanhar_indice_ressemeia_armazem_desalinhado(tmp_path):
+    model_dir = str(tmp_path)
+    vetores = _vetores(4)
+    index = faiss.IndexFlatL2(DIMENSAO)
+    index.add(vetores[:3])
+    # Armazém com uma linha a menos que o índice (ex.: cadastro feito antes de o armazém existir)
+    gravar_armazem("legado", "candidatos", "modelo", vetores[:2], ["a", "b"], ["h1", "h2"], model_dir)
+    metadados = _cadastrar(index, pd.DataFrame({"id_original": ["a", "b", "c"], "faiss_id": [0, 1, 2]}), vetores[3], "d")
+    acompanhar_indice("legado", "candidatos", "modelo", index, metadados["id_original"], vetores[3], ["d"], model_dir, hashes_novos=["h4"])
+    _conferir(abrir_armazem("legado", "candidatos", model_dir), vetores, ["a", "b", "c", "d"], [None, None, None, "h4"])
+
+
+def test_acompanhar_indice_de_outro_backend_ressemeia(tmp_path):
+    model_dir = str(tmp_path)
+    vetores = _vetores(2)
+    gravar_armazem("legado", "candidatos", "modelo", vetores[:1], ["a"], ["h1"], model_dir, backend="torch")
+    index = faiss.IndexFlatL2(DIMENSAO)
+    index.add(vetores)
+    acompanhar_indice("legado", "candidatos", "modelo", index, ["a", "b"], vetores[1], ["b"], model_dir, backend="onnx", hashes_novos=["h2"])
+    armazem = abrir_armazem("legado", "candidatos", model_dir)
+    assert armazem["cabecalho"]["backend"] == "onnx"
+    _conferir(armazem, vetores, ["a", "b"], [None, "h2"])
+
+
+def test_vetores_por_id(tmp_path):
+    model_dir = str(tmp_path)
+    vetores = _vetores(2)
+    gravar_armazem("original", "vagas", "modelo", vetores, ["a", "b"], ["h1", "h2"], model_dir)
+    por_id = vetores_por_id("original", "vagas", "modelo", model_dir)
+    assert set(por_id) == {"a", "b"}
+    assert por_id["b"][0] == "h2"
+    np.testing.assert_array_equal(por_id["b"][1], vetores[1])
+    assert vetores_por_id("original", "vagas", "outro", model_dir) == {}
+    assert vetores_por_id("original", "vagas", "modelo", model_dir, backend="onnx") == {}
+    # Linhas sem hash (semeadas do índice) não servem ao build incremental
+    gravar_armazem("original", "vagas", "modelo", vetores, ["a", "b"], ["h1", None], model_dir)
+    assert vetores_por_id("original", "vagas", "modelo", model_dir) == {}
+
+
+@pytest.mark.parametrize("apelido", ["original", "legado"])
+@pytest.mark.parametrize("tipo_indice", ["flat", "sq8"])
+def test_reconstruir_indice(tmp_path, apelido, tipo_indice):
+    pytest.importorskip("sentence_transformers")  # reconstruir_indice usa montar_index do gerar_tudo
+    from armazem_vetores import reconstruir_indice
+    from registro_indices import caminhos_indice
+
+    model_dir = str(tmp_path)
+    vetores = _vetores(50)
+    ids = [str(i) for i in range(50)]
+    gravar_armazem(apelido, "candidatos", "modelo", vetores, ids, [f"h{i}" for i in range(50)], model_dir, "onnx_int8")
+    reconstruir_indice(apelido, "candidatos", tipo_indice, model_dir)
+
+    caminhos = caminhos_indice(apelido, "candidatos", model_dir)
+    index = faiss.read_index(caminhos["index"])
+    metadados = pd.read_pickle(caminhos["metadados"])
+    assert index.ntotal == 50 and metadados["id_original"].tolist() == ids
+    reconstruidos = index.reconstruct_n(0, index.ntotal)
+    if tipo_indice == "flat":
+        np.testing.assert_array_equal(reconstruidos, vetores)
+    else:
+        np.testing.assert_allclose(reconstruidos, vetores, atol=0.1)
+    with open(caminhos["manifesto"], 'r', encoding='utf-8') as f:
+        manifesto = json.load(f)
+    assert manifesto["backend"] == "onnx_int8" and manifesto["tipo_indice"] == tipo_indice
+    # O armazém continua utilizável pelo build incremental depois da reconstrução
+    assert set(vetores_por_id(apelido, "candidatos", "modelo", model_dir, "onnx_int8")) == set(ids)
@@ -0,0 +1,45 @@
+import faiss
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")  # gerar_tudo (montar_index) carrega o backend de inferência
+
+from armazem_vetores import gravar_armazem
+from benchmark_quantizacao import benchmark_arquivos, vetores_de_referencia
+from gerar_tudo import montar_index
+from registro_indices import caminhos_indice
+
+
+@pytest.fixture
+def vetores():
+    return np.random.default_rng(0).standard_normal((200, 16)).astype(np.float32)
+
+
+def _gravar_indice(model_dir, vetores, tipo):
+    caminho = caminhos_indice("original", "candidatos", model_dir)["index"]
+    faiss.write_index(montar_index(vetores, tipo), caminho)
+    return caminho
+
+
+def test_indice_flat_usa_os_proprios_vetores(tmp_path, vetores):
+    caminho = _gravar_indice(str(tmp_path), vetores, "flat")
+    np.testing.assert_array_equal(vetores_de_referencia(caminho, faiss.read_index(caminho)), vetores)
+
+
+def test_indice_quantizado_usa_o_armazem(tmp_path, vetores):
+    caminho = _gravar_indice(str(tmp_path), vetores, "sq8")
+    gravar_armazem("original", "candidatos", "modelo", vetores, [str(i) for i in range(len(vetores))], model_dir=str(tmp_path))
+    referencia = vetores_de_referencia(caminho, faiss.read_index(caminho))
+    np.testing.assert_array_equal(referencia, vetores)
+
+
+def test_indice_quantizado_sem_armazem_e_ignorado(tmp_path, vetores):
+    caminho = _gravar_indice(str(tmp_path), vetores, "sq8")
+    assert vetores_de_referencia(caminho, faiss.read_index(caminho)) is None
+    assert benchmark_arquivos([caminho], num_consultas=20) == {}
+
+
+def test_armazem_desalinhado_nao_e_usado(tmp_path, vetores):
+    caminho = _gravar_indice(str(tmp_path), vetores, "fp16")
+    gravar_armazem("original", "candidatos", "modelo", vetores[:10], [str(i) for i in range(10)], model_dir=str(tmp_path))
+    assert vetores_de_referencia(caminho, faiss.read_index(caminho)) is None
@@ -0,0 +1,56 @@
+import numpy as np
+
+from build_incremental import codificar_textos_unicos, hash_texto
+
+
+class ModeloFalso:
+    """Modelo de embedding determinístico que registra os textos codificados."""
+
+    def __init__(self, dim=4):
+        self.dim = dim
+        self.codificados = []
+
+    def encode(self, textos, **kwargs):
+        self.codificados.extend(textos)
+        return np.array([[len(texto)] + [float(ord(c)) for c in texto[:self.dim - 1].ljust(self.dim - 1)] for texto in textos])
+
+
+def test_textos_repetidos_codificados_uma_vez():
+    modelo = ModeloFalso()
+    vetores, codificados = codificar_textos_unicos(modelo, ["abc", "abc ", "xyz", "abc"])
+    assert codificados == 2
+    assert modelo.codificados == ["abc", "xyz"]
+    assert vetores.dtype == np.float32 and vetores.shape == (4, 4)
+    np.testing.assert_array_equal(vetores[0], vetores[1])
+    np.testing.assert_array_equal(vetores[0], vetores[3])
+
+
+def test_cache_compartilhado_entre_chamadas():
+    modelo = ModeloFalso()
+    cache = {}
+    codificar_textos_unicos(modelo, ["abc"], cache)
+    _, codificados = codificar_textos_unicos(modelo, ["abc", "def"], cache)
+    assert codificados == 1
+    assert modelo.codificados == ["abc", "def"]
+    assert set(cache) == {hash_texto("abc"), hash_texto("def")}
+
+
+def test_textos_vazios_nao_sao_codificados():
+    modelo = ModeloFalso()
+    vetores, codificados = codificar_textos_unicos(modelo, ["abc", None, "", "abc"])
+    assert codificados == 1
+    assert modelo.codificados == ["abc"]
+    assert vetores[1] is None and vetores[2] is None
+    np.testing.assert_array_equal(vetores[0], vetores[3])
+
+
+def test_so_textos_vazios():
+    modelo = ModeloFalso()
+    vetores, codificados = codificar_textos_unicos(modelo, [None])
+    assert vetores == [None] and codificados == 0
+    assert modelo.codificados == []
+
+
+def test_lista_vazia():
+    vetores, codificados = codificar_textos_unicos(ModeloFalso(), [])
+    assert vetores.shape == (0, 0) and codificados == 0
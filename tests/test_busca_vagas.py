@@ -0,0 +1,162 @@
+import itertools
+import random
+
+import pytest
+
+from busca_vagas import (LIMIAR_APROXIMADO, LIMITE_SUGESTOES, LIMITE_TERMOS_APROXIMADOS, adicionar_vaga, buscar_vagas,
+                         montar_indice, termos, trigramas, _mais_recentes)
+
+CARGOS = ["analista", "desenvolvedor", "consultor", "gerente", "arquiteto", "engenheiro", "tecnico", "especialista"]
+AREAS = ["python", "java", "sap", "abap", "fiori", "dados", "cloud", "redes", "suporte", "mainframe", "projetos"]
+NIVEIS = ["junior", "pleno", "senior", "lider", "estagiario"]
+SUFIXOS = ["ltda", "sa", "bank", "group", "tecnologia"]
+
+
+def _vagas(quantidade, seed=0):
+    rng = random.Random(seed)
+    vagas = []
+    for i in range(quantidade):
+        titulo = f"{rng.choice(CARGOS)} {rng.choice(AREAS)} {rng.choice(NIVEIS)} {rng.choice(AREAS)}"
+        cliente = f"cliente{rng.randrange(40)} {rng.choice(SUFIXOS)}"
+        vagas.append((str(1000 + i), titulo, cliente))
+    return vagas
+
+
+def _indice(vagas):
+    return montar_indice((id_vaga, {"info_titulo_vaga": titulo, "info_cliente": cliente}) for id_vaga, titulo, cliente in vagas)
+
+
+def _termos_por_vaga(vagas):
+    return [set(termos(titulo)) | set(termos(cliente)) for _, titulo, cliente in vagas]
+
+
+def _forca_bruta(vagas, consulta, termos_vaga=None, limite=LIMITE_SUGESTOES):
+    """Mesmas camadas de buscar_vagas, varrendo todas as vagas da mais recente para a mais antiga."""
+    termos_vaga = termos_vaga or _termos_por_vaga(vagas)
+    vocabulario = set().union(*termos_vaga)
+    palavras = list(dict.fromkeys(termos(consulta)))
+    recentes = range(len(vagas) - 1, -1, -1)
+
+    def casa_prefixo(posicao, palavra):
+        return (any(termo.startswith(palavra) for termo in termos_vaga[posicao])
+                or (palavra.isdigit() and vagas[posicao][0].startswith(palavra)))
+
+    def parecidos(palavra):
+        alvo = trigramas(palavra)
+        similares = [(len(alvo & trigramas(termo)) / len(alvo | trigramas(termo)), termo) for termo in vocabulario]
+        return {termo for similaridade, termo in sorted(similares, reverse=True)[:LIMITE_TERMOS_APROXIMADOS]
+                if similaridade >= LIMIAR_APROXIMADO}
+
+    camadas = [[p for p, (id_vaga, _, _) in enumerate(vagas) if id_vaga == consulta.strip()]]
+    camadas.append([p for p in recentes if all(palavra in termos_vaga[p] for palavra in palavras)])
+    camadas.append([p for p in recentes if all(casa_prefixo(p, palavra) for palavra in palavras)])
+    sem_prefixo = {palavra: parecidos(palavra) for palavra in palavras if not any(casa_prefixo(p, palavra) for p in recentes)}
+    if sem_prefixo:
+        camadas.append([p for p in recentes
+                        if all(termos_vaga[p] & sem_prefixo[palavra] if palavra in sem_prefixo else casa_prefixo(p, palavra)
+                               for palavra in palavras)])
+    escolhidas = list(dict.fromkeys(itertools.chain.from_iterable(camadas)))[:limite] if palavras else []
+    return [vagas[p][0] for p in escolhidas]
+
+
+def _transpor(palavra, rng):
+    i = rng.randrange(len(palavra) - 1)
+    return palavra[:i] + palavra[i + 1] + palavra[i] + palavra[i + 2:]
+
+
+# --- _mais_recentes ---
+
+@pytest.mark.parametrize("seed", range(20))
+def test_mais_recentes_igual_a_forca_bruta(seed):
+    rng = random.Random(seed)
+    universo = rng.choice([50, 3000, 20000])
+    grupos = []
+    for _ in range(rng.randint(1, 4)):
+        # Listas de tamanhos bem diferentes exercitam tanto a interseção por conjunto quanto a busca binária
+        grupos.append([sorted(rng.sample(range(universo), rng.randint(0, universo // rng.choice([1, 3, 50]))))
+                       for _ in range(rng.randint(1, 3))])
+    esperado = sorted(set.intersection(*(set().union(*listas) for listas in grupos)), reverse=True)
+    assert list(_mais_recentes(grupos)) == esperado
+
+
+def test_mais_recentes_entrega_sob_demanda():
+    grupos = [[list(range(0, 100000, 2))], [list(range(0, 100000, 3))]]
+    assert list(itertools.islice(_mais_recentes(grupos), 3)) == [99996, 99990, 99984]
+
+
+def test_mais_recentes_sem_grupos_ou_com_grupo_vazio():
+    assert list(_mais_recentes([])) == []
+    assert list(_mais_recentes([[[1, 2, 3]], [[]]])) == []
+
+
+# --- buscar_vagas ---
+
+@pytest.fixture(scope="module")
+def vagas():
+    return _vagas(3000)
+
+
+@pytest.fixture(scope="module")
+def indice(vagas):
+    return _indice(vagas)
+
+
+@pytest.fixture(scope="module")
+def termos_vaga(vagas):
+    return _termos_por_vaga(vagas)
+
+
+def test_consultas_iguais_a_forca_bruta(vagas, indice, termos_vaga):
+    rng = random.Random(1)
+    consultas = ["analista", "analista sap", "sap senior pleno", "anal", "analista s", "10", "1234", "cliente1",
+                 "cliente12 bank", "zzzz", "", "   ", "mainframe fiori lider cliente7"]
+    for _ in range(200):
+        _, titulo, cliente = rng.choice(vagas)
+        palavras = (titulo + " " + cliente).split()
+        consultas.append(" ".join(rng.sample(palavras, rng.randint(1, 3))))
+        consultas.append(" ".join(palavra[:rng.randint(1, len(palavra))] for palavra in rng.sample(palavras, 2)))
+    for consulta in consultas:
+        assert [r["id_vaga"] for r in buscar_vagas(indice, consulta)] == _forca_bruta(vagas, consulta, termos_vaga), consulta
+
+
+def test_erros_de_digitacao_iguais_a_forca_bruta(vagas, indice, termos_vaga):
+    rng = random.Random(2)
+    consultas = ["pyhton", "sneior", "javva", "analsta sap", "desenvolvdor pyton", "gernete pleno"]
+    for _ in range(100):
+        _, titulo, _ = rng.choice(vagas)
+        palavras = [palavra for palavra in titulo.split() if len(palavra) > 3]
+        consultas.append(" ".join(_transpor(palavra, rng) for palavra in rng.sample(palavras, min(2, len(palavras)))))
+    for consulta in consultas:
+        assert [r["id_vaga"] for r in buscar_vagas(indice, consulta)] == _forca_bruta(vagas, consulta, termos_vaga), consulta
+
+
+def test_transposicao_encontra_o_termo(indice):
+    resultado = buscar_vagas(indice, "pyhton")
+    assert len(resultado) == LIMITE_SUGESTOES
+    assert all("python" in termos(r["titulo"]) for r in resultado)
+
+
+def test_id_exato_vem_primeiro(vagas, indice):
+    assert buscar_vagas(indice, "1500")[0]["id_vaga"] == "1500"
+
+
+def test_vagas_mais_recentes_primeiro(vagas, indice):
+    posicoes = [int(r["id_vaga"]) for r in buscar_vagas(indice, "analista", limite=50)]
+    assert posicoes == sorted(posicoes, reverse=True)
+
+
+def test_cadastro_e_alteracao_de_vaga(vagas):
+    vagas = list(vagas[:500])
+    indice = _indice(vagas)
+    adicionar_vaga(indice, "novo", {"info_titulo_vaga": "analista quantico", "info_cliente": "cliente99 sa"})
+    vagas.append(("novo", "analista quantico", "cliente99 sa"))
+    assert buscar_vagas(indice, "quantico")[0]["id_vaga"] == "novo"
+    # Vaga alterada sai dos termos antigos e entra nos novos, mantendo a posição original
+    adicionar_vaga(indice, "1010", {"info_titulo_vaga": "gerente quantico", "info_cliente": "cliente98 sa"})
+    vagas[10] = ("1010", "gerente quantico", "cliente98 sa")
+    for consulta in ["quantico", "analista", "gerente quantico", vagas[10][1], "cliente98"]:
+        assert [r["id_vaga"] for r in buscar_vagas(indice, consulta)] == _forca_bruta(vagas, consulta), consulta
+
+
+def test_sem_indice():
+    assert buscar_vagas(None, "analista") == []
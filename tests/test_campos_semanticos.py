@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from armazem_vetores import gravar_armazem
+from campos_semanticos import (CAMPOS_SEMANTICOS, buscar_por_campos, carregar_campos, combinar_campos, entidade_campo,
+                               similaridades_campos)
+
+DIMENSAO = 8
+PESOS = {"titulo": 1.0, "atividades": 1.0, "competencias": 1.0, "formacao": 0.5}
+
+
+def _campos(registros):
+    """Estrutura de carregar_campos montada em memória: registros = {id: {campo: vetor}} (campo ausente = vazio)."""
+    ids = list(registros)
+    vetores = {campo: np.array([registros[item_id].get(campo, np.zeros(DIMENSAO)) for item_id in ids], dtype=np.float32)
+               for campo in CAMPOS_SEMANTICOS}
+    return {"ids": ids, "posicoes": {item_id: i for i, item_id in enumerate(ids)}, "modelo": "modelo",
+            "vetores": vetores, "normas": {campo: np.linalg.norm(matriz, axis=1) for campo, matriz in vetores.items()}}
+
+
+def _cosseno(a, b):
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+@pytest.fixture
+def consulta():
+    rng = np.random.default_rng(0)
+    return {campo: rng.standard_normal(DIMENSAO).astype(np.float32) for campo in CAMPOS_SEMANTICOS}
+
+
+def test_similaridade_e_media_ponderada_sobre_os_campos_da_consulta(consulta):
+    rng = np.random.default_rng(1)
+    registros = {str(i): {campo: rng.standard_normal(DIMENSAO) for campo in CAMPOS_SEMANTICOS if rng.random() > 0.3}
+                 for i in range(30)}
+    resultados = buscar_por_campos(_campos(registros), consulta, k=30, pesos=PESOS)
+    total = sum(PESOS.values())
+    for resultado in resultados:
+        registro = registros[resultado["id_original"]]
+        esperado = sum(PESOS[campo] * _cosseno(registro[campo], consulta[campo]) for campo in registro) / total
+        assert resultado["similaridade"] == pytest.approx(esperado, abs=1e-5)
+        assert resultado["campo_determinante"] in registro
+        assert {campo for campo, valor in resultado["similaridades_campos"].items() if valor is not None} == set(registro)
+    assert [r["similaridade"] for r in resultados] == sorted((r["similaridade"] for r in resultados), reverse=True)
+
+
+def test_perfil_quase_vazio_nao_supera_perfil_completo(consulta):
+    completo = {campo: vetor + 0.3 for campo, vetor in consulta.items()}
+    registros = {"completo": completo, "so_titulo": {"titulo": consulta["titulo"]}}
+    ids = [r["id_original"] for r in buscar_por_campos(_campos(registros), consulta, k=2, pesos=PESOS)]
+    assert ids == ["completo", "so_titulo"]
+
+
+def test_campos_fora_da_consulta_nao_contam(consulta):
+    parcial = {"titulo": consulta["titulo"], "atividades": consulta["atividades"]}
+    registros = {"a": {campo: consulta[campo] for campo in CAMPOS_SEMANTICOS}}
+    resultado, = buscar_por_campos(_campos(registros), parcial, k=1, pesos=PESOS)
+    assert resultado["similaridade"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_registro_sem_campos_fica_fora(consulta):
+    registros = {"vazio": {}, "a": {"titulo": consulta["titulo"]}}
+    assert [r["id_original"] for r in buscar_por_campos(_campos(registros), consulta, k=2, pesos=PESOS)] == ["a"]
+
+
+def test_pesos_nulos(consulta):
+    campos = _campos({"a": {"titulo": consulta["titulo"]}})
+    combinada, _ = combinar_campos(*similaridades_campos(campos, consulta), {campo: 0 for campo in CAMPOS_SEMANTICOS})
+    assert combinada.tolist() == [0.0]
+
+
+def test_carregar_campos_dos_armazens(tmp_path, consulta):
+    model_dir = str(tmp_path)
+    vetores = {campo: np.vstack([consulta[campo], np.zeros(DIMENSAO, dtype=np.float32)]) for campo in CAMPOS_SEMANTICOS}
+    for campo in CAMPOS_SEMANTICOS:
+        gravar_armazem("original", entidade_campo("candidatos", campo), "modelo", vetores[campo], ["a", "b"], model_dir=model_dir)
+    campos = carregar_campos("original", "candidatos", model_dir)
+    assert campos["ids"] == ["a", "b"] and campos["posicoes"] == {"a": 0, "b": 1}
+    assert all(campos["normas"][campo][1] == 0 for campo in CAMPOS_SEMANTICOS)
+    # Um campo gravado com outros IDs desalinha o conjunto
+    gravar_armazem("original", entidade_campo("candidatos", "formacao"), "modelo", vetores["formacao"], ["b", "a"], model_dir=model_dir)
+    assert carregar_campos("original", "candidatos", model_dir) is None
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+from checkpoints import codificar_shard, diretorio_checkpoint, limpar_checkpoint
+
+
+class ModeloFalso:
+    def __init__(self):
+        self.chamadas = 0
+
+    def encode(self, textos, **kwargs):
+        self.chamadas += 1
+        return np.array([[len(texto), sum(map(ord, texto))] for texto in textos], dtype=np.float64)
+
+
+def _itens(sufixo=""):
+    return [("1", "texto um" + sufixo, "h1"), ("2", "texto  dois ", "h2")]
+
+
+def test_shard_reiniciado_e_lido_do_disco(tmp_path):
+    diretorio = diretorio_checkpoint("original", "vagas", str(tmp_path))
+    modelo = ModeloFalso()
+    vetores = codificar_shard(0, _itens(), lambda: modelo, "modelo", diretorio)
+    assert vetores.dtype == np.float32 and modelo.chamadas == 1
+    # Espaços normalizados como em gerar_embedding
+    assert vetores[1, 0] == len("texto dois")
+
+    retomado = codificar_shard(0, _itens(), lambda: modelo, "modelo", diretorio)
+    assert modelo.chamadas == 1
+    np.testing.assert_array_equal(retomado, vetores)
+    assert sorted(os.listdir(diretorio)) == ["shard_00000.json", "shard_00000.npy"]
+
+
+def test_chave_diferente_recodifica(tmp_path):
+    diretorio = diretorio_checkpoint("original", "vagas", str(tmp_path))
+    modelo = ModeloFalso()
+    codificar_shard(0, _itens(), lambda: modelo, "modelo", diretorio)
+    codificar_shard(0, _itens(" alterado"), lambda: modelo, "modelo", diretorio)
+    assert modelo.chamadas == 1  # mesmo ID e hash: o texto não entra na chave
+    codificar_shard(0, [("1", "x", "h9")], lambda: modelo, "modelo", diretorio)
+    codificar_shard(0, [("1", "x", "h9")], lambda: modelo, "outro", diretorio)
+    codificar_shard(0, [("1", "x", "h9")], lambda: modelo, "outro", diretorio, backend="onnx_int8")
+    assert modelo.chamadas == 4
+
+
+def test_limpar_checkpoint(tmp_path):
+    diretorio = diretorio_checkpoint("original", "vagas", str(tmp_path))
+    codificar_shard(0, _itens(), ModeloFalso, "modelo", diretorio)
+    limpar_checkpoint(diretorio)
+    assert not os.path.exists(diretorio)
+    limpar_checkpoint(diretorio)
@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from repositorio_registros import (ID_INICIAL, atualizar_registro, buscar_por_chaves, exportar_pendentes,
+                                   inserir_registros, listar_prospects, obter_registro, reservar_ids,
+                                   sincronizar_base, versao_base)
+
+
+def _gravar_json(caminho, dados):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+
+
+@pytest.fixture
+def base(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _gravar_json(data_dir / "vagas.json", [{"id_vaga": "7001", "titulo": "Analista"}])
+    _gravar_json(data_dir / "applicants.json", [{"infos_basicas_codigo_profissional": "12",
+                                                 "infos_basicas_email": "Fulano@X.com"}])
+    _gravar_json(data_dir / "prospects.json", [{"prospect_codigo": "12", "id_vaga": "7001"}])
+    caminho = str(tmp_path / "registros.sqlite")
+    assert set(sincronizar_base(str(data_dir), caminho).values()) == {"atualizada"}
+    return str(data_dir), caminho
+
+
+def test_sincronizacao_sem_mudancas_nao_reimporta(base):
+    data_dir, caminho = base
+    versao = versao_base(caminho=caminho)
+    assert set(sincronizar_base(data_dir, caminho).values()) == {"inalterada"}
+    assert versao_base(caminho=caminho) == versao
+    assert obter_registro("vagas", 7001, caminho)["titulo"] == "Analista"
+    assert listar_prospects(id_vaga="7001", caminho=caminho) == [{"prospect_codigo": "12", "id_vaga": "7001"}]
+
+
+def test_reservar_ids_sequencial_e_a_frente_dos_importados(base):
+    _, caminho = base
+    assert reservar_ids("vagas", 2, caminho) == [7002, 7003]
+    assert reservar_ids("vagas", caminho=caminho) == [7004]
+    # A sequência acompanha o maior ID numérico importado; IDs não numéricos não a alteram
+    assert reservar_ids("candidatos", caminho=caminho) == [13]
+    inserir_registros("vagas", [{"id_vaga": "vaga_anon_9"}], caminho)
+    assert reservar_ids("vagas", caminho=caminho) == [7005]
+
+
+def test_reservar_ids_em_base_vazia_comeca_no_id_inicial(tmp_path):
+    caminho = str(tmp_path / "vazia.sqlite")
+    assert reservar_ids("candidatos", 2, caminho) == [ID_INICIAL["candidatos"], ID_INICIAL["candidatos"] + 1]
+
+
+def test_gravacoes_mudam_a_versao_e_sao_exportadas(base):
+    data_dir, caminho = base
+    versao = dict(versao_base(caminho=caminho))
+    inserir_registros("vagas", [{"id_vaga": "7002", "titulo": "Dev"}], caminho)
+    atualizar_registro("candidatos", "12", {"infos_basicas_codigo_profissional": "12",
+                                            "infos_basicas_email": "outro@x.com"}, caminho)
+    nova = dict(versao_base(caminho=caminho))
+    assert nova["vagas"] == versao["vagas"] + 1 and nova["candidatos"] == versao["candidatos"] + 1
+    assert nova["prospects"] == versao["prospects"]
+    # As chaves exatas acompanham a atualização
+    assert buscar_por_chaves("candidatos", ["email:outro@x.com"], caminho) == {"12": ["email:outro@x.com"]}
+    assert buscar_por_chaves("candidatos", ["email:fulano@x.com"], caminho) == {}
+
+    assert sorted(exportar_pendentes(data_dir, caminho)) == ["candidatos", "vagas"]
+    with open(os.path.join(data_dir, "vagas.json"), encoding="utf-8") as f:
+        assert [v["id_vaga"] for v in json.load(f)] == ["7001", "7002"]
+    assert exportar_pendentes(data_dir, caminho) == []
+    # O JSON exportado é reconhecido como a versão já importada
+    assert set(sincronizar_base(data_dir, caminho).values()) == {"inalterada"}
+
+
+def test_id_repetido_nao_grava_nada(base):
+    _, caminho = base
+    versao = versao_base(caminho=caminho)
+    with pytest.raises(sqlite3.IntegrityError):
+        inserir_registros("vagas", [{"id_vaga": "7005"}, {"id_vaga": "7001"}], caminho)
+    assert obter_registro("vagas", "7005", caminho) is None
+    assert versao_base(caminho=caminho) == versao
+    with pytest.raises(KeyError):
+        atualizar_registro("vagas", "9999", {}, caminho)
+
+
+def test_json_alterado_com_pendencias_mantem_a_base(base):
+    data_dir, caminho = base
+    inserir_registros("vagas", [{"id_vaga": "7002"}], caminho)
+    _gravar_json(os.path.join(data_dir, "vagas.json"), [{"id_vaga": "1"}])
+    assert sincronizar_base(data_dir, caminho)["vagas"] == "conflito"
+    assert obter_registro("vagas", "7002", caminho) is not None
@@ -0,0 +1,87 @@
+import threading
+
+import faiss
+import numpy as np
+import pandas as pd
+import pytest
+
+from registro_indices import APELIDO_LEGADO, caminhos_indice, descobrir_indices
+from tabela_topk import consultar, inserir_candidato, inserir_vaga, materializar
+from versoes_dados import versao_indice
+
+DIMENSAO = 8
+
+
+class ModeloFalso:
+    """Vetor pseudoaleatório fixo por texto."""
+
+    def encode(self, textos, **kwargs):
+        return np.array([np.random.default_rng(sum(map(ord, texto))).standard_normal(DIMENSAO) for texto in textos])
+
+
+@pytest.fixture
+def tabela(tmp_path):
+    """Índice legado com 10 candidatos e tabela top-K materializada para 5 vagas."""
+    model_dir = str(tmp_path)
+    candidatos = np.random.default_rng(0).standard_normal((10, DIMENSAO)).astype(np.float32)
+    index = faiss.IndexFlatL2(DIMENSAO)
+    index.add(candidatos)
+    caminhos = caminhos_indice(APELIDO_LEGADO, "candidatos", model_dir)
+    faiss.write_index(index, caminhos["index"])
+    pd.DataFrame({"id_original": [f"c{i}" for i in range(10)], "faiss_id": np.arange(10)}).to_pickle(caminhos["metadados"])
+    vagas = {f"v{i}": f"vaga numero {i}" for i in range(5)}
+    materializar(APELIDO_LEGADO, vagas, ModeloFalso(), model_dir)
+    versao = versao_indice(descobrir_indices(model_dir)[APELIDO_LEGADO]["candidatos"])
+    vetores_vagas = ModeloFalso().encode(list(vagas.values())).astype(np.float32)
+    return {"model_dir": model_dir, "candidatos": candidatos, "vagas": dict(zip(vagas, vetores_vagas)), "versao": versao}
+
+
+def _top_forca_bruta(vetor_vaga, vetores, ids):
+    distancias = ((vetores - vetor_vaga) ** 2).sum(axis=1)
+    ordem = np.argsort(distancias, kind="stable")
+    return [ids[i] for i in ordem], distancias[ordem]
+
+
+def test_materializar_e_consultar(tabela):
+    for id_vaga, vetor in tabela["vagas"].items():
+        resultado = consultar(APELIDO_LEGADO, id_vaga, 10, tabela["versao"], tabela["model_dir"])
+        ids, distancias = _top_forca_bruta(vetor, tabela["candidatos"], [f"c{i}" for i in range(10)])
+        assert [id_candidato for id_candidato, _ in resultado] == ids
+        np.testing.assert_allclose([distancia for _, distancia in resultado], distancias, rtol=1e-4, atol=1e-4)
+
+
+def test_consulta_de_outra_versao_e_ignorada(tabela):
+    assert consultar(APELIDO_LEGADO, "v0", 5, (("outro", 1, 1),), tabela["model_dir"]) is None
+
+
+def test_cadastros_concorrentes_entram_em_todas_as_listas(tabela):
+    novos = np.random.default_rng(1).standard_normal((16, DIMENSAO)).astype(np.float32)
+    versao = tabela["versao"]
+    threads = [threading.Thread(target=inserir_candidato, args=(APELIDO_LEGADO, f"n{i}", novos[i], versao, versao, tabela["model_dir"]))
+               for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    vetores = np.vstack([tabela["candidatos"], novos])
+    ids_todos = [f"c{i}" for i in range(10)] + [f"n{i}" for i in range(16)]
+    for id_vaga, vetor in tabela["vagas"].items():
+        resultado = consultar(APELIDO_LEGADO, id_vaga, 26, versao, tabela["model_dir"])
+        ids, distancias = _top_forca_bruta(vetor, vetores, ids_todos)
+        assert sorted(id_candidato for id_candidato, _ in resultado) == sorted(ids)
+        np.testing.assert_allclose([distancia for _, distancia in resultado], distancias, rtol=1e-4, atol=1e-4)
+
+
+def test_inserir_candidato_com_tabela_desatualizada(tabela):
+    assert inserir_candidato(APELIDO_LEGADO, "n0", np.zeros(DIMENSAO, dtype=np.float32), (("outro", 1, 1),),
+                             (("outro", 2, 2),), tabela["model_dir"]) == 0
+    assert consultar(APELIDO_LEGADO, "v0", 5, tabela["versao"], tabela["model_dir"]) is not None
+
+
+def test_inserir_vaga(tabela):
+    vetor = np.random.default_rng(2).standard_normal(DIMENSAO).astype(np.float32)
+    assert inserir_vaga(APELIDO_LEGADO, "nova", vetor, tabela["model_dir"])
+    resultado = consultar(APELIDO_LEGADO, "nova", 10, tabela["versao"], tabela["model_dir"])
+    ids, _ = _top_forca_bruta(vetor, tabela["candidatos"], [f"c{i}" for i in range(10)])
+    assert [id_candidato for id_candidato, _ in resultado] == ids